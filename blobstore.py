@@ -0,0 +1,226 @@
+"""
+Content-addressed store for the local copies of source images.
+A copy is named after the SHA-256 of its contents, so the same image imported from several
+places is stored once. A small SQLite table keeps how many entries reference each copy:
+adding a reference increments it, deleting an entry decrements it and the file is removed
+when nobody uses it any more - no directory scans involved.
+"""
+import os
+import uuid
+import shutil
+import sqlite3
+import hashlib
+import threading
+
+BLOB_PREFIX = 'blob_'
+# bytes moved per copy call; also the granularity of progress reports
+COPY_CHUNK = 1 << 20
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS refs (
+    name TEXT PRIMARY KEY,
+    count INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sources (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+'''
+
+def file_digest(path, chunk_size=1 << 20):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def fast_copy(src, dst, progress=None, chunk_size=COPY_CHUNK):
+    """Copy the contents and timestamps of src to dst; returns the number of bytes copied.
+
+    The data is moved by the kernel (os.copy_file_range, then os.sendfile) where the
+    platform has them and falls back to a buffered read/write loop otherwise (Windows, or
+    file systems that refuse). progress(done, total) is called after every chunk.
+    """
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        in_fd, out_fd = fsrc.fileno(), fdst.fileno()
+        total = os.fstat(in_fd).st_size
+        done = 0
+        for name in ('copy_file_range', 'sendfile'):
+            kernel_copy = getattr(os, name, None)
+            if kernel_copy is None or done >= total:
+                continue
+            try:
+                while done < total:
+                    count = min(chunk_size, total - done)
+                    if name == 'copy_file_range':
+                        sent = kernel_copy(in_fd, out_fd, count, done, done)
+                    else:
+                        os.lseek(out_fd, done, os.SEEK_SET)
+                        sent = kernel_copy(out_fd, in_fd, done, count)
+                    if not sent:
+                        break
+                    done += sent
+                    if progress:
+                        progress(done, total)
+                break
+            except OSError:
+                # not supported for this pair of files: try the next method from where it stopped
+                continue
+        # whatever is left (or everything): plain buffered copy
+        fsrc.seek(done)
+        fdst.seek(done)
+        buf = bytearray(chunk_size)
+        view = memoryview(buf)
+        while True:
+            n = fsrc.readinto(buf)
+            if not n:
+                break
+            fdst.write(view[:n])
+            done += n
+            if progress:
+                progress(done, max(total, done))
+    shutil.copystat(src, dst)
+    return done
+
+def is_blob_name(name):
+    return os.path.basename(name).startswith(BLOB_PREFIX)
+
+class BlobStore:
+    """Blobs live flat in root as blob_<sha256><ext>; reference counts in refs_path.
+
+    The sources table remembers the digest of every file that was added (keyed by path,
+    size and mtime) so adding the same unchanged source again does not re-read it.
+    """
+    def __init__(self, root, refs_path):
+        self.root = root
+        self._lock = threading.RLock()
+        os.makedirs(root, exist_ok=True)
+        self.conn = sqlite3.connect(refs_path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def path_for(self, name):
+        return os.path.join(self.root, os.path.basename(name))
+
+    def contains(self, path):
+        """True if path is a blob of this store."""
+        try:
+            return is_blob_name(path) and os.path.samefile(os.path.dirname(os.path.abspath(path)), self.root)
+        except OSError:
+            return False
+
+    def _cached_digest(self, src, st):
+        with self._lock:
+            row = self.conn.execute('SELECT size, mtime_ns, digest FROM sources WHERE path = ?',
+                                    (os.path.abspath(src),)).fetchone()
+        if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+            return row[2]
+        return None
+
+    def _remember_digest(self, src, st, digest):
+        with self._lock:
+            self.conn.execute('INSERT OR REPLACE INTO sources(path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)',
+                              (os.path.abspath(src), st.st_size, st.st_mtime_ns, digest))
+
+    def put(self, src, add_ref=True, progress=None):
+        """Store the contents of src (once) and return the blob path.
+
+        add_ref=False only makes sure the blob exists, e.g. to read a local copy of a
+        source no entry references yet. progress(done, total) is called as bytes are
+        copied (see fast_copy).
+        """
+        st = os.stat(src)
+        ext = os.path.splitext(src)[1].lower()
+        digest = self._cached_digest(src, st)
+        if digest is not None:
+            path = self.path_for(BLOB_PREFIX + digest + ext)
+            # existence check and reference are taken together so a concurrent decref of the
+            # last reference cannot delete the file in between
+            with self._lock:
+                if os.path.exists(path):
+                    if add_ref:
+                        self.incref(path)
+                    return path
+        # unknown contents: copy first and hash the local file, so a slow (network) source
+        # is read only once
+        tmp = os.path.join(self.root, f'{BLOB_PREFIX}{uuid.uuid4().hex}.part')
+        try:
+            fast_copy(src, tmp, progress)
+            if digest is None:
+                digest = file_digest(tmp)
+                self._remember_digest(src, st, digest)
+            name = BLOB_PREFIX + digest + ext
+            path = self.path_for(name)
+            with self._lock:
+                if os.path.exists(path):
+                    os.remove(tmp)
+                else:
+                    os.replace(tmp, path)
+                if add_ref:
+                    self.incref(name)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        return path
+
+    def incref(self, name):
+        with self._lock:
+            self.conn.execute(
+                'INSERT INTO refs(name, count) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET count = count + 1',
+                (os.path.basename(name),))
+
+    def refcount(self, name):
+        with self._lock:
+            row = self.conn.execute('SELECT count FROM refs WHERE name = ?', (os.path.basename(name),)).fetchone()
+        return row[0] if row else 0
+
+    def decref(self, name):
+        """Drop one reference; the blob is deleted with the last one. Returns True if it was deleted.
+
+        A blob without a reference count is left alone: it may be used by records that
+        never took a reference (e.g. from before counting); the media GC decides about it.
+        """
+        name = os.path.basename(name)
+        with self._lock:
+            row = self.conn.execute('SELECT count FROM refs WHERE name = ?', (name,)).fetchone()
+            if row is None:
+                return False
+            if row[0] > 1:
+                self.conn.execute('UPDATE refs SET count = count - 1 WHERE name = ?', (name,))
+                return False
+            self.conn.execute('DELETE FROM refs WHERE name = ?', (name,))
+            try:
+                os.remove(self.path_for(name))
+                return True
+            except FileNotFoundError:
+                return False
+
+    def drop_unreferenced(self, name):
+        """Delete a blob only if nothing holds a reference to it (checked under the store
+        lock, so a reference taken concurrently wins). Returns True if it was deleted."""
+        name = os.path.basename(name)
+        with self._lock:
+            if self.refcount(name) > 0:
+                return False
+            return self.drop(name)
+
+    def drop(self, name):
+        """Delete a blob and its reference count regardless of the count."""
+        name = os.path.basename(name)
+        with self._lock:
+            self.conn.execute('DELETE FROM refs WHERE name = ?', (name,))
+            try:
+                os.remove(self.path_for(name))
+                return True
+            except FileNotFoundError:
+                return False
@@ -0,0 +1,110 @@
+"""
+Background copies of the images of saved entries.
+Saving an entry no longer waits for its poster and screenshots to be copied into copies/:
+the record is stored with the original paths right away, the files are copied here (see
+blobstore.fast_copy) and their thumbnails generated, and every finished file is handed back
+so the record can be switched over to its local copy.
+"""
+import os
+import queue
+import threading
+
+from utils import copy_source_to_local, regen_thumbnails_for_paths
+
+class CopyPipeline:
+    """Copies submitted files on `workers` threads (few: the source is often one disk or share).
+
+    submit(paths, on_file) queues one job; on_file(src, copy, error) is called on a worker
+    thread after each file (copy is None if it failed). status() is a snapshot of the
+    overall progress for the UI.
+    """
+    def __init__(self, workers=2):
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._files_total = 0
+        self._files_done = 0
+        self._failed = 0
+        # bytes of the files queued so far (sized when a worker reaches them) and copied
+        self._bytes_total = 0
+        self._bytes_done = 0
+        self._closed = False
+        self._threads = []
+        for i in range(max(1, workers)):
+            t = threading.Thread(target=self._worker, name=f'copy-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, paths, on_file=None):
+        paths = [p for p in paths if p]
+        if not paths:
+            return
+        with self._lock:
+            if self._closed:
+                return
+            if self._files_done == self._files_total:
+                # previous batch finished: progress starts over
+                self._files_total = self._files_done = self._failed = 0
+                self._bytes_total = self._bytes_done = 0
+            self._files_total += len(paths)
+        for p in paths:
+            self._queue.put((p, on_file))
+
+    def busy(self):
+        with self._lock:
+            return self._files_done < self._files_total
+
+    def status(self):
+        """{'files_done', 'files_total', 'failed', 'bytes_done', 'bytes_total'}"""
+        with self._lock:
+            return {'files_done': self._files_done, 'files_total': self._files_total, 'failed': self._failed,
+                    'bytes_done': self._bytes_done, 'bytes_total': self._bytes_total}
+
+    def _worker(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            src, on_file = item
+            copied = [0]
+
+            def progress(done, total):
+                with self._lock:
+                    self._bytes_done += done - copied[0]
+                copied[0] = done
+
+            copy, error, size = None, None, 0
+            try:
+                size = os.path.getsize(src)
+                with self._lock:
+                    self._bytes_total += size
+                copy = copy_source_to_local(src, progress=progress) or None
+                if copy is None:
+                    error = 'copy failed'
+                else:
+                    # the card and carousel look for the thumbnails of the copy once the record points at it
+                    regen_thumbnails_for_paths([copy])
+            except Exception as e:
+                error = str(e)
+            with self._lock:
+                # an already stored or failed file counts as fully copied
+                self._bytes_done += max(0, size - copied[0])
+                self._files_done += 1
+                if error:
+                    self._failed += 1
+            if on_file:
+                try:
+                    on_file(src, copy, error)
+                except Exception:
+                    pass
+
+    def close(self):
+        """Stop the workers after their current file; queued files are dropped."""
+        with self._lock:
+            self._closed = True
+        try:
+            while True:
+                self._queue.get_nowait()
+        except queue.Empty:
+            pass
+        for _ in self._threads:
+            self._queue.put(None)
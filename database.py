@@ -1,12 +1,343 @@
 from tinydb import TinyDB, Query
+from tinydb.storages import JSONStorage
+from tinydb.table import Document
+from contextlib import contextmanager
 from datetime import datetime
+import bisect
+import json
+import os
+import threading
+import time
+
+from jsonio import iter_json_array
+from search_index import TrigramIndex
+from storage import BatchingMiddleware, JournalTable
+
+REQUIRED_KEYS = {'title', 'description', 'poster_path', 'screenshots_paths', 'tags'}
+
+def _normalize_title(title):
+    return (title or '').strip().casefold()
+
+def _title_sort_key(doc):
+    return (doc.get('title') or '').lower()
+
+def _date_sort_key(doc):
+    date = doc.get('added_date', '')
+    return date if isinstance(date, str) else ''
+
+_SORT_KEYS = {
+    'title': _title_sort_key,
+    'date': _date_sort_key,
+    'id': lambda doc: doc.doc_id,
+}
+
+def sort_key(doc, sort_by='title'):
+    """Position of doc in the get_page order for sort_by (both backends order by it)."""
+    return (_SORT_KEYS.get(sort_by, _SORT_KEYS['id'])(doc), doc.doc_id)
+
+def validate_entry(entry, idx, merge=False):
+    """Validate one imported entry. Returns an error message or None.
+
+    For a replacing import a missing added_date is filled in and the exported 'id' dropped;
+    a merge import leaves both for plan_merge, which needs to know what the entry carried.
+    """
+    if not isinstance(entry, dict):
+        return f'Item {idx}: not an object'
+    missing = REQUIRED_KEYS - set(entry.keys())
+    if missing:
+        return f"Item {idx}: missing keys {', '.join(sorted(missing))}"
+    # Validate types
+    if not isinstance(entry.get('title'), str) or not entry.get('title').strip():
+        return f'Item {idx}: invalid title'
+    if not isinstance(entry.get('description'), str):
+        return f'Item {idx}: invalid description'
+    if not isinstance(entry.get('poster_path'), str):
+        return f'Item {idx}: invalid poster_path'
+    if not isinstance(entry.get('screenshots_paths'), list) or not all(isinstance(p, str) for p in entry.get('screenshots_paths')):
+        return f'Item {idx}: invalid screenshots_paths (must be list of strings)'
+    if not isinstance(entry.get('tags'), list) or not all(isinstance(t, str) for t in entry.get('tags')):
+        return f'Item {idx}: invalid tags (must be list of strings)'
+    if 'id' in entry and (not isinstance(entry['id'], int) or isinstance(entry['id'], bool)):
+        return f'Item {idx}: invalid id'
+    if 'added_date' in entry and not isinstance(entry.get('added_date'), str):
+        del entry['added_date']
+    if merge:
+        return None
+
+    # Ensure added_date exists
+    entry.pop('id', None)
+    if 'added_date' not in entry:
+        entry['added_date'] = datetime.now().isoformat()
+    return None
+
+IMPORT_MODES = ('replace', 'merge')
+MERGE_KEYS = ('title', 'id')
+
+def export_record(doc):
+    """Exported form of a stored record: the fields plus its doc_id as 'id' (used by merge imports)."""
+    doc_id = getattr(doc, 'doc_id', None)
+    record = {'id': doc_id} if doc_id is not None else {}
+    record.update(doc)
+    return record
+
+def plan_merge(entries, get_anime, get_anime_id, key='title'):
+    """Diff validated import entries against the stored records for a merge import.
+
+    Entries are matched by exact title or by the 'id' an export carries; an entry whose id
+    is unknown (or missing) is treated as new. Fields the entry does not carry, notably
+    added_date, keep their stored value. When the same record appears twice the later entry
+    wins. Returns (inserts, updates, unchanged): records to insert, {doc_id: merged record}
+    for changed records and the number of entries that match their record exactly.
+    """
+    if key not in MERGE_KEYS:
+        raise ValueError(f'Unknown merge key: {key}')
+    inserts = {}
+    fresh = []
+    updates = {}
+    unchanged = 0
+    for entry in entries:
+        entry_id = entry.pop('id', None)
+        doc_id = entry_id if key == 'id' else get_anime_id(entry['title'])
+        existing = get_anime(doc_id) if doc_id is not None else None
+        if existing is None:
+            if 'added_date' not in entry:
+                entry['added_date'] = datetime.now().isoformat()
+            if key == 'title' or entry_id is not None:
+                inserts[entry['title'] if key == 'title' else entry_id] = entry
+            else:
+                fresh.append(entry)
+            continue
+        merged = dict(updates.get(doc_id, existing))
+        merged.update(entry)
+        if merged == dict(existing):
+            unchanged += 1
+            updates.pop(doc_id, None)
+        else:
+            updates[doc_id] = merged
+    return list(inserts.values()) + fresh, updates, unchanged
+
+# import reports keep at most this many error messages
+MAX_IMPORT_ERRORS = 100
+# a streamed import commits chunk by chunk; the library as it was before is kept in
+# db_path + IMPORT_BACKUP_SUFFIX until the import finished and restored if it did not
+IMPORT_BACKUP_SUFFIX = '.import-backup'
+
+def stream_import(fp, begin_replace, insert_chunk, progress=None, chunk_size=5000, total_bytes=None, tell=None, merge=False, on_chunk=None):
+    """Validate and insert the entries of a JSON array file in chunks.
+
+    begin_replace() is called once before the first valid chunk is inserted (the import
+    replaces the collection, as import_from_json does) and insert_chunk(entries) for every
+    chunk. A merge import passes merge=True and no begin_replace; its insert_chunk returns
+    the inserted/updated/unchanged counts of the chunk, which are summed into the report. progress(processed, percent, per_second) is called a few times per second;
+    percent is None when total_bytes is unknown; tell() reports the bytes consumed so far
+    (defaults to fp.tell, pass the raw file's tell for compressed input). on_chunk(entries)
+    is called after every chunk was written, e.g. to count the media references of the
+    new records. Returns the usual import report.
+    """
+    report = {'imported': 0, 'skipped': 0, 'errors': []}
+    if merge:
+        report.update(inserted=0, updated=0, unchanged=0)
+    tell = tell or getattr(fp, 'tell', None)
+    started = last_report = time.monotonic()
+    processed = 0
+    replaced = False
+    chunk = []
+
+    def report_progress(force=False):
+        nonlocal last_report
+        now = time.monotonic()
+        if progress is None or (not force and now - last_report < 0.25):
+            return
+        last_report = now
+        percent = None
+        if total_bytes and tell is not None:
+            try:
+                percent = min(100.0, tell() * 100.0 / total_bytes)
+            except (OSError, ValueError):
+                pass
+        progress(processed, percent, processed / max(now - started, 1e-6))
+
+    def flush():
+        nonlocal replaced, chunk
+        if not chunk:
+            return
+        if not replaced and begin_replace is not None:
+            begin_replace()
+            replaced = True
+        counts = insert_chunk(chunk)
+        for name, value in (counts or {}).items():
+            report[name] += value
+        if on_chunk is not None:
+            on_chunk(chunk)
+        report['imported'] += len(chunk)
+        chunk = []
+
+    for idx, entry in enumerate(iter_json_array(fp)):
+        processed = idx + 1
+        err = validate_entry(entry, idx, merge)
+        if err:
+            report['skipped'] += 1
+            if len(report['errors']) < MAX_IMPORT_ERRORS:
+                report['errors'].append(err)
+        else:
+            chunk.append(entry)
+            if len(chunk) >= chunk_size:
+                flush()
+        report_progress()
+    flush()
+    if report['skipped'] > len(report['errors']):
+        report['errors'].append(f"... {report['skipped'] - len(report['errors'])} more")
+    report_progress(force=True)
+    return report
+
+def open_database(backend='json', db_path=None):
+    """Open the anime database with the configured backend ('json', 'journal' or 'sqlite')."""
+    if backend == 'sqlite':
+        from sqlite_backend import SQLiteAnimeDatabase, migrate_tinydb_to_sqlite
+        path = db_path or 'anime.sqlite'
+        # first switch to sqlite: carry the existing TinyDB library over once; migrated into a
+        # temporary file, so a failed migration never leaves a partial library to open next time
+        if not os.path.exists(path) and os.path.exists('anime.db'):
+            tmp = path + '.part'
+            leftovers = (tmp, tmp + '-wal', tmp + '-shm', tmp + '-journal')
+            for leftover in leftovers:
+                try:
+                    os.remove(leftover)
+                except OSError:
+                    pass
+            try:
+                migrate_tinydb_to_sqlite('anime.db', tmp)
+                os.replace(tmp, path)
+            finally:
+                for leftover in leftovers:
+                    try:
+                        os.remove(leftover)
+                    except OSError:
+                        pass
+        return SQLiteAnimeDatabase(path)
+    return AnimeDatabase(db_path or 'anime.db', storage=backend)
 
 class AnimeDatabase:
-    def __init__(self, db_path='anime.db'):
-        self.db = TinyDB(db_path)
+    def __init__(self, db_path='anime.db', storage='json'):
+        # storage: 'json' rewrites anime.db on every (batched) write,
+        # 'journal' appends each mutation to anime.db.journal and compacts in the background
+        self.db_path = db_path
+        if storage == 'journal':
+            self.db = JournalTable(db_path)
+        else:
+            self.db = TinyDB(db_path, storage=BatchingMiddleware(JSONStorage))
         self.Anime = Query()
+        # writes may come from the import thread as well as the UI thread
+        self._lock = threading.RLock()
+        self._batch_depth = 0
+        # in-memory indexes kept in sync on every write:
+        # doc_id -> record, normalized title -> [doc_id, ...]
+        self._by_id = {}
+        self._title_index = {}
+        self._search = TrigramIndex()
+        # pre-sorted (key, doc_id) arrays per sort order, maintained with bisect
+        self._orders = {name: [] for name in _SORT_KEYS}
+        self._rebuild_index()
+        # an import was interrupted (crash, killed process): go back to the library before it
+        if os.path.exists(self.db_path + IMPORT_BACKUP_SUFFIX):
+            self._restore_import_backup()
+
+    @contextmanager
+    def batch(self):
+        """Group writes made inside the block; the database file is written once on exit.
+
+        Usage:
+            with db.batch():
+                for doc_id in ids:
+                    db.delete_anime_by_id(doc_id)
+        Batches may be nested, only the outermost one flushes. If the block raises, the
+        outermost batch discards its writes and the indexes are reloaded from storage.
+        """
+        with self._lock:
+            self.db.storage.begin_batch()
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                self.db.storage.abort_batch()
+                if self._batch_depth == 0:
+                    self._reset_table_state()
+                    self._rebuild_index()
+                raise
+            else:
+                self._batch_depth -= 1
+                self.db.storage.end_batch()
+
+    def _reset_table_state(self):
+        # the storage went back to its last flushed contents; TinyDB's table still caches
+        # the next doc_id (and query results) of the discarded writes
+        if isinstance(self.db, TinyDB):
+            table = self.db.table(self.db.default_table_name)
+            table._next_id = None
+            table.clear_cache()
+
+    def close(self):
+        with self._lock:
+            try:
+                self.db.close()
+            except Exception:
+                pass
+
+    def _rebuild_index(self):
+        with self._lock:
+            self._load_index(self.db.all())
+
+    def _load_index(self, docs):
+        # bulk (re)build: fill the hash indexes, then sort the order arrays once
+        self._by_id = {}
+        self._title_index = {}
+        self._search.clear()
+        self._orders = {name: [] for name in _SORT_KEYS}
+        for doc in docs:
+            self._index_add(doc, ordered=False)
+        for order in self._orders.values():
+            order.sort()
+
+    def _index_add(self, doc, ordered=True):
+        self._by_id[doc.doc_id] = doc
+        self._title_index.setdefault(_normalize_title(doc.get('title')), []).append(doc.doc_id)
+        self._search.add(doc.doc_id, doc)
+        for name, sort_key in _SORT_KEYS.items():
+            entry = (sort_key(doc), doc.doc_id)
+            if ordered:
+                bisect.insort(self._orders[name], entry)
+            else:
+                self._orders[name].append(entry)
+
+    def _index_remove(self, doc_id):
+        doc = self._by_id.pop(doc_id, None)
+        if doc is None:
+            return None
+        self._search.remove(doc_id)
+        for name, sort_key in _SORT_KEYS.items():
+            order = self._orders[name]
+            entry = (sort_key(doc), doc_id)
+            pos = bisect.bisect_left(order, entry)
+            if pos < len(order) and order[pos] == entry:
+                del order[pos]
+        key = _normalize_title(doc.get('title'))
+        ids = self._title_index.get(key)
+        if ids:
+            try:
+                ids.remove(doc_id)
+            except ValueError:
+                pass
+            if not ids:
+                del self._title_index[key]
+        return doc
+
+    def _ids_for_title(self, title):
+        # exact title match, resolved through the normalized title index
+        return [i for i in self._title_index.get(_normalize_title(title), ()) if self._by_id[i].get('title') == title]
 
     def add_anime(self, title, description, poster_path, screenshots_paths, tags=None):
+        """Insert a new entry and return its doc_id."""
         anime_entry = {
             'title': title,
             'description': description,
@@ -15,102 +346,294 @@ class AnimeDatabase:
             'tags': tags or [],
             'added_date': datetime.now().isoformat()
         }
-        self.db.insert(anime_entry)
+        with self._lock:
+            doc_id = self.db.insert(anime_entry)
+            self._index_add(Document(anime_entry, doc_id))
+        return doc_id
+
+    def get_anime(self, doc_id):
+        """Return the record stored under doc_id or None. Records are shared with the index, treat them as read-only."""
+        return self._by_id.get(doc_id)
+
+    def get_anime_id(self, title):
+        """Return the doc_id of the first entry with this exact title or None."""
+        ids = self._ids_for_title(title)
+        return ids[0] if ids else None
 
     def get_anime_by_title(self, title):
-        return self.db.search(self.Anime.title == title)
+        return [self._by_id[i] for i in self._ids_for_title(title)]
+
+    def search_ids(self, query):
+        """Return the set of doc_ids whose title, description or tags contain query (case-insensitive)."""
+        with self._lock:
+            return self._search.search(query)
 
     def search_anime(self, query):
-        query = query.lower()
-        return [
-            anime for anime in self.db.all()
-            if query in anime['title'].lower() or 
-               query in anime['description'].lower() or
-               any(query in tag.lower() for tag in anime.get('tags', []))
-        ]
+        ids = self.search_ids(query)
+        return [anime for doc_id, anime in self._by_id.items() if doc_id in ids]
 
     def get_all_anime(self, sort_by='title', reverse=False):
-        animes = self.db.all()
-        if sort_by == 'title':
-            animes.sort(key=lambda x: x['title'].lower(), reverse=reverse)
-        elif sort_by == 'date':
-            animes.sort(key=lambda x: x.get('added_date', ''), reverse=reverse)
-        return animes
+        with self._lock:
+            if sort_by not in ('title', 'date'):
+                return list(self._by_id.values())
+            by_id = self._by_id
+            order = self._orders[sort_by]
+            return [by_id[doc_id] for _, doc_id in (reversed(order) if reverse else order)]
+
+    def get_page(self, cursor=None, limit=50, sort_by='title', reverse=False, filter=None):
+        """Return (records, next_cursor) for one page of the collection.
+
+        sort_by is 'title', 'date' or anything else for doc_id order; filter is an optional
+        predicate record -> bool. Pass next_cursor back in to get the following page; it is
+        None once the end is reached. Cursors stay valid across writes.
+        """
+        with self._lock:
+            order = self._orders[sort_by if sort_by in _SORT_KEYS else 'id']
+            if cursor is None:
+                pos = len(order) - 1 if reverse else 0
+            elif reverse:
+                pos = bisect.bisect_left(order, tuple(cursor)) - 1
+            else:
+                pos = bisect.bisect_right(order, tuple(cursor))
+            step = -1 if reverse else 1
+            records = []
+            last = None
+            while 0 <= pos < len(order) and len(records) < limit:
+                last = order[pos]
+                doc = self._by_id[last[1]]
+                if filter is None or filter(doc):
+                    records.append(doc)
+                pos += step
+            more = 0 <= pos < len(order)
+            return records, (last if more else None)
+
+    def iter_anime(self, sort_by='title', reverse=False, filter=None, page_size=500):
+        """Yield records lazily in sorted order, fetching them page by page."""
+        cursor = None
+        while True:
+            records, cursor = self.get_page(cursor, page_size, sort_by, reverse, filter)
+            yield from records
+            if cursor is None:
+                return
 
     def get_all_tags(self):
         tags = set()
-        for anime in self.db.all():
+        for anime in self._by_id.values():
             tags.update(anime.get('tags', []))
         return sorted(list(tags))
 
     def get_anime_by_tag(self, tag):
-        return self.db.search(self.Anime.tags.any([tag]))
+        return [anime for anime in self._by_id.values() if tag in anime.get('tags', [])]
 
-    def update_anime(self, title, new_data):
+    def _apply_update(self, doc_ids, new_data):
         if 'tags' not in new_data:
             new_data['tags'] = []
-        self.db.update(new_data, self.Anime.title == title)
+        with self._lock:
+            doc_ids = [i for i in doc_ids if i in self._by_id]
+            if not doc_ids:
+                return []
+            self.db.update(new_data, doc_ids=doc_ids)
+            for i in doc_ids:
+                old = self._index_remove(i)
+                merged = dict(old)
+                merged.update(new_data)
+                self._index_add(Document(merged, i))
+            return doc_ids
+
+    def update_anime_by_id(self, doc_id, new_data):
+        """Update a single entry by doc_id. Returns True if the entry existed."""
+        return bool(self._apply_update([doc_id], new_data))
+
+    def update_anime(self, title, new_data):
+        with self._lock:
+            self._apply_update(self._ids_for_title(title), new_data)
+
+    def _apply_delete(self, doc_ids):
+        with self._lock:
+            doc_ids = [i for i in doc_ids if i in self._by_id]
+            if not doc_ids:
+                return []
+            self.db.remove(doc_ids=doc_ids)
+            for i in doc_ids:
+                self._index_remove(i)
+            return doc_ids
+
+    def delete_anime_by_id(self, doc_id):
+        """Delete a single entry by doc_id. Returns True if the entry existed."""
+        return bool(self._apply_delete([doc_id]))
+
+    def delete_anime_many(self, doc_ids):
+        """Delete several entries at once. Returns the list of doc_ids actually removed."""
+        return self._apply_delete(list(doc_ids))
 
     def delete_anime(self, title):
-        self.db.remove(self.Anime.title == title)
+        with self._lock:
+            self._apply_delete(self._ids_for_title(title))
 
     def export_to_json(self):
-        return self.db.all()
+        return list(self._by_id.values())
+
+    def _merge_chunk(self, entries, key):
+        # only changed records are rewritten: one remove + one insert for the whole chunk
+        # instead of a TinyDB table rewrite per updated document; doc_ids are kept
+        with self._lock:
+            inserts, updates, unchanged = plan_merge(entries, self.get_anime, self.get_anime_id, key)
+            if updates:
+                self.db.remove(doc_ids=list(updates))
+                for doc_id in updates:
+                    self._index_remove(doc_id)
+            docs = [Document(record, doc_id) for doc_id, record in updates.items()]
+            # explicit ids first, auto-assigned ones are then taken past them
+            doc_ids = self.db.insert_multiple(docs) if docs else []
+            doc_ids += self.db.insert_multiple(inserts) if inserts else []
+            for doc_id, record in zip(doc_ids, docs + inserts):
+                self._index_add(Document(record, doc_id), ordered=False)
+            for order in self._orders.values():
+                order.sort()
+        return {'inserted': len(inserts), 'updated': len(updates), 'unchanged': unchanged}
 
-    def import_from_json(self, data):
+    def import_from_json(self, data, mode='replace', key='title', on_chunk=None):
         """
         Import a list of anime entries from JSON-like data.
         Validates each entry and inserts only valid ones.
-        Returns a report dict: { 'imported': int, 'skipped': int, 'errors': [str, ...] }
+        mode='replace' swaps the collection for the valid entries; mode='merge' keeps the
+        collection and upserts entries matched by key ('title' or 'id'), writing only new
+        and changed records. on_chunk(entries) is called with the valid entries once written.
+        Returns a report dict: { 'imported': int, 'skipped': int, 'errors': [str, ...] },
+        plus 'inserted', 'updated' and 'unchanged' counts for a merge.
         """
         if not isinstance(data, list):
             raise ValueError('Data must be a list of anime entries')
+        if mode not in IMPORT_MODES:
+            raise ValueError(f'Unknown import mode: {mode}')
+        merge = mode == 'merge'
 
-        required_keys = {'title', 'description', 'poster_path', 'screenshots_paths', 'tags'}
         valid_entries = []
         errors = []
 
         for idx, entry in enumerate(data):
-            if not isinstance(entry, dict):
-                errors.append(f'Item {idx}: not an object')
-                continue
-            missing = required_keys - set(entry.keys())
-            if missing:
-                errors.append(f"Item {idx}: missing keys {', '.join(sorted(missing))}")
-                continue
-            # Validate types
-            if not isinstance(entry.get('title'), str) or not entry.get('title').strip():
-                errors.append(f'Item {idx}: invalid title')
-                continue
-            if not isinstance(entry.get('description'), str):
-                errors.append(f'Item {idx}: invalid description')
-                continue
-            if not isinstance(entry.get('poster_path'), str):
-                errors.append(f'Item {idx}: invalid poster_path')
+            err = validate_entry(entry, idx, merge)
+            if err:
+                errors.append(err)
                 continue
-            if not isinstance(entry.get('screenshots_paths'), list) or not all(isinstance(p, str) for p in entry.get('screenshots_paths')):
-                errors.append(f'Item {idx}: invalid screenshots_paths (must be list of strings)')
-                continue
-            if not isinstance(entry.get('tags'), list) or not all(isinstance(t, str) for t in entry.get('tags')):
-                errors.append(f'Item {idx}: invalid tags (must be list of strings)')
-                continue
-
-            # Ensure added_date exists
-            if 'added_date' not in entry or not isinstance(entry.get('added_date'), str):
-                entry['added_date'] = datetime.now().isoformat()
-
             valid_entries.append(entry)
 
+        if merge:
+            counts = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+            if valid_entries:
+                with self.batch():
+                    counts = self._merge_chunk(valid_entries, key)
+                if on_chunk is not None:
+                    on_chunk(valid_entries)
+            report = {'imported': len(valid_entries), 'skipped': len(data) - len(valid_entries), 'errors': errors}
+            report.update(counts)
+            return report
+
         # If there are valid entries, replace DB content with them (truncate then insert)
         imported = 0
         if valid_entries:
-            self.db.truncate()
-            self.db.insert_multiple(valid_entries)
+            with self.batch():
+                self.db.truncate()
+                doc_ids = self.db.insert_multiple(valid_entries)
+                self._load_index(Document(entry, doc_id) for doc_id, entry in zip(doc_ids, valid_entries))
             imported = len(valid_entries)
+            if on_chunk is not None:
+                on_chunk(valid_entries)
 
         skipped = len(data) - imported
         return {
             'imported': imported,
             'skipped': skipped,
             'errors': errors
-        }
\ No newline at end of file
+        }
+
+    def _write_import_backup(self):
+        path = self.db_path + IMPORT_BACKUP_SUFFIX
+        tmp = path + '.part'
+        with self._lock:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump({'_default': {str(k): dict(v) for k, v in self._by_id.items()}}, f, ensure_ascii=False)
+                f.flush()
+                os.fsync(f.fileno())
+        # renamed into place complete, so a torn backup is never restored
+        os.replace(tmp, path)
+
+    def _restore_import_backup(self):
+        path = self.db_path + IMPORT_BACKUP_SUFFIX
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        docs = [Document(v, int(k)) for k, v in (data.get('_default') or {}).items()]
+        with self._lock:
+            with self.batch():
+                self.db.truncate()
+                if docs:
+                    self.db.insert_multiple(docs)
+            self._rebuild_index()
+        os.remove(path)
+
+    def _drop_import_backup(self):
+        try:
+            os.remove(self.db_path + IMPORT_BACKUP_SUFFIX)
+        except OSError:
+            pass
+
+    def import_from_json_stream(self, fp, progress=None, chunk_size=5000, total_bytes=None, tell=None, mode='replace', key='title', on_chunk=None):
+        """Streaming variant of import_from_json reading a JSON array from a file object.
+
+        Memory stays bounded by chunk_size entries. Every chunk is written in its own
+        batch, so the lock is released between chunks and readers (scrolling, search) keep
+        going during a long import; on TinyDB storage the file itself is written once. The
+        import is still all or nothing: the library is saved to db_path +
+        IMPORT_BACKUP_SUFFIX first and put back if the file turns out to be malformed
+        half-way (or on the next start after a crash). Writes made by others during a
+        failed import are lost with it.
+        """
+        if mode not in IMPORT_MODES:
+            raise ValueError(f'Unknown import mode: {mode}')
+
+        def merge_chunk(entries):
+            with self.batch():
+                return self._merge_chunk(entries, key)
+
+        def begin_replace():
+            with self.batch():
+                self.db.truncate()
+                self._load_index([])
+
+        def insert_chunk(entries):
+            with self.batch():
+                doc_ids = self.db.insert_multiple(entries)
+                for doc_id, entry in zip(doc_ids, entries):
+                    self._index_add(Document(entry, doc_id), ordered=False)
+                # readers see the chunk in order; the arrays are sorted but for the new tail
+                for order in self._orders.values():
+                    order.sort()
+
+        self._write_import_backup()
+        # a TinyDB flush rewrites the whole file: its write buffer stays open across the
+        # chunks (the lock does not) and anime.db is written once at the end; journal
+        # appends are cheap, so the journal commits every chunk
+        hold = isinstance(self.db, TinyDB)
+        if hold:
+            with self._lock:
+                self.db.storage.begin_batch()
+        try:
+            if mode == 'merge':
+                report = stream_import(fp, None, merge_chunk, progress, chunk_size, total_bytes, tell,
+                                       merge=True, on_chunk=on_chunk)
+            else:
+                report = stream_import(fp, begin_replace, insert_chunk, progress, chunk_size, total_bytes, tell,
+                                       on_chunk=on_chunk)
+        except BaseException:
+            if hold:
+                with self._lock:
+                    self.db.storage.abort_batch()
+                    self._reset_table_state()
+                    self._rebuild_index()
+            self._restore_import_backup()
+            raise
+        if hold:
+            with self._lock:
+                self.db.storage.end_batch()
+        self._drop_import_backup()
+        return report
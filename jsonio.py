@@ -0,0 +1,167 @@
+"""
+Streaming JSON helpers for import/export.
+iter_json_array reads the elements of a top-level JSON array one at a time, so huge exports
+can be imported without holding the whole document (or a list of all entries) in memory.
+write_json_records is the matching writer: records are serialized one by one, as an indented
+or compact JSON array or as NDJSON, optionally gzip-compressed.
+"""
+import os
+import json
+import gzip
+import codecs
+
+_WS = ' \t\r\n'
+_SEPARATORS = _WS + ',]'
+# a decode error this close to the end of the buffer may just be a value cut off by the
+# chunk boundary ("tru", "\\u00", "-Infin"); anything earlier is malformed input
+_INCOMPLETE_TAIL = 16
+
+def iter_json_array(fp, chunk_size=1 << 16):
+    """Yield the elements of a top-level JSON array read from a binary (or text) file object.
+
+    NDJSON input (one object per line) is accepted as well. Only the element being decoded
+    is kept in memory. Raises ValueError on malformed input.
+    """
+    decoder = json.JSONDecoder()
+    utf8 = codecs.getincrementaldecoder('utf-8-sig')()
+    buf = ''
+    pos = 0
+    # characters dropped from the front of buf so far: error positions are file positions
+    consumed = 0
+    eof = False
+
+    def more():
+        nonlocal buf, pos, eof, consumed
+        consumed += pos
+        data = fp.read(chunk_size)
+        if not data:
+            eof = True
+            if isinstance(data, bytes):
+                buf = buf[pos:] + utf8.decode(b'', final=True)
+            else:
+                buf = buf[pos:]
+        else:
+            text = utf8.decode(data) if isinstance(data, bytes) else data
+            buf = buf[pos:] + text
+        pos = 0
+
+    def skip_ws():
+        nonlocal pos
+        while True:
+            while pos < len(buf) and buf[pos] in _WS:
+                pos += 1
+            if pos < len(buf) or eof:
+                return
+            more()
+
+    def decode_one(separators):
+        nonlocal pos
+        # a number cut off by the chunk boundary ("1." of "1.5e3") still decodes,
+        # so only accept a value once it is followed by a separator or EOF
+        while True:
+            try:
+                item, end = decoder.raw_decode(buf, pos)
+                if eof or (end < len(buf) and buf[end] in separators):
+                    break
+                if len(buf) - end > _INCOMPLETE_TAIL:
+                    # followed by junk, not cut off: the caller reports it
+                    break
+            except json.JSONDecodeError as e:
+                # only a value running into the end of the buffer can be completed by reading
+                # on; a malformed one fails at once instead of buffering the rest of the file
+                incomplete = e.pos >= len(buf) - _INCOMPLETE_TAIL or e.msg.startswith('Unterminated string')
+                if eof or not incomplete:
+                    raise ValueError(f'Malformed JSON near character {consumed + e.pos}: {e.msg}')
+            more()
+        pos = end
+        return item
+
+    skip_ws()
+    if pos >= len(buf):
+        # empty file, e.g. an NDJSON export of nothing
+        return
+    if buf[pos] == '{':
+        # NDJSON: one object per line
+        while True:
+            skip_ws()
+            if pos >= len(buf):
+                return
+            yield decode_one(_WS)
+    if pos >= len(buf) or buf[pos] != '[':
+        raise ValueError('Imported JSON must be a list of anime entries')
+    pos += 1
+    skip_ws()
+    if pos < len(buf) and buf[pos] == ']':
+        return
+    while True:
+        skip_ws()
+        yield decode_one(_SEPARATORS)
+        skip_ws()
+        if pos >= len(buf):
+            raise ValueError('Unexpected end of JSON array')
+        ch = buf[pos]
+        pos += 1
+        if ch == ']':
+            return
+        if ch != ',':
+            raise ValueError(f'Expected "," or "]" near character {consumed + pos - 1}')
+
+
+def open_json_source(path):
+    """Open an export for streaming import. Returns (binary file, tell) where tell() reports
+    how many bytes of the file on disk were consumed; gzip files are detected by their magic."""
+    raw = open(path, 'rb')
+    if raw.read(2) == b'\x1f\x8b':
+        raw.seek(0)
+        return gzip.GzipFile(fileobj=raw, mode='rb'), raw.tell
+    raw.seek(0)
+    return raw, raw.tell
+
+EXPORT_FORMATS = ('pretty', 'compact', 'ndjson')
+
+def export_format_for_path(path):
+    """Guess (format, compress) from a file name: *.ndjson[.gz] -> ndjson, *.gz -> gzip."""
+    compress = path.lower().endswith('.gz')
+    base = path[:-3] if compress else path
+    fmt = 'ndjson' if base.lower().endswith('.ndjson') else 'pretty'
+    return fmt, compress
+
+def write_json_records(records, path, fmt='pretty', compress=False):
+    """Serialize records to path one at a time and return how many were written.
+
+    fmt: 'pretty' (indented array, same layout as json.dump(indent=2)), 'compact'
+    (array without whitespace) or 'ndjson' (one object per line). The file is written
+    next to path and moved into place once complete.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f'Unknown export format: {fmt}')
+    tmp = path + '.part'
+    count = 0
+    opener = gzip.open if compress else open
+    try:
+        with opener(tmp, 'wt', encoding='utf-8', newline='\n') as f:
+            if fmt == 'ndjson':
+                for rec in records:
+                    f.write(json.dumps(rec, ensure_ascii=False, separators=(',', ':')))
+                    f.write('\n')
+                    count += 1
+            else:
+                f.write('[')
+                for rec in records:
+                    if count:
+                        f.write(',')
+                    if fmt == 'pretty':
+                        f.write('\n  ')
+                        f.write(json.dumps(rec, ensure_ascii=False, indent=2).replace('\n', '\n  '))
+                    else:
+                        f.write(json.dumps(rec, ensure_ascii=False, separators=(',', ':')))
+                    count += 1
+                f.write('\n]' if fmt == 'pretty' and count else ']')
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    return count
@@ -0,0 +1,82 @@
+"""
+Lazily filled screenshot carousels.
+An entry can have hundreds of screenshots; creating an image widget (and a thumbnail job)
+for each of them when the entry is selected stalls the details panel. LazyCarousel adds
+slides to a Kivy Carousel only as the user pages towards them, loads the current slide
+and its neighbors, and releases the images of slides that moved far out of view.
+"""
+from kivy.uix.image import Image
+
+# slides on each side of the current one that are loaded ahead of time
+PREFETCH_NEIGHBORS = 2
+# slides further than this from the current one give their image back
+RELEASE_DISTANCE = 5
+
+class LazyCarousel:
+    """Feeds paths to carousel a few slides at a time.
+
+    load(slide, path) is called when a slide comes within `neighbors` of the current
+    slide, release(slide) when it gets more than `release_distance` away (and for every
+    loaded slide on stop()). make_slide(path) builds a slide; by default an empty Image.
+    Every slide keeps its path in _full_source.
+    """
+    def __init__(self, carousel, paths, load, release, make_slide=None,
+                 neighbors=PREFETCH_NEIGHBORS, release_distance=RELEASE_DISTANCE):
+        self.carousel = carousel
+        self.paths = list(paths)
+        self.load = load
+        self.release = release
+        self.make_slide = make_slide or (lambda path: Image(allow_stretch=True, keep_ratio=True))
+        self.neighbors = neighbors
+        self.release_distance = max(release_distance, neighbors)
+        self._loaded = set()
+        self._running = False
+
+    def start(self):
+        self.carousel.clear_widgets()
+        self._running = True
+        self.carousel.bind(index=self._on_index)
+        self.update()
+
+    def stop(self):
+        """Unbind from the carousel and release every loaded slide; the slides stay."""
+        if not self._running:
+            return
+        self._running = False
+        self.carousel.unbind(index=self._on_index)
+        for slide in list(self.carousel.slides):
+            if id(slide) in self._loaded:
+                self._release(slide)
+
+    def _on_index(self, carousel, index):
+        self.update()
+
+    def _release(self, slide):
+        self._loaded.discard(id(slide))
+        try:
+            self.release(slide)
+        except Exception:
+            pass
+
+    def update(self):
+        if not self._running:
+            return
+        index = self.carousel.index or 0
+        # slides are only created up to the last prefetched one
+        wanted = min(len(self.paths), index + self.neighbors + 1)
+        while len(self.carousel.slides) < wanted:
+            path = self.paths[len(self.carousel.slides)]
+            slide = self.make_slide(path)
+            slide._full_source = path
+            self.carousel.add_widget(slide)
+        for i, slide in enumerate(list(self.carousel.slides)):
+            distance = abs(i - index)
+            loaded = id(slide) in self._loaded
+            if distance <= self.neighbors and not loaded:
+                self._loaded.add(id(slide))
+                try:
+                    self.load(slide, slide._full_source)
+                except Exception:
+                    pass
+            elif distance > self.release_distance and loaded:
+                self._release(slide)
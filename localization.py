@@ -51,6 +51,7 @@ TRANSLATIONS = {
         'apply': 'Apply',
         'select': 'Select',
         'export_to_json': 'Export to JSON',
+        'compress_gzip': 'Compress (gzip)',
         'import_from_json': 'Import from JSON',
         'filename': 'Filename (for save)',
         'export_successful': 'Export Successful',
@@ -60,12 +61,20 @@ TRANSLATIONS = {
         'import_completed': 'Import Completed with errors',
         'import_failed': 'Import Failed',
         'importing': 'Importing...',
+        'import_progress': '{} entries ({}%, {}/s)',
+        'import_replace': 'Replace collection',
+        'import_merge_title': 'Merge by title',
+        'import_merge_id': 'Merge by ID',
+        'import_merge_report': 'New: {}. Updated: {}. Unchanged: {}.',
         'added': 'Added',
         'anime_added': "Anime '{}' added",
         'updated': 'Updated',
         'anime_updated': "Anime '{}' updated",
         'no_items_selected': 'No items selected',
         'delete_items': 'Delete {} items?',
+        'cleanup_failed': 'Could not delete {} files (in use?)',
+        'copying_status': 'Copying images: {}/{} ({}%)',
+        'copy_failed': 'Could not copy {} images',
         'enter_tags': 'Enter tags (comma separated) to set for selected items',
         'bulk_edit_tags': 'Bulk Edit Tags',
         'imported_skipped': 'Imported: {}. Skipped: {}.',
@@ -127,6 +136,7 @@ TRANSLATIONS = {
         'apply': 'Применить',
         'select': 'Выбрать',
         'export_to_json': 'Экспортировать в JSON',
+        'compress_gzip': 'Сжать (gzip)',
         'import_from_json': 'Импортировать из JSON',
         'filename': 'Имя файла (для сохранения)',
         'export_successful': 'Экспорт успешен',
@@ -136,12 +146,20 @@ TRANSLATIONS = {
         'import_completed': 'Импорт завершен с ошибками',
         'import_failed': 'Ошибка импорта',
         'importing': 'Импортирование...',
+        'import_progress': '{} записей ({}%, {}/с)',
+        'import_replace': 'Заменить коллекцию',
+        'import_merge_title': 'Объединить по названию',
+        'import_merge_id': 'Объединить по ID',
+        'import_merge_report': 'Новых: {}. Обновлено: {}. Без изменений: {}.',
         'added': 'Добавлено',
         'anime_added': "Аниме '{}' добавлено",
         'updated': 'Обновлено',
         'anime_updated': "Аниме '{}' обновлено",
         'no_items_selected': 'Элементы не выбраны',
         'delete_items': 'Удалить {} элементов?',
+        'cleanup_failed': 'Не удалось удалить файлов: {} (заняты?)',
+        'copying_status': 'Копирование изображений: {}/{} ({}%)',
+        'copy_failed': 'Не удалось скопировать изображений: {}',
         'enter_tags': 'Введите теги (разделённые запятыми) для выбранных элементов',
         'bulk_edit_tags': 'Массовое редактирование тегов',
         'imported_skipped': 'Импортировано: {}. Пропущено: {}.',
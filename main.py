@@ -13,31 +13,53 @@ from kivy.uix.carousel import Carousel
 from kivy.uix.modalview import ModalView
 from kivy.uix.image import AsyncImage
 from kivy.uix.screenmanager import ScreenManager, Screen
-from kivy.core.window import Window
 from kivy.uix.behaviors import ButtonBehavior
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
 from kivy.uix.image import Image as CoreImage
 from kivy.graphics import Color, Rectangle
 from kivy.properties import ObjectProperty, BooleanProperty, ListProperty, StringProperty
 from kivy.uix.filechooser import FileChooserListView
-from database import AnimeDatabase
+from database import AnimeDatabase, open_database, export_record, sort_key
 from kivy.clock import Clock
+from kivy.cache import Cache
 from kivy.uix.widget import Widget
 from localization import set_language, tr
+from jsonio import write_json_records, export_format_for_path
 import json
 import ctypes
+import difflib
+import multiprocessing
 import os
 import threading
 import functools
-from utils import get_thumbnail_path, create_thumbnail, ensure_thumbs_dir, delete_thumbnail, regen_thumbnails_for_paths, copy_source_to_local, delete_copy, regen_copies_for_paths, get_copy_path
+import utils
+from utils import get_thumbnail_path, find_thumbnail, regen_thumbnails_for_paths, copy_source_to_local, delete_media, _in_copies_dir
+from thumbnail_queue import ThumbnailQueue, PRIORITY_VISIBLE, PRIORITY_OFFSCREEN
+from poster_atlas import PosterAtlas
+from media_gc import MediaGC, collect_references
+from copy_pipeline import CopyPipeline
+from texture_cache import get_texture_cache
+from lazy_carousel import LazyCarousel
 # popups moved to separate module
 from popups import FileChooserPopup, AddAnimePopup, EditAnimePopup, ExportPopup, ImportPopup, TagFilterPopup
 
-# Set a slightly larger default window size (preserve proportion) and keep borderless
-Window.size = (1600, 960)
-Window.borderless = True
+# thumbnail worker processes (spawn) import this module as __mp_main__; only the app
+# process may create the window
+if __name__ != '__mp_main__':
+    from kivy.core.window import Window
+    # Set a slightly larger default window size (preserve proportion) and keep borderless
+    Window.size = (1600, 960)
+    Window.borderless = True
 
 user32 = ctypes.windll.user32
 
+# number of cards created per page of the grid
+CARD_PAGE_SIZE = 60
+# seconds the search box has to be idle before a search runs
+SEARCH_DEBOUNCE = 0.25
+# seconds after startup before the media garbage collector runs (settings.json: media_gc)
+MEDIA_GC_DELAY = 30
+
 class DraggableTitleBar(Widget):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -84,9 +106,53 @@ class DetailPopup(ModalView):
         self.anime = anime_data
         self.main_screen = main_screen
 
+        self._screenshots = None
+        self.bind(on_dismiss=self._stop_screenshots)
+
         # build content via kv rule; populate ids after kv applied
         Clock.schedule_once(self._populate_kv, 0)
 
+    def _stop_screenshots(self, *args):
+        if self._screenshots is not None:
+            self._screenshots.stop()
+
+    def _make_slide(self, src):
+        img = Image(allow_stretch=True, keep_ratio=True)
+        # Store touch state to prevent multiple opens during scrolling
+        img._touch_pos = None
+        # open original on touch UP (not DOWN) to avoid scroll conflicts
+        def _on_touch_down(inst, touch):
+            if inst.collide_point(*touch.pos):
+                inst._touch_pos = touch.pos
+                return True
+            return False
+        def _on_touch_up(inst, touch):
+            if inst.collide_point(*touch.pos) and inst._touch_pos:
+                # Only open if touch didn't move much (wasn't a scroll)
+                dx = abs(touch.x - inst._touch_pos[0])
+                dy = abs(touch.y - inst._touch_pos[1])
+                if dx < 5 and dy < 5:  # Less than 5 pixels movement
+                    path = getattr(inst, '_full_source', None)
+                    if path and os.path.exists(path):
+                        try:
+                            os.startfile(path)
+                        except Exception:
+                            pass
+                inst._touch_pos = None
+                return True
+            return False
+        img.bind(on_touch_down=_on_touch_down)
+        img.bind(on_touch_up=_on_touch_up)
+        return img
+
+    def _load_slide(self, img, src):
+        thumb = find_thumbnail(src, 'preview') if src else None
+        # decoded in the background and shared with the details panel through the texture cache
+        get_texture_cache().show(img, thumb or src or '', 'preview' if thumb else 'original')
+
+    def _release_slide(self, img):
+        get_texture_cache().show(img, '')
+
     def _populate_kv(self, dt):
         try:
             # title
@@ -94,58 +160,27 @@ class DetailPopup(ModalView):
                 self.ids.detail_title.text = self.anime.get('title', '')
             # poster
             poster_src = self.anime.get('poster_path', '')
-            poster_thumb = get_thumbnail_path(poster_src) if poster_src else ''
-            if poster_src and os.path.exists(poster_thumb):
-                self.ids.detail_poster.source = poster_thumb
+            # the popup is nearly full screen: the preview variant of the pyramid
+            poster_thumb = find_thumbnail(poster_src, 'preview') if poster_src else None
+            if poster_thumb:
+                get_texture_cache().show(self.ids.detail_poster, poster_thumb, 'preview')
                 self.ids.detail_poster.opacity = 1
                 self.ids.detail_poster._full_source = poster_src
-            elif poster_src and os.path.exists(poster_src):
-                self.ids.detail_poster.source = poster_src
+            elif poster_src and utils.get_path_resolver().exists(poster_src):
+                get_texture_cache().show(self.ids.detail_poster, poster_src)
                 self.ids.detail_poster._full_source = poster_src
                 self.ids.detail_poster.opacity = 1
             else:
                 # hide poster area
-                self.ids.detail_poster.source = ''
+                get_texture_cache().show(self.ids.detail_poster, '')
                 self.ids.detail_poster.opacity = 0
 
-            # carousel (screenshots)
-            carousel = self.ids.detail_carousel
-            carousel.clear_widgets()
-            for src in self.anime.get('screenshots_paths', []):
-                try:
-                    thumb = get_thumbnail_path(src) if src else ''
-                    img_src = thumb if thumb and os.path.exists(thumb) else (src or '')
-                    from kivy.uix.image import AsyncImage
-                    img = AsyncImage(source=img_src, allow_stretch=True, keep_ratio=True)
-                    img._full_source = src
-                    # Store touch state to prevent multiple opens during scrolling
-                    img._touch_pos = None
-                    # open original on touch UP (not DOWN) to avoid scroll conflicts
-                    def _on_touch_down(inst, touch):
-                        if inst.collide_point(*touch.pos):
-                            inst._touch_pos = touch.pos
-                            return True
-                        return False
-                    def _on_touch_up(inst, touch):
-                        if inst.collide_point(*touch.pos) and inst._touch_pos:
-                            # Only open if touch didn't move much (wasn't a scroll)
-                            dx = abs(touch.x - inst._touch_pos[0])
-                            dy = abs(touch.y - inst._touch_pos[1])
-                            if dx < 5 and dy < 5:  # Less than 5 pixels movement
-                                path = getattr(inst, '_full_source', None)
-                                if path and os.path.exists(path):
-                                    try:
-                                        os.startfile(path)
-                                    except Exception:
-                                        pass
-                            inst._touch_pos = None
-                            return True
-                        return False
-                    img.bind(on_touch_down=_on_touch_down)
-                    img.bind(on_touch_up=_on_touch_up)
-                    carousel.add_widget(img)
-                except Exception:
-                    continue
+            # carousel (screenshots): slides are created and loaded as the user pages to them
+            if self._screenshots is not None:
+                self._screenshots.stop()
+            self._screenshots = LazyCarousel(self.ids.detail_carousel, self.anime.get('screenshots_paths', []),
+                                             self._load_slide, self._release_slide, make_slide=self._make_slide)
+            self._screenshots.start()
 
             # tags and description
             if hasattr(self.ids, 'detail_tags'):
@@ -170,19 +205,73 @@ class DetailPopup(ModalView):
             pass
 
 
-class AnimeCard(ButtonBehavior, BoxLayout):
-    def __init__(self, anime_data, main_screen, **kwargs):
+class _SearchSuperseded(Exception):
+    """Aborts a background search once a newer query was typed."""
+
+def _record_key(anime):
+    # records are identified by doc_id; title only for records without one
+    doc_id = getattr(anime, 'doc_id', None)
+    return doc_id if doc_id is not None else anime.get('title')
+
+def _reconcile(data, items):
+    """Turn the RecycleView data list into items with as few edits as possible.
+
+    Items are matched by the _record_key of their record: runs that did not move are left
+    alone (an unchanged record keeps its data item, so its card is not rebound), moved,
+    inserted and removed records become slice edits, and a record whose contents changed
+    replaces just its own item. Returns the number of items that were touched.
+    """
+    old_keys = [_record_key(d['anime_data']) for d in data]
+    new_keys = [_record_key(d['anime_data']) for d in items]
+    if old_keys == new_keys:
+        # nothing inserted, removed or moved (e.g. records edited in place): no diff needed
+        opcodes = [('equal', 0, len(data), 0, len(items))]
+    else:
+        opcodes = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False).get_opcodes()
+    touched = 0
+    # edit from the end so the indexes of the remaining opcodes stay valid
+    for tag, i1, i2, j1, j2 in reversed(opcodes):
+        if tag == 'equal':
+            for i, j in zip(range(i1, i2), range(j1, j2)):
+                old, new = data[i]['anime_data'], items[j]['anime_data']
+                if old is not new and old != new:
+                    data[i] = items[j]
+                    touched += 1
+        else:
+            data[i1:i2] = items[j1:j2]
+            touched += max(i2 - i1, j2 - j1)
+    return touched
+
+class AnimeCard(RecycleDataViewBehavior, ButtonBehavior, BoxLayout):
+    """One recycled card of the grid: the RecycleView keeps only enough of them to fill the
+    viewport and rebinds them to other records (refresh_view_attrs) while scrolling."""
+    def __init__(self, **kwargs):
         super(AnimeCard, self).__init__(**kwargs)
-        self.anime_data = anime_data
-        self.main_screen = main_screen
-        # ensure kv-built ids are populated next frame
-        Clock.schedule_once(self._populate_from_data, 0)
+        self.anime_data = {}
+        self.main_screen = None
+        self.index = None
+        self._thumb_missing = False
         # bind a unified handler that supports selection mode
         self.bind(on_press=self.on_card_click)
         # double-click support
         self._last_click = 0.0
         self._double_click_interval = 0.35
 
+    def refresh_view_attrs(self, rv, index, data):
+        """Bind the card to the record at data (a RecycleView data item)."""
+        self.index = index
+        if data['anime_data'] is not self.anime_data:
+            if self.main_screen is not None:
+                # the card now shows another record: its pending thumbnail is not wanted any more
+                self.main_screen.thumbnail_queue.cancel(self)
+            self._thumb_missing = False
+            self._last_click = 0.0
+            self.main_screen = data['main_screen']
+            self.anime_data = data['anime_data']
+            self._populate_from_data(0)
+        # same record as before (e.g. the data list was reconciled around it): nothing to reload
+        self.set_selected(_record_key(self.anime_data) in self.main_screen.selected_records)
+
     def _populate_from_data(self, dt):
         try:
             # set title and tags
@@ -193,42 +282,80 @@ class AnimeCard(ButtonBehavior, BoxLayout):
                 self.ids.tags_label.text = tags_text
             # poster thumbnail handling
             poster_src = self.anime_data.get('poster_path', '')
-            thumb = get_thumbnail_path(poster_src) if poster_src else ''
-            if poster_src and os.path.exists(thumb):
+            # manifest lookup; a thumbnail of an older version of the poster counts as missing
+            thumb = find_thumbnail(poster_src) if poster_src else None
+            if thumb:
                 if 'poster' in self.ids:
-                    self.ids.poster.source = thumb
+                    # a region of a shared atlas page when packed, the cached thumbnail texture otherwise
+                    region = self.main_screen.poster_atlas.source_for(poster_src, thumb)
+                    if region:
+                        self.ids.poster._texture_key = None
+                        self.ids.poster.source = region
+                    else:
+                        get_texture_cache().show(self.ids.poster, thumb, 'card')
                     self.ids.poster.opacity = 1
                     self.ids.poster._full_source = poster_src
             elif poster_src:
                 # placeholder until thumbnail created
                 if 'poster' in self.ids:
-                    self.ids.poster.source = ''
+                    get_texture_cache().show(self.ids.poster, '')
                     self.ids.poster.opacity = 0
                     self.ids.poster._full_source = poster_src
-                # spawn background thumbnail creation
-                def make_thumb():
-                    try:
-                        ensure_thumbs_dir()
-                        local_src = copy_source_to_local(poster_src) or poster_src
-                        create_thumbnail(local_src, thumb)
-                        def set_thumb(dt):
-                            try:
-                                if 'poster' in self.ids:
-                                    self.ids.poster.source = thumb
-                                    self.ids.poster.opacity = 1
-                            except Exception:
-                                pass
-                        Clock.schedule_once(set_thumb, 0)
-                    except Exception:
-                        pass
-                threading.Thread(target=make_thumb, daemon=True).start()
+                # queued on the shared thumbnail workers; raised to visible priority once on screen
+                self._thumb_missing = True
+                self.request_thumbnail(PRIORITY_OFFSCREEN)
             else:
                 if 'poster' in self.ids:
-                    self.ids.poster.source = ''
+                    get_texture_cache().show(self.ids.poster, '')
                     self.ids.poster.opacity = 0
         except Exception:
             pass
 
+    def request_thumbnail(self, priority=PRIORITY_VISIBLE):
+        """Ask the shared queue for the poster thumbnail (again); no-op once it is shown."""
+        if not getattr(self, '_thumb_missing', False):
+            return
+        poster_src = self.anime_data.get('poster_path', '')
+        self.main_screen.thumbnail_queue.request(
+            poster_src, get_thumbnail_path(poster_src), self._on_thumbnail, owner=self,
+            priority=priority, prepare=functools.partial(copy_source_to_local, poster_src, add_ref=False))
+
+    def _on_thumbnail(self, thumbs, error):
+        # called on a queue worker
+        if not thumbs:
+            return
+        thumb = thumbs['card']
+        def set_thumb(dt):
+            try:
+                # the card may have been recycled for another record meanwhile
+                poster_src = self.anime_data.get('poster_path', '')
+                if not poster_src or get_thumbnail_path(poster_src) != thumb:
+                    return
+                self._thumb_missing = False
+                if 'poster' in self.ids:
+                    get_texture_cache().show(self.ids.poster, thumb, 'card')
+                    self.ids.poster.opacity = 1
+                # pack the new thumbnail into the atlas with the next sync
+                self.main_screen._atlas_trigger()
+            except Exception:
+                pass
+        Clock.schedule_once(set_thumb, 0)
+
+    def use_atlas_poster(self):
+        """Switch a poster shown from its thumbnail texture to its atlas region, if packed."""
+        try:
+            poster = self.ids.poster
+            key = getattr(poster, '_texture_key', None)
+            if not key:
+                return
+            poster_src = self.anime_data.get('poster_path', '')
+            region = self.main_screen.poster_atlas.source_for(poster_src, key[0]) if poster_src else None
+            if region:
+                poster._texture_key = None
+                poster.source = region
+        except Exception:
+            pass
+
     def on_card_click(self, instance):
         # double-click detection
         import time
@@ -304,6 +431,9 @@ class AnimeApp(App):
     # Additional strings for popups and messages
     str_export_to_json = StringProperty('Export to JSON')
     str_import_from_json = StringProperty('Import from JSON')
+    str_import_replace = StringProperty('Replace collection')
+    str_import_merge_title = StringProperty('Merge by title')
+    str_import_merge_id = StringProperty('Merge by ID')
     str_confirm_delete = StringProperty('Confirm Delete')
     str_filter_by_tags = StringProperty('Filter by tags')
     str_apply = StringProperty('Apply')
@@ -311,6 +441,7 @@ class AnimeApp(App):
     str_yes = StringProperty('Yes')
     str_no = StringProperty('No')
     str_close = StringProperty('Close')
+    str_compress_gzip = StringProperty('Compress (gzip)')
     str_importing = StringProperty('Importing...')
     str_exported_to = StringProperty('Exported to {}')
     str_import_successful = StringProperty('Import Successful')
@@ -333,7 +464,19 @@ class AnimeApp(App):
     str_delete_button = StringProperty('Delete Anime')
 
     def build(self):
-        self.db = AnimeDatabase()
+        # storage backend is chosen in settings.json: 'json' (default), 'journal' or 'sqlite'
+        backend = 'json'
+        try:
+            settings_path = os.path.join(os.getcwd(), 'settings.json')
+            if os.path.exists(settings_path):
+                with open(settings_path, 'r', encoding='utf-8') as f:
+                    backend = json.load(f).get('db_backend', 'json') or 'json'
+        except Exception:
+            pass
+        try:
+            self.db = open_database(backend)
+        except Exception:
+            self.db = AnimeDatabase()
         # Initialize all translatable strings
         self._update_strings()
         return MainScreen(db=self.db)
@@ -419,6 +562,9 @@ class AnimeApp(App):
             # Additional strings for popups
             self.str_export_to_json = tr('export_to_json')
             self.str_import_from_json = tr('import_from_json')
+            self.str_import_replace = tr('import_replace')
+            self.str_import_merge_title = tr('import_merge_title')
+            self.str_import_merge_id = tr('import_merge_id')
             self.str_confirm_delete = tr('confirm_delete')
             self.str_filter_by_tags = tr('filter_by_tags')
             self.str_apply = tr('apply')
@@ -426,6 +572,7 @@ class AnimeApp(App):
             self.str_yes = tr('yes')
             self.str_no = tr('no')
             self.str_close = tr('close')
+            self.str_compress_gzip = tr('compress_gzip')
             self.str_importing = tr('importing')
             self.str_import_successful = tr('import_successful')
             self.str_import_failed = tr('import_failed')
@@ -449,21 +596,48 @@ class MainScreen(Screen):
     def __init__(self, db, **kwargs):
         super(MainScreen, self).__init__(**kwargs)
         self.db = db
-        self.anime_titles = [anime['title'] for anime in self.db.get_all_anime()]
+        self.anime_titles = [anime['title'] for anime in self.db.iter_anime()]
         self.current_sort = 'title'
         self.sort_reverse = False
         self.current_tag = None
         self.current_tags = []
         self.multi_select_mode = False
-        self.selected_cards = set()
+        # feeds the details panel carousel (see lazy_carousel)
+        self._screenshots = None
+        # search box state: every keystroke or reload bumps the generation, stale results are dropped
+        self._search_gen = 0
+        self._search_query = ''
+        self._search_event = None
+        # records picked in multi-select mode, by _record_key (cards are recycled, records are not)
+        self.selected_records = {}
+        self.current_anime_id = None
+        # one bounded pool of thumbnail workers shared by all cards and the details carousel
+        self.thumbnail_queue = ThumbnailQueue()
+        self._visible_thumbs_trigger = Clock.create_trigger(self._prioritize_visible_thumbs, 0.1)
+        # images of saved entries are copied in the background; finished files are applied in batches
+        self.copy_pipeline = CopyPipeline()
+        self._copied = []
+        self._copied_lock = threading.Lock()
+        self._copies_trigger = Clock.create_trigger(self._apply_copies, 0.5)
+        self._copy_status_event = None
+        # card posters packed into a few atlas pages, re-synced in the background as entries change
+        self.poster_atlas = PosterAtlas()
+        self._atlas_trigger = Clock.create_trigger(self._sync_poster_atlas, 2.0)
+        self._atlas_busy = False
+        self._atlas_again = False
         self.settings_path = os.path.join(os.getcwd(), 'settings.json')
         self.settings = {}
         self.load_settings()
         # Apply settings after kv ids exist
         Clock.schedule_once(lambda dt: self.apply_settings(), 0)
         Clock.schedule_once(lambda dt: self.load_anime_cards(), 0)
+        self._atlas_trigger()
         # start watching window position/size to persist into settings
         Clock.schedule_once(lambda dt: self._start_window_watch(), 0.5)
+        # sweep unreferenced thumbnails and copies once the startup work has settled
+        self.media_gc = None
+        if self.settings.get('media_gc', True):
+            Clock.schedule_once(lambda dt: self.start_media_gc(), MEDIA_GC_DELAY)
 
     def load_settings(self):
         try:
@@ -477,6 +651,12 @@ class MainScreen(Screen):
             self.sort_reverse = self.settings.get('sort_reverse', False)
             self.current_tag = self.settings.get('selected_tag', None)
             self.current_tags = self.settings.get('selected_tags', []) or []
+            # thumbnail engine: worker processes and per-image timeout
+            utils.THUMBNAIL_WORKERS = self.settings.get('thumbnail_workers') or None
+            utils.THUMBNAIL_TIMEOUT = self.settings.get('thumbnail_timeout') or utils.THUMBNAIL_TIMEOUT
+            # memory kept for decoded posters and screenshots, in MB
+            if self.settings.get('texture_cache_mb'):
+                get_texture_cache().set_budget(self.settings['texture_cache_mb'] * 1024 * 1024)
             # load language preference
             language = self.settings.get('language', 'en')
             if language in ['en', 'ru']:
@@ -564,40 +744,185 @@ class MainScreen(Screen):
         btn.bind(on_release=popup.dismiss)
         popup.open()
 
-    def load_anime_cards(self, search_query='', tag_filter=None):
-        grid_layout = self.ids.grid_layout
-        grid_layout.clear_widgets()
-
-        # Get anime with current sort settings
-        animes = self.db.get_all_anime(sort_by=self.current_sort, reverse=self.sort_reverse)
-
-        # Apply search filter (filter the already-sorted list so sorting is preserved)
-        if search_query:
-            q = search_query.lower()
-            animes = [a for a in animes if q in a.get('title','').lower() or q in a.get('description','').lower() or any(q in t.lower() for t in a.get('tags', []))]
-
-        # Apply tag filter (filter the current list)
-        # tag_filter may be a single tag or a list of tags
-        if tag_filter:
-            if isinstance(tag_filter, (list, tuple)) and tag_filter:
-                # match if anime has any of the selected tags (OR)
-                animes = [a for a in animes if any(t in a.get('tags', []) for t in tag_filter)]
-            else:
-                animes = [a for a in animes if tag_filter in a.get('tags', [])]
-
-        # Create cards normally
-        for anime in animes:
-            card = AnimeCard(anime, self)
-            grid_layout.add_widget(card)
+    def _card_filter(self, search_query='', tag_filter=None):
+        """Build a record predicate for the search text and tag filter, or None if nothing filters."""
+        matched = self.db.search_ids(search_query) if search_query else None
+        # tag_filter may be a single tag or a list of tags (any of them matches)
+        if isinstance(tag_filter, (list, tuple)):
+            tags = set(tag_filter)
+        elif tag_filter:
+            tags = {tag_filter}
+        else:
+            tags = None
+        if matched is None and not tags:
+            return None
+
+        def accept(anime):
+            if matched is not None and getattr(anime, 'doc_id', None) not in matched:
+                return False
+            if tags and not any(t in tags for t in anime.get('tags', [])):
+                return False
+            return True
+        return accept
+
+    def load_anime_cards(self, search_query='', tag_filter=None, keep_position=False):
+        """Show the records matching the search text and tag filter in the current order.
+
+        The grid is reconciled with the new list rather than rebuilt, so cards of records
+        that are still shown keep their widgets and loaded posters. keep_position keeps the
+        scroll position and as many loaded records as before (refresh after an edit).
+        """
+        # records are fetched a page at a time in the current sort order; more pages load on scroll
+        wanted = max(len(self.ids.grid_scroll.data), CARD_PAGE_SIZE) if keep_position else CARD_PAGE_SIZE
+        # a direct reload supersedes any search still waiting or running
+        self._search_gen += 1
+        if self._search_event is not None:
+            self._search_event.cancel()
+            self._search_event = None
+        page_filter = self._card_filter(search_query, tag_filter)
+        records, cursor = self.db.get_page(
+            None, wanted, sort_by=self.current_sort, reverse=self.sort_reverse, filter=page_filter)
+        self._show_records(page_filter, records, cursor, keep_position)
 
         # Update anime selector spinner values without force-resetting the user's selection
-        anime_titles = [a['title'] for a in self.db.get_all_anime()]
+        anime_titles = [a['title'] for a in self.db.iter_anime()]
         values = ['Select Anime'] + anime_titles if anime_titles else ['No anime available']
         self.ids.anime_spinner.values = values
         if self.ids.anime_spinner.text not in values:
             # reset only if current selection disappeared
             self.ids.anime_spinner.text = values[0]
 
+    def _show_records(self, page_filter, records, cursor, keep_position=False):
+        """Reconcile the grid with the first page(s) of a result; later pages load on scroll."""
+        rv = self.ids.grid_scroll
+        self._page_filter = page_filter
+        self._page_cursor = cursor
+        self._pages_done = cursor is None
+        _reconcile(rv.data, [{'anime_data': anime, 'main_screen': self} for anime in records])
+        if not keep_position:
+            try:
+                rv.scroll_y = 1
+            except Exception:
+                pass
+        if not self._pages_done:
+            Clock.schedule_once(self._fill_viewport, 0)
+        self._visible_thumbs_trigger()
+
+    def _run_search(self, dt):
+        """Match the typed query on a worker thread; only the newest query's result is shown."""
+        self._search_event = None
+        gen = self._search_gen
+        query, tags = self._search_query, list(self.current_tags)
+        sort_by, reverse = self.current_sort, self.sort_reverse
+
+        def worker():
+            try:
+                page_filter = self._card_filter(query, tags)
+
+                def accept(anime):
+                    # typing went on: stop scanning for a result nobody will see
+                    if gen != self._search_gen:
+                        raise _SearchSuperseded()
+                    return page_filter is None or page_filter(anime)
+
+                records, cursor = self.db.get_page(None, CARD_PAGE_SIZE, sort_by=sort_by, reverse=reverse, filter=accept)
+            except Exception:
+                return
+
+            def apply(dt):
+                if gen == self._search_gen:
+                    self._show_records(page_filter, records, cursor)
+            Clock.schedule_once(apply, 0)
+
+        threading.Thread(target=worker, name='search', daemon=True).start()
+
+    def load_next_page(self, *args):
+        if getattr(self, '_pages_done', True):
+            return
+        records, self._page_cursor = self.db.get_page(
+            self._page_cursor, CARD_PAGE_SIZE,
+            sort_by=self.current_sort, reverse=self.sort_reverse, filter=self._page_filter)
+        self._pages_done = self._page_cursor is None
+        # only data items are added; the RecycleView binds them to its few card widgets
+        self.ids.grid_scroll.data.extend({'anime_data': anime, 'main_screen': self} for anime in records)
+        # keep loading until the viewport is filled (layout height settles next frame)
+        if not self._pages_done:
+            Clock.schedule_once(self._fill_viewport, 0)
+        self._visible_thumbs_trigger()
+
+    def start_media_gc(self, dry_run=False, on_done=None):
+        """Run (or resume) the media garbage collector in the background."""
+        if self.media_gc is not None and self.media_gc.thread and self.media_gc.thread.is_alive():
+            return
+        try:
+            self.media_gc = MediaGC(collect_references(self.db), dry_run=dry_run)
+            self.media_gc.start(on_done)
+        except Exception:
+            self.media_gc = None
+
+    def _sync_poster_atlas(self, dt):
+        """Pack the card thumbnails of all entries into the atlas on a background thread."""
+        if self._atlas_busy:
+            self._atlas_again = True
+            return
+        self._atlas_busy = True
+        self._atlas_again = False
+        # in grid order, so cards shown together share atlas pages
+        posters = [a.get('poster_path') for a in self.db.iter_anime(sort_by=self.current_sort, reverse=self.sort_reverse)]
+
+        def worker():
+            result = None
+            try:
+                result = self.poster_atlas.sync((p, find_thumbnail(p)) for p in posters if p)
+            except Exception:
+                pass
+            Clock.schedule_once(lambda dt: self._publish_poster_atlas(result), 0)
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def _publish_poster_atlas(self, result):
+        try:
+            if result and result['pages']:
+                # pages were rewritten: drop Kivy's cached copies before cards look them up
+                for url in result['pages']:
+                    Cache.remove('kv.atlas', url)
+                self.poster_atlas.publish()
+                for card in self.ids.grid_layout.children:
+                    card.use_atlas_poster()
+        except Exception:
+            pass
+        self._atlas_busy = False
+        if self._atlas_again:
+            self._atlas_trigger()
+
+    def _fill_viewport(self, dt):
+        try:
+            if self.ids.grid_layout.height <= self.ids.grid_scroll.height:
+                self.load_next_page()
+        except Exception:
+            pass
+
+    def on_grid_scroll(self, scroll_view, scroll_y):
+        # scroll_y is 1 at the top and 0 at the bottom
+        if scroll_y <= 0.1 and not getattr(self, '_pages_done', True):
+            self.load_next_page()
+        self._visible_thumbs_trigger()
+
+    def _prioritize_visible_thumbs(self, dt):
+        """Move the thumbnails of cards inside the grid viewport to the front of the queue."""
+        try:
+            scroll = self.ids.grid_scroll
+            _, view_bottom = scroll.to_window(scroll.x, scroll.y)
+            view_top = view_bottom + scroll.height
+            for card in self.ids.grid_layout.children:
+                if not getattr(card, '_thumb_missing', False):
+                    continue
+                _, bottom = card.to_window(card.x, card.y)
+                if bottom <= view_top and bottom + card.height >= view_bottom:
+                    card.request_thumbnail(PRIORITY_VISIBLE)
+        except Exception:
+            pass
+
     def open_tag_filter(self, instance):
         tags = self.db.get_all_tags()
         content = TagFilterPopup(owner=self, tags=tags, selected=self.current_tags)
@@ -607,7 +932,7 @@ class MainScreen(Screen):
 
     def enter_multi_select(self, instance=None):
         self.multi_select_mode = not self.multi_select_mode
-        self.selected_cards.clear()
+        self.selected_records.clear()
         # reset all card visuals
         try:
             for child in self.ids.grid_layout.children:
@@ -617,20 +942,22 @@ class MainScreen(Screen):
             pass
 
     def toggle_card_selection(self, card):
-        if card in self.selected_cards:
-            self.selected_cards.remove(card)
+        key = _record_key(card.anime_data)
+        if key in self.selected_records:
+            del self.selected_records[key]
             card.set_selected(False)
         else:
-            self.selected_cards.add(card)
+            self.selected_records[key] = card.anime_data
             card.set_selected(True)
 
     def bulk_delete(self, instance=None):
-        if not self.selected_cards:
+        if not self.selected_records:
             from kivy.app import App
             app = App.get_running_app()
             self.show_message(app.str_bulk_delete, app.str_no_items_selected)
             return
-        titles = [c.anime_data.get('title') for c in list(self.selected_cards)]
+        records = list(self.selected_records.values())
+        titles = [r.get('title') for r in records]
         content = BoxLayout(orientation='vertical', spacing=10, padding=10)
         from kivy.app import App
         app = App.get_running_app()
@@ -664,43 +991,141 @@ class MainScreen(Screen):
             popup.title = app.str_bulk_delete
         app.bind(str_bulk_delete=update_title)
 
+        doc_ids = [getattr(r, 'doc_id', None) for r in records]
+
         def do_delete(inst):
-            for t in titles:
-                try:
-                    recs = self.db.get_anime_by_title(t)
-                    if recs:
-                        rec = recs[0]
-                        try:
-                            delete_thumbnail(rec.get('poster_path', ''))
-                        except Exception:
-                            pass
-                        try:
-                            delete_copy(rec.get('poster_path', ''))
-                        except Exception:
-                            pass
-                        for sp in rec.get('screenshots_paths', []):
-                            try:
-                                delete_thumbnail(sp)
-                            except Exception:
-                                pass
-                            try:
-                                delete_copy(sp)
-                            except Exception:
-                                pass
-                    self.db.delete_anime(t)
-                except Exception:
-                    pass
+            media = []
+            with self.db.batch():
+                for doc_id, t in zip(doc_ids, titles):
+                    try:
+                        rec = self.db.get_anime(doc_id) if doc_id is not None else None
+                        if rec is None:
+                            doc_id = self.db.get_anime_id(t)
+                            rec = self.db.get_anime(doc_id) if doc_id is not None else None
+                        if rec:
+                            media.append(rec.get('poster_path', ''))
+                            media.extend(rec.get('screenshots_paths', []))
+                            self.db.delete_anime_by_id(doc_id)
+                    except Exception:
+                        pass
+            # thumbnails and copies of the whole selection go in one background batch
+            self.delete_media_async(media)
             popup.dismiss()
             self.multi_select_mode = False
-            self.selected_cards.clear()
+            self.selected_records.clear()
             self.refresh_content()
 
         ok.bind(on_release=do_delete)
         cancel.bind(on_release=popup.dismiss)
         popup.open()
 
+    def copy_media_async(self, doc_id, paths):
+        """Copy the images of a saved record into copies/ in the background.
+
+        The record keeps its original paths meanwhile and is pointed at each local copy
+        as it is finished. Paths that already are local copies get their thumbnails and
+        one more reference (paths must be new to the record).
+        """
+        paths = [p for p in paths if p]
+        local = [p for p in paths if _in_copies_dir(p)]
+        remote = [p for p in paths if not _in_copies_dir(p)]
+        if local:
+            utils.retain_media(local)
+            threading.Thread(target=regen_thumbnails_for_paths, args=(local,), daemon=True).start()
+        if not remote or doc_id is None:
+            return
+        self.copy_pipeline.submit(remote, functools.partial(self._on_media_copied, doc_id))
+        if self._copy_status_event is None:
+            self._copy_status_event = Clock.schedule_interval(self._update_copy_status, 0.25)
+
+    def _on_media_copied(self, doc_id, src, copy, error):
+        # called on a copy worker
+        with self._copied_lock:
+            self._copied.append((doc_id, src, copy))
+        Clock.schedule_once(lambda dt: self._copies_trigger(), 0)
+
+    def _apply_copies(self, dt):
+        """Replace the original paths of records by the local copies finished so far."""
+        with self._copied_lock:
+            done, self._copied = self._copied, []
+        by_doc = {}
+        for doc_id, src, copy in done:
+            if copy and copy != src:
+                by_doc.setdefault(doc_id, []).append((src, copy))
+        updated = {}
+        release = []
+        try:
+            with self.db.batch():
+                for doc_id, pairs in by_doc.items():
+                    rec = self.db.get_anime(doc_id)
+                    if rec is None:
+                        # deleted while copying: the copies are not referenced by anything
+                        release.extend(copy for _, copy in pairs)
+                        continue
+                    poster = rec.get('poster_path', '')
+                    screens = list(rec.get('screenshots_paths', []))
+                    for src, copy in pairs:
+                        if poster == src:
+                            poster = copy
+                        elif src in screens:
+                            screens[screens.index(src)] = copy
+                        else:
+                            # edited away in the meantime
+                            release.append(copy)
+                    self.db.update_anime_by_id(doc_id, {'poster_path': poster, 'screenshots_paths': screens,
+                                                        'tags': rec.get('tags', [])})
+                    updated[doc_id] = self.db.get_anime(doc_id)
+        except Exception:
+            pass
+        self.delete_media_async(release)
+        try:
+            if updated:
+                data = self.ids.grid_scroll.data
+                for i, item in enumerate(data):
+                    new = updated.get(getattr(item['anime_data'], 'doc_id', None))
+                    if new is not None:
+                        data[i] = {'anime_data': new, 'main_screen': self}
+            if self.current_anime_id in updated:
+                self.show_anime_details(updated[self.current_anime_id])
+        except Exception:
+            pass
+
+    def _update_copy_status(self, dt):
+        status = self.copy_pipeline.status()
+        try:
+            label = self.ids.copy_status
+            if status['files_done'] < status['files_total']:
+                percent = int(100 * status['bytes_done'] / status['bytes_total']) if status['bytes_total'] else 0
+                label.text = tr('copying_status', status['files_done'], status['files_total'], percent)
+                return True
+            label.text = tr('copy_failed', status['failed']) if status['failed'] else ''
+        except Exception:
+            pass
+        self._copy_status_event = None
+        return False
+
+    def delete_media_async(self, paths):
+        """Remove the thumbnails and local copies of paths on a background thread."""
+        paths = [p for p in paths if p]
+        if not paths:
+            return
+
+        def worker():
+            try:
+                report = delete_media(paths)
+            except Exception:
+                return
+            if report['failed']:
+                def notify(dt):
+                    from kivy.app import App
+                    app = App.get_running_app()
+                    self.show_message(app.str_bulk_delete, tr('cleanup_failed', len(report['failed'])))
+                Clock.schedule_once(notify, 0)
+
+        threading.Thread(target=worker, daemon=True).start()
+
     def bulk_edit(self, instance=None):
-        if not self.selected_cards:
+        if not self.selected_records:
             from kivy.app import App
             app = App.get_running_app()
             self.show_message(app.str_bulk_edit, app.str_no_items_selected)
@@ -743,14 +1168,19 @@ class MainScreen(Screen):
 
         def apply_tags(inst):
             tags = [t.strip() for t in ti.text.split(',') if t.strip()]
-            for c in list(self.selected_cards):
-                try:
-                    self.db.update_anime(c.anime_data.get('title'), {'tags': tags})
-                except Exception:
-                    pass
+            with self.db.batch():
+                for r in list(self.selected_records.values()):
+                    try:
+                        doc_id = getattr(r, 'doc_id', None)
+                        if doc_id is not None:
+                            self.db.update_anime_by_id(doc_id, {'tags': tags})
+                        else:
+                            self.db.update_anime(r.get('title'), {'tags': tags})
+                    except Exception:
+                        pass
             popup.dismiss()
             self.multi_select_mode = False
-            self.selected_cards.clear()
+            self.selected_records.clear()
             self.refresh_content()
 
         ok.bind(on_release=apply_tags)
@@ -758,84 +1188,78 @@ class MainScreen(Screen):
         popup.open()
 
     def bulk_export(self, instance=None):
-        if not self.selected_cards:
+        if not self.selected_records:
             self.show_message('Bulk Export', 'No items selected')
             return
-        # prepare data
-        data = [c.anime_data for c in list(self.selected_cards)]
+        # records are streamed from the selection; format follows the file name
+        records = list(self.selected_records.values())
         def save_callback(paths):
             if paths:
                 path = paths[0]
-                if not path.endswith('.json'):
+                if not path.endswith(('.json', '.ndjson', '.gz')):
                     path += '.json'
+                fmt, compress = export_format_for_path(path)
                 try:
-                    with open(path, 'w', encoding='utf-8') as f:
-                        json.dump(data, f, ensure_ascii=False, indent=2)
-                    self.show_message('Export Successful', f'Exported {len(data)} items to {path}')
+                    count = write_json_records((export_record(r) for r in records), path, fmt=fmt, compress=compress)
+                    self.show_message('Export Successful', f'Exported {count} items to {path}')
                 except Exception as e:
                     self.show_message('Export Failed', str(e))
         initial = self.settings.get('last_dir') if hasattr(self, 'settings') else None
-        fc = FileChooserPopup(callback=save_callback, save_mode=True, filters=['*.json'], owner=self, initial_path=initial)
+        fc = FileChooserPopup(callback=save_callback, save_mode=True, filters=['*.json', '*.ndjson', '*.gz'], owner=self, initial_path=initial)
         fc.open()
 
     def show_anime_details(self, anime_data):
         # use empty source for transparent poster placeholder in details; keep full poster
         source = anime_data.get('poster_path', '')
-        self.ids.current_poster.source = source
+        # remember which record is shown so edit/delete don't have to look it up by title
+        self.current_anime_id = getattr(anime_data, 'doc_id', None)
+        # side panel poster: the carousel-sized variant is plenty, the original only as fallback
+        poster_thumb = find_thumbnail(source, 'carousel') if source else None
+        get_texture_cache().show(self.ids.current_poster, poster_thumb or source, 'carousel' if poster_thumb else 'original')
         self.ids.current_poster.opacity = 1 if source else 0
         self.ids.current_title.text = anime_data.get('title', '')
         self.ids.current_description.text = anime_data.get('description', '')
         # show tags in details
         self.ids.current_tags.text = ', '.join(anime_data.get('tags', [])) if anime_data.get('tags') else ''
-        carousel = self.ids.screenshots_carousel
-        carousel.clear_widgets()
+        self._clear_carousel()
+        # only the slides around the current one exist and hold an image; more are added while paging
+        self._screenshots = LazyCarousel(self.ids.screenshots_carousel, anime_data.get('screenshots_paths', []),
+                                         self._load_screenshot, self._release_screenshot)
+        self._screenshots.start()
+
+    def _load_screenshot(self, img, screenshot):
         # show thumbnails in carousel for faster load; generate missing thumbs in background
-        for screenshot in anime_data.get('screenshots_paths', []):
-            try:
-                thumb = get_thumbnail_path(screenshot) if screenshot else ''
-                if screenshot and os.path.exists(thumb):
-                    img = Image(source=thumb, allow_stretch=True, keep_ratio=True)
-                    img._full_source = screenshot
-                    carousel.add_widget(img)
-                elif screenshot:
-                    # placeholder until thumbnail is created
-                    img = Image(source='', allow_stretch=True, keep_ratio=True)
-                    img.opacity = 0
-                    img._full_source = screenshot
-                    carousel.add_widget(img)
-                    # create thumbnail in background
-                    def make_thumb_local(src, widget):
-                        try:
-                            ensure_thumbs_dir()
-                            create_thumbnail(src, get_thumbnail_path(src))
-                            def set_thumb(dt):
-                                try:
-                                    widget.source = get_thumbnail_path(src)
-                                    widget.opacity = 1
-                                except Exception:
-                                    pass
-                            Clock.schedule_once(set_thumb, 0)
-                        except Exception:
-                            # fallback to showing original image
-                            def set_orig(dt):
-                                try:
-                                    widget.source = src
-                                    widget.opacity = 1
-                                except Exception:
-                                    pass
-                            Clock.schedule_once(set_orig, 0)
-                    threading.Thread(target=functools.partial(make_thumb_local, screenshot, img), daemon=True).start()
-                else:
-                    # empty entry
-                    img = Image(source='', allow_stretch=True, keep_ratio=True)
-                    img.opacity = 0
-                    carousel.add_widget(img)
-            except Exception:
-                try:
-                    img = Image(source=screenshot, allow_stretch=True, keep_ratio=True)
-                    carousel.add_widget(img)
-                except Exception:
-                    pass
+        img._wants_image = True
+        thumb = find_thumbnail(screenshot, 'carousel') if screenshot else None
+        if thumb:
+            get_texture_cache().show(img, thumb, 'carousel')
+            img.opacity = 1
+        elif screenshot:
+            # placeholder until thumbnail is created
+            img.opacity = 0
+            # create thumbnail on the shared queue; the details panel is on screen
+            def on_thumb(src, widget, thumbs, error):
+                # fallback to showing original image
+                thumb = (thumbs or {}).get('carousel')
+                def set_source(dt):
+                    try:
+                        # the slide may have been released (paged far away) meanwhile
+                        if getattr(widget, '_wants_image', False):
+                            get_texture_cache().show(widget, thumb or src, 'carousel' if thumb else 'original')
+                            widget.opacity = 1
+                    except Exception:
+                        pass
+                Clock.schedule_once(set_source, 0)
+            self.thumbnail_queue.request(screenshot, get_thumbnail_path(screenshot), functools.partial(on_thumb, screenshot, img),
+                                         owner=img, priority=PRIORITY_VISIBLE)
+        else:
+            # empty entry
+            img.opacity = 0
+
+    def _release_screenshot(self, img):
+        img._wants_image = False
+        self.thumbnail_queue.cancel(img)
+        get_texture_cache().show(img, '')
 
     def on_spinner_select(self, spinner, text):
         # If a real anime is selected show details, otherwise clear details and use transparent poster
@@ -845,13 +1269,14 @@ class MainScreen(Screen):
                 self.show_anime_details(anime[0])
                 return
         # Clear details for non-selection or missing item
+        self.current_anime_id = None
         try:
-            self.ids.current_poster.source = ''
+            get_texture_cache().show(self.ids.current_poster, '')
             self.ids.current_poster.opacity = 0
             self.ids.current_title.text = 'Select an anime'
             self.ids.current_description.text = ''
             self.ids.current_tags.text = ''
-            self.ids.screenshots_carousel.clear_widgets()
+            self._clear_carousel()
         except Exception:
             pass
 
@@ -897,32 +1322,21 @@ class MainScreen(Screen):
             content.add_widget(btns)
             popup = Popup(title=tr('confirm_delete'), content=content, size_hint=(0.4, 0.3))
 
+            doc_id = self.current_anime_id
+            rec = self.db.get_anime(doc_id) if doc_id is not None else None
+            if rec is None or rec.get('title') != selected_title:
+                doc_id = self.db.get_anime_id(selected_title)
+
             def do_delete(instance):
-                # delete thumbnails for this anime (poster + screenshots)
+                # delete thumbnails and copies for this anime (poster + screenshots)
                 try:
-                    recs = self.db.get_anime_by_title(selected_title)
-                    if recs:
-                        rec = recs[0]
-                        try:
-                            delete_thumbnail(rec.get('poster_path', ''))
-                        except Exception:
-                            pass
-                        try:
-                            delete_copy(rec.get('poster_path', ''))
-                        except Exception:
-                            pass
-                        for sp in rec.get('screenshots_paths', []):
-                            try:
-                                delete_thumbnail(sp)
-                            except Exception:
-                                pass
-                            try:
-                                delete_copy(sp)
-                            except Exception:
-                                pass
+                    rec = self.db.get_anime(doc_id) if doc_id is not None else None
+                    if rec:
+                        self.delete_media_async([rec.get('poster_path', '')] + list(rec.get('screenshots_paths', [])))
                 except Exception:
                     pass
-                self.db.delete_anime(selected_title)
+                if doc_id is not None:
+                    self.db.delete_anime_by_id(doc_id)
                 popup.dismiss()
                 self.refresh_content()
 
@@ -931,17 +1345,64 @@ class MainScreen(Screen):
             popup.open()
 
     def refresh_content(self):
-        self.load_anime_cards()
+        self.load_anime_cards(keep_position=True)
+        self._atlas_trigger()
+        self._reset_details()
+
+    def refresh_record(self, doc_id):
+        """Show the edited record doc_id. Its row is replaced in place when it keeps its
+        position in the grid; otherwise (moved, filtered view, not loaded) the grid is
+        refreshed as a whole with refresh_content()."""
+        try:
+            data = self.ids.grid_scroll.data
+            rec = self.db.get_anime(doc_id) if doc_id is not None else None
+            index = next((i for i, d in enumerate(data) if _record_key(d['anime_data']) == doc_id), None)
+            in_place = rec is not None and index is not None and self._page_filter is None
+            if in_place:
+                # the row stays where it is only if the new sort key still fits between its neighbours
+                key = sort_key(rec, self.current_sort)
+                keys = [sort_key(data[i]['anime_data'], self.current_sort) for i in (index - 1, index + 1) if 0 <= i < len(data)]
+                lo, hi = (index > 0 and keys[0]), (index + 1 < len(data) and keys[-1])
+                if self.sort_reverse:
+                    lo, hi = hi, lo
+                in_place = (lo is False or lo <= key) and (hi is False or key <= hi)
+                # the last loaded row may have to move into the pages not loaded yet
+                in_place = in_place and (index + 1 < len(data) or self._pages_done)
+            if not in_place:
+                self.refresh_content()
+                return
+            data[index] = {'anime_data': rec, 'main_screen': self}
+            self._atlas_trigger()
+            self._reset_details()
+        except Exception:
+            self.refresh_content()
+
+    def _reset_details(self):
         # Reset the details panel
-        self.ids.current_poster.source = ''
+        self.current_anime_id = None
+        get_texture_cache().show(self.ids.current_poster, '')
         self.ids.current_poster.opacity = 0
         self.ids.current_title.text = 'Select an anime'
         self.ids.current_description.text = ''
         self.ids.current_tags.text = ''
-        self.ids.screenshots_carousel.clear_widgets()
+        self._clear_carousel()
+
+    def _clear_carousel(self):
+        if self._screenshots is not None:
+            self._screenshots.stop()
+            self._screenshots = None
+        # drop the pending thumbnail jobs of the screenshots being removed
+        carousel = self.ids.screenshots_carousel
+        self.thumbnail_queue.cancel_many(list(carousel.slides))
+        carousel.clear_widgets()
 
     def on_search_text(self, instance, value):
-        self.load_anime_cards(search_query=value, tag_filter=self.current_tags)  
+        # debounced: the search runs once typing pauses for SEARCH_DEBOUNCE seconds
+        self._search_gen += 1
+        self._search_query = value
+        if self._search_event is not None:
+            self._search_event.cancel()
+        self._search_event = Clock.schedule_once(self._run_search, SEARCH_DEBOUNCE)
 
     def on_sort_select(self, spinner, text):
         if text == tr('a_z'):
@@ -954,10 +1415,11 @@ class MainScreen(Screen):
             self.current_sort = 'date'
             self.sort_reverse = True
         self.load_anime_cards(search_query=self.ids.search_input.text, tag_filter=self.current_tags)
+        self._atlas_trigger()
 
     def export_data(self, instance):
         content = ExportPopup(self.db, owner=self)
-        popup = Popup(title='Export Data', content=content, size_hint=(0.4, 0.3))
+        popup = Popup(title='Export Data', content=content, size_hint=(0.4, 0.4))
         content.popup = popup
         popup.open()
 
@@ -1015,6 +1477,8 @@ class MainScreen(Screen):
             pass
 
 if __name__ == '__main__':
+    # frozen builds: let thumbnail worker processes start without running the app
+    multiprocessing.freeze_support()
     # Ensure settings saved on exit; bind stop handler
     app = AnimeApp()
     try:
@@ -1027,6 +1491,18 @@ if __name__ == '__main__':
                 ms.save_settings()
             if hasattr(ms, '_stop_window_watch'):
                 ms._stop_window_watch()
+            if hasattr(ms, 'thumbnail_queue'):
+                ms.thumbnail_queue.close()
+            if hasattr(ms, 'copy_pipeline'):
+                ms.copy_pipeline.close()
+            # an unfinished collection continues from its saved position next time
+            if getattr(ms, 'media_gc', None) is not None:
+                ms.media_gc.stop()
+        except Exception:
+            pass
+        try:
+            if hasattr(app, 'db'):
+                app.db.close()
         except Exception:
             pass
 
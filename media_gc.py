@@ -0,0 +1,240 @@
+"""
+Mark-and-sweep garbage collection of generated media.
+The mark phase collects every thumbnail (all pyramid variants) and local copy that the
+entries of the database still use; the sweep walks thumbnails/ and copies/ and removes
+everything else. The sweep runs in short time slices on a background thread and saves
+its position after every slice, so a run interrupted by closing the app continues where
+it stopped on the next start. Files younger than a grace period are never touched: they
+may belong to an entry that is being added right now.
+
+Usage: python media_gc.py [--dry-run]
+"""
+import os
+import sys
+import json
+import time
+import stat
+import bisect
+import threading
+
+from utils import (THUMBS_DIR, COPIES_DIR, THUMB_VARIANTS, get_thumbnail_path, get_copy_path,
+                   get_media_manifest, get_blob_store, _in_copies_dir, _is_blob_path, _try_remove)
+
+STATE_PATH = os.path.join(os.getcwd(), 'media_gc.json')
+# files modified less than this many seconds ago are kept
+GRACE_SECONDS = 15 * 60
+# work at most this long, then pause, so the disk stays available to the UI
+SLICE_SECONDS = 0.05
+PAUSE_SECONDS = 0.05
+
+def collect_references(db):
+    """All media paths the entries of db use (posters and screenshots)."""
+    refs = []
+    for anime in db.iter_anime(sort_by=None):
+        if anime.get('poster_path'):
+            refs.append(anime['poster_path'])
+        refs.extend(p for p in anime.get('screenshots_paths', []) if p)
+    return refs
+
+def _key(path):
+    return os.path.normcase(os.path.abspath(path))
+
+def mark(referenced):
+    """Return (thumbnails, copies, sources): normalized paths of the files to keep and the
+    sources (including local copies) whose manifest records are still needed."""
+    manifest = get_media_manifest()
+    thumbs, copies, sources = set(), set(), set()
+    for src in referenced:
+        try:
+            src = os.path.abspath(src)
+            related = {src}
+            if _in_copies_dir(src):
+                copies.add(_key(src))
+            else:
+                for copy in (manifest.copy_of(src), get_copy_path(src)):
+                    if copy:
+                        copies.add(_key(copy))
+                        related.add(os.path.abspath(copy))
+            for path in related:
+                sources.add(path)
+                thumbs.update(_key(t) for t in manifest.thumbnails(path).values())
+                thumbs.update(_key(get_thumbnail_path(path, v)) for v in THUMB_VARIANTS)
+        except Exception:
+            continue
+    return thumbs, copies, sources
+
+def _new_stats():
+    return {'scanned': 0, 'kept': 0, 'recent': 0, 'garbage': 0, 'removed': 0,
+            'reclaimed_bytes': 0, 'failed': 0, 'forgotten': 0}
+
+class MediaGC:
+    """One collection over thumbnails/ and copies/ for the referenced media paths.
+
+    referenced is a snapshot of collect_references(db), taken on the thread that owns the
+    database. With dry_run nothing is deleted and the report lists the garbage instead;
+    dry runs are not saved for resuming. run() blocks; start() runs it on a daemon thread.
+    """
+    def __init__(self, referenced, dry_run=False, grace=GRACE_SECONDS, state_path=STATE_PATH,
+                 slice_seconds=SLICE_SECONDS, pause=PAUSE_SECONDS):
+        self.referenced = list(referenced)
+        self.dry_run = dry_run
+        self.grace = grace
+        self.state_path = state_path
+        self.slice_seconds = slice_seconds
+        self.pause = pause
+        self._stop = threading.Event()
+        self.thread = None
+
+    def stop(self):
+        """Ask a running collection to stop after the current file; its position is kept."""
+        self._stop.set()
+
+    def start(self, on_done=None):
+        def worker():
+            try:
+                report = self.run()
+            except Exception as e:
+                report = {'complete': False, 'error': str(e)}
+            if on_done:
+                on_done(report)
+        self.thread = threading.Thread(target=worker, name='media-gc', daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def _load_state(self):
+        if self.dry_run:
+            return None
+        try:
+            with open(self.state_path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if state.get('version') == 1:
+                return state
+        except Exception:
+            pass
+        return None
+
+    def _save_state(self, state):
+        if self.dry_run:
+            return
+        try:
+            tmp = self.state_path + '.part'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(state, f)
+            os.replace(tmp, self.state_path)
+        except Exception:
+            pass
+
+    def _clear_state(self):
+        try:
+            os.remove(self.state_path)
+        except OSError:
+            pass
+
+    def run(self):
+        """Mark, then sweep from the saved position (if any). Returns the report:
+        {'complete', 'dry_run', 'resumed', 'stats': {...}, 'elapsed', 'garbage': [(path, bytes), ...]}
+        where stats counts scanned, kept, recent, garbage, removed and failed files,
+        reclaimed_bytes and forgotten manifest records; garbage is only listed for dry runs.
+        """
+        started = time.monotonic()
+        keep_thumbs, keep_copies, sources = mark(self.referenced)
+        state = self._load_state()
+        resumed = state is not None
+        if state is None:
+            state = {'version': 1, 'dir': 0, 'after': '', 'stats': _new_stats()}
+        stats = state['stats']
+        garbage = []
+        store = get_blob_store()
+        # files from before the run started only: new ones may not be marked yet
+        cutoff = time.time() - self.grace
+        dirs = [(THUMBS_DIR, keep_thumbs), (COPIES_DIR, keep_copies)]
+
+        slice_end = time.monotonic() + self.slice_seconds
+        while state['dir'] < len(dirs):
+            directory, keep = dirs[state['dir']]
+            try:
+                names = sorted(os.listdir(directory))
+            except OSError:
+                names = []
+            for name in names[bisect.bisect_right(names, state['after']):]:
+                if self._stop.is_set():
+                    self._save_state(state)
+                    return {'complete': False, 'dry_run': self.dry_run, 'resumed': resumed,
+                            'stats': stats, 'elapsed': time.monotonic() - started, 'garbage': garbage}
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                    # subdirectories (e.g. the poster atlas) manage their own contents
+                    if not stat.S_ISREG(st.st_mode):
+                        continue
+                    stats['scanned'] += 1
+                    # a blob that got a reference after the mark (a copy deduplicated onto it,
+                    # a record switched to it) is in use even though the snapshot missed it
+                    if _key(path) in keep or (_is_blob_path(path) and store.refcount(name) > 0):
+                        stats['kept'] += 1
+                    elif st.st_mtime > cutoff:
+                        stats['recent'] += 1
+                    else:
+                        stats['garbage'] += 1
+                        if self.dry_run:
+                            garbage.append((path, st.st_size))
+                            stats['reclaimed_bytes'] += st.st_size
+                        else:
+                            if _is_blob_path(path):
+                                # re-checked under the store lock right before deleting
+                                removed = store.drop_unreferenced(name) or not os.path.exists(path)
+                            else:
+                                removed = _try_remove(path)
+                            if removed:
+                                stats['removed'] += 1
+                                stats['reclaimed_bytes'] += st.st_size
+                            else:
+                                stats['failed'] += 1
+                except OSError:
+                    stats['failed'] += 1
+                state['after'] = name
+                if time.monotonic() >= slice_end:
+                    self._save_state(state)
+                    time.sleep(self.pause)
+                    slice_end = time.monotonic() + self.slice_seconds
+            state['dir'] += 1
+            state['after'] = ''
+            self._save_state(state)
+
+        if not self.dry_run:
+            # manifest records of unreferenced sources whose files are all gone
+            manifest = get_media_manifest()
+            for src in manifest.sources():
+                if src in sources:
+                    continue
+                files = list(manifest.thumbnails(src).values())
+                copy = manifest.copy_of(src)
+                if copy:
+                    files.append(copy)
+                if not any(os.path.exists(f) for f in files):
+                    manifest.forget(src)
+                    stats['forgotten'] += 1
+            self._clear_state()
+        return {'complete': True, 'dry_run': self.dry_run, 'resumed': resumed,
+                'stats': stats, 'elapsed': time.monotonic() - started, 'garbage': garbage}
+
+if __name__ == '__main__':
+    from database import open_database
+    dry_run = '--dry-run' in sys.argv[1:]
+    backend = 'json'
+    try:
+        with open('settings.json', 'r', encoding='utf-8') as f:
+            backend = json.load(f).get('db_backend', 'json') or 'json'
+    except Exception:
+        pass
+    db = open_database(backend)
+    try:
+        report = MediaGC(collect_references(db), dry_run=dry_run, pause=0).run()
+    finally:
+        db.close()
+    for path, size in report['garbage']:
+        print(f'{size:>12}  {path}')
+    s = report['stats']
+    verb = 'Would reclaim' if dry_run else 'Reclaimed'
+    print(f"Scanned {s['scanned']} files, kept {s['kept']}, recent {s['recent']}, garbage {s['garbage']}. "
+          f"{verb} {s['reclaimed_bytes']} bytes.")
@@ -0,0 +1,180 @@
+"""
+Persistent manifest of generated media: source image -> local copy -> thumbnail(s).
+Every entry remembers the size and mtime of its source, so a lookup is a dictionary access
+plus an occasional stat, and a source that changed on disk invalidates (and deletes) the
+thumbnails made from its old contents. The manifest is kept in memory and mirrored to an
+SQLite table row by row.
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+
+# a source is re-stat()ed at most this often (seconds) when looked up
+STAT_TTL = 10.0
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS media (
+    src TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    copy TEXT,
+    thumbs TEXT NOT NULL
+);
+'''
+
+def _stat(path):
+    try:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    except OSError:
+        return None
+
+class MediaManifest:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.RLock()
+        # src -> {'size', 'mtime_ns', 'copy', 'thumbs': {variant: thumb path}}
+        self._entries = {}
+        # src -> monotonic time of the last stat check
+        self._checked = {}
+        self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(_SCHEMA)
+        for src, size, mtime_ns, copy, thumbs in self.conn.execute('SELECT src, size, mtime_ns, copy, thumbs FROM media'):
+            self._entries[src] = {'size': size, 'mtime_ns': mtime_ns, 'copy': copy, 'thumbs': json.loads(thumbs)}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+    def _save(self, src, entry):
+        self.conn.execute(
+            'INSERT OR REPLACE INTO media(src, size, mtime_ns, copy, thumbs) VALUES (?, ?, ?, ?, ?)',
+            (src, entry['size'], entry['mtime_ns'], entry['copy'], json.dumps(entry['thumbs'], ensure_ascii=False)))
+
+    def _delete(self, src):
+        self._entries.pop(src, None)
+        self._checked.pop(src, None)
+        self.conn.execute('DELETE FROM media WHERE src = ?', (src,))
+
+    def _entry(self, src, create_stat=None):
+        entry = self._entries.get(src)
+        if entry is None and create_stat is not None:
+            entry = {'size': create_stat[0], 'mtime_ns': create_stat[1], 'copy': None, 'thumbs': {}}
+            self._entries[src] = entry
+            self._checked[src] = time.monotonic()
+        return entry
+
+    def _validate(self, src, entry):
+        """Drop the derived files of an entry whose source changed. Returns False if it did."""
+        now = time.monotonic()
+        if now - self._checked.get(src, 0.0) < STAT_TTL:
+            return True
+        self._checked[src] = now
+        stat = _stat(src)
+        if stat is None or stat == (entry['size'], entry['mtime_ns']):
+            # a vanished source keeps its thumbnails (they are all that is left to show);
+            # thumbnails deleted behind our back are dropped so they get regenerated
+            gone = [v for v, thumb in entry['thumbs'].items() if not os.path.exists(thumb)]
+            if gone:
+                for v in gone:
+                    del entry['thumbs'][v]
+                self._save(src, entry)
+            return True
+        for thumb in entry['thumbs'].values():
+            try:
+                os.remove(thumb)
+            except OSError:
+                pass
+        entry['size'], entry['mtime_ns'] = stat
+        entry['thumbs'] = {}
+        self._save(src, entry)
+        return False
+
+    def thumbnail(self, src, variant='card', default_path=None):
+        """Return the up-to-date thumbnail recorded for src or None.
+
+        default_path is where the thumbnail would be generated; an existing file there that
+        predates the manifest is adopted instead of being regenerated.
+        """
+        src = os.path.abspath(src)
+        with self._lock:
+            entry = self._entries.get(src)
+            if entry is not None and self._validate(src, entry):
+                thumb = entry['thumbs'].get(variant)
+                if thumb:
+                    return thumb
+            if default_path and os.path.exists(default_path):
+                self.record_thumbnail(src, default_path, variant)
+                return default_path
+        return None
+
+    def record_thumbnail(self, src, thumb, variant='card'):
+        self.record_thumbnails(src, {variant: thumb})
+
+    def record_thumbnails(self, src, thumbs):
+        """Record freshly generated thumbnails of src given as {variant: path}."""
+        src = os.path.abspath(src)
+        stat = _stat(src)
+        with self._lock:
+            entry = self._entry(src, stat or (0, 0))
+            if stat is not None and stat != (entry['size'], entry['mtime_ns']):
+                entry['size'], entry['mtime_ns'] = stat
+                entry['thumbs'] = {}
+            entry['thumbs'].update(thumbs)
+            self._checked[src] = time.monotonic()
+            self._save(src, entry)
+
+    def record_copy(self, src, copy):
+        src = os.path.abspath(src)
+        stat = _stat(src)
+        with self._lock:
+            entry = self._entry(src, stat or (0, 0))
+            entry['copy'] = copy
+            self._save(src, entry)
+
+    def copy_of(self, src):
+        entry = self._entries.get(os.path.abspath(src))
+        return entry['copy'] if entry else None
+
+    def sources(self):
+        with self._lock:
+            return list(self._entries)
+
+    def thumbnails(self, src):
+        """All recorded thumbnails of src as {variant: path}."""
+        entry = self._entries.get(os.path.abspath(src))
+        return dict(entry['thumbs']) if entry else {}
+
+    def forget_thumbnails(self, src):
+        """Remove the recorded thumbnails of src from disk and the manifest. Returns the removed paths."""
+        src = os.path.abspath(src)
+        removed = []
+        with self._lock:
+            entry = self._entries.get(src)
+            if entry is None:
+                return removed
+            for thumb in entry['thumbs'].values():
+                try:
+                    os.remove(thumb)
+                    removed.append(thumb)
+                except FileNotFoundError:
+                    pass
+                except OSError:
+                    continue
+            entry['thumbs'] = {}
+            if entry['copy'] is None:
+                self._delete(src)
+            else:
+                self._save(src, entry)
+        return removed
+
+    def forget(self, src):
+        with self._lock:
+            self._delete(os.path.abspath(src))
@@ -9,13 +9,17 @@ from kivy.uix.textinput import TextInput
 from kivy.uix.checkbox import CheckBox
 from kivy.clock import Clock
 import os
-import json
 import threading
 import functools
 
-from utils import regen_copies_for_paths, get_copy_path, regen_thumbnails_for_paths, copy_source_to_local, get_thumbnail_path, create_thumbnail, ensure_thumbs_dir, delete_thumbnail, delete_copy
+from database import export_record
+from jsonio import write_json_records, open_json_source
+from utils import get_thumbnail_path, create_thumbnail, ensure_thumbs_dir, retain_records_media
 from localization import tr
 
+# export format spinner values -> jsonio export formats
+EXPORT_FORMAT_CHOICES = {'JSON': 'pretty', 'JSON (compact)': 'compact', 'NDJSON': 'ndjson'}
+
 class FileChooserPopup(Popup):
     def __init__(self, callback, multiple=False, save_mode=False, filters=None, owner=None, initial_path=None, **kwargs):
         # KV provides the layout (ids: filechooser, filename_input, select_btn, cancel_btn, drives_layout)
@@ -164,23 +168,6 @@ class AddAnimePopup(BoxLayout):
         except Exception:
             pass
 
-    def _spawn_regen_thumbs(self, poster, screenshots):
-        def do_regen():
-            try:
-                paths = []
-                if poster:
-                    paths.append(poster)
-                paths.extend([p for p in screenshots if p])
-                try:
-                    regen_copies_for_paths(paths)
-                except Exception:
-                    pass
-                copy_paths = [get_copy_path(p) for p in paths if p]
-                regen_thumbnails_for_paths(copy_paths)
-            except Exception:
-                pass
-        threading.Thread(target=do_regen, daemon=True).start()
-
     def save_anime(self, instance):
         title = self.ids.title_input.text.strip()
         description = self.ids.description_input.text
@@ -191,25 +178,17 @@ class AddAnimePopup(BoxLayout):
             self.main_screen.show_message(tr('Validation Error'), tr('Title is required'))
             return
 
+        # the record keeps the original paths until the background copies are done
+        with self.db.batch():
+            doc_id = self.db.add_anime(
+                title=title,
+                description=description,
+                poster_path=poster_path,
+                screenshots_paths=screenshots_paths,
+                tags=tags
+            )
         try:
-            copied_poster = copy_source_to_local(poster_path) if poster_path else ''
-            copied_screens = []
-            for p in screenshots_paths:
-                cp = copy_source_to_local(p) or p
-                copied_screens.append(cp)
-        except Exception:
-            copied_poster = poster_path
-            copied_screens = screenshots_paths
-
-        self.db.add_anime(
-            title=title,
-            description=description,
-            poster_path=copied_poster,
-            screenshots_paths=copied_screens,
-            tags=tags
-        )
-        try:
-            self._spawn_regen_thumbs(copied_poster, copied_screens)
+            self.main_screen.copy_media_async(doc_id, [poster_path] + screenshots_paths)
         except Exception:
             pass
         if hasattr(self, 'popup'):
@@ -227,6 +206,7 @@ class EditAnimePopup(BoxLayout):
         self.db = db
         self.main_screen = main_screen
         self.current_title = ''
+        self.current_id = None
         # populate after kv applied
         Clock.schedule_once(self._populate_delayed, 0)
 
@@ -234,9 +214,13 @@ class EditAnimePopup(BoxLayout):
         try:
             self.current_title = self.main_screen.ids.current_title.text
             if self.current_title and self.current_title != tr('Select an anime'):
-                current_anime = self.db.get_anime_by_title(self.current_title)
-                if current_anime:
-                    anime = current_anime[0]
+                doc_id = getattr(self.main_screen, 'current_anime_id', None)
+                anime = self.db.get_anime(doc_id) if doc_id is not None else None
+                if anime is None or anime.get('title') != self.current_title:
+                    doc_id = self.db.get_anime_id(self.current_title)
+                    anime = self.db.get_anime(doc_id) if doc_id is not None else None
+                self.current_id = doc_id
+                if anime:
                     self.ids.title_input.text = anime['title']
                     self.ids.description_input.text = anime['description']
                     self.ids.poster_input.text = anime['poster_path']
@@ -286,23 +270,6 @@ class EditAnimePopup(BoxLayout):
         except Exception:
             pass
 
-    def _spawn_regen_thumbs(self, poster, screenshots):
-        def do_regen():
-            try:
-                paths = []
-                if poster:
-                    paths.append(poster)
-                paths.extend([p for p in screenshots if p])
-                try:
-                    regen_copies_for_paths(paths)
-                except Exception:
-                    pass
-                copy_paths = [get_copy_path(p) for p in paths if p]
-                regen_thumbnails_for_paths(copy_paths)
-            except Exception:
-                pass
-        threading.Thread(target=do_regen, daemon=True).start()
-
     def save_anime(self, instance):
         title = self.ids.title_input.text.strip()
         description = self.ids.description_input.text
@@ -313,56 +280,43 @@ class EditAnimePopup(BoxLayout):
             self.main_screen.show_message(tr('Validation Error'), tr('Title is required'))
             return
 
+        old_p, old_ss = '', set()
         try:
-            new_poster_copy = copy_source_to_local(poster_path) if poster_path else ''
-            new_screens_copies = []
-            for p in screenshots_paths:
-                cp = copy_source_to_local(p) or p
-                new_screens_copies.append(cp)
-        except Exception:
-            new_poster_copy = poster_path
-            new_screens_copies = screenshots_paths
-
-        try:
+            # unchanged images already are local copies; dropped ones are released. An image
+            # that only moved (a screenshot made the poster) is still used and stays
             old_p = getattr(self, '_original_poster', '')
-            if old_p and old_p != new_poster_copy:
-                try:
-                    delete_thumbnail(old_p)
-                except Exception:
-                    pass
-                try:
-                    delete_copy(old_p)
-                except Exception:
-                    pass
             old_ss = set(getattr(self, '_original_screenshots', []) or [])
-            new_ss = set(new_screens_copies)
-            for removed in (old_ss - new_ss):
-                try:
-                    delete_thumbnail(removed)
-                except Exception:
-                    pass
-                try:
-                    delete_copy(removed)
-                except Exception:
-                    pass
+            removed = (old_ss | {old_p}) - ({poster_path} | set(screenshots_paths)) - {''}
+            self.main_screen.delete_media_async(list(removed))
         except Exception:
             pass
 
-        self.db.update_anime(self.current_title, {
+        new_data = {
             'title': title,
             'description': description,
-            'poster_path': new_poster_copy,
-            'screenshots_paths': new_screens_copies,
+            'poster_path': poster_path,
+            'screenshots_paths': screenshots_paths,
             'tags': tags
-        })
+        }
+        doc_id = self.current_id
+        with self.db.batch():
+            if doc_id is not None:
+                self.db.update_anime_by_id(doc_id, new_data)
+            else:
+                self.db.update_anime(self.current_title, new_data)
+                doc_id = self.db.get_anime_id(title)
         try:
-            self._spawn_regen_thumbs(new_poster_copy, new_screens_copies)
+            # new images are copied in the background and the record follows as they arrive;
+            # kept ones already belong to the record
+            kept = set(old_ss) | {old_p}
+            self.main_screen.copy_media_async(doc_id, [p for p in [poster_path] + screenshots_paths if p not in kept])
         except Exception:
             pass
         if hasattr(self, 'popup'):
             self.popup.dismiss()
         try:
-            self.main_screen.refresh_content()
+            # only this record's row is replaced unless the edit moved it
+            self.main_screen.refresh_record(doc_id)
             self.main_screen.show_message(tr('Updated'), tr(f"Anime '{title}' updated"))
         except Exception:
             pass
@@ -397,25 +351,40 @@ class ExportPopup(BoxLayout):
 
     def export_json(self, instance):
         initial = self.owner.settings.get('last_dir') if self.owner and hasattr(self.owner, 'settings') else None
-        file_chooser = FileChooserPopup(callback=self._save_json, save_mode=True, filters=['*.json'], owner=self.owner, initial_path=initial)
+        file_chooser = FileChooserPopup(callback=self._save_json, save_mode=True, filters=['*.json', '*.ndjson', '*.gz'], owner=self.owner, initial_path=initial)
         file_chooser.open()
 
+    def _export_options(self):
+        fmt = EXPORT_FORMAT_CHOICES.get(getattr(self.ids.get('format_spinner'), 'text', ''), 'pretty')
+        compress = bool(getattr(self.ids.get('gzip_check'), 'active', False))
+        return fmt, compress
+
     def _save_json(self, paths):
         if paths:
             path = paths[0]
-            if not path.endswith('.json'):
-                path += '.json'
-            try:
-                with open(path, 'w', encoding='utf-8') as f:
-                    json.dump(self.db.export_to_json(), f, ensure_ascii=False, indent=2)
+            fmt, compress = self._export_options()
+            ext = '.ndjson' if fmt == 'ndjson' else '.json'
+            if compress and not path.endswith('.gz'):
+                if not path.endswith(ext):
+                    path += ext
+                path += '.gz'
+            elif not compress and not path.endswith(ext):
+                path += ext
+
+            def do_export():
                 try:
-                    with open('export_log.txt', 'a', encoding='utf-8') as lf:
-                        lf.write(tr(f"Exported {len(self.db.export_to_json())} records to {path}\n"))
-                except Exception:
-                    pass
-                self._show_result(tr('Export Successful'), tr(f'Exported to {path}'))
-            except Exception as e:
-                self._show_result(tr('Export Failed'), str(e))
+                    # single streaming pass; the writer returns the record count
+                    count = write_json_records((export_record(d) for d in self.db.iter_anime(sort_by=None)), path, fmt=fmt, compress=compress)
+                    try:
+                        with open('export_log.txt', 'a', encoding='utf-8') as lf:
+                            lf.write(tr(f"Exported {count} records to {path}\n"))
+                    except Exception:
+                        pass
+                    Clock.schedule_once(lambda dt: self._show_result(tr('Export Successful'), tr(f'Exported to {path}')), 0)
+                except Exception as e:
+                    err = str(e)
+                    Clock.schedule_once(lambda dt: self._show_result(tr('Export Failed'), err), 0)
+            threading.Thread(target=do_export, daemon=True).start()
         if hasattr(self, 'popup'):
             self.popup.dismiss()
 
@@ -458,31 +427,51 @@ class ImportPopup(BoxLayout):
 
     def import_json(self, instance):
         initial = self.main_screen.settings.get('last_dir') if hasattr(self.main_screen, 'settings') else None
-        file_chooser = FileChooserPopup(callback=self._load_json, filters=['*.json'], owner=self.main_screen, initial_path=initial)
+        file_chooser = FileChooserPopup(callback=self._load_json, filters=['*.json', '*.ndjson', '*.gz'], owner=self.main_screen, initial_path=initial)
         file_chooser.open()
 
+    def _import_options(self):
+        # spinner order: replace, merge by title, merge by id
+        spinner = self.ids.get('mode_spinner')
+        try:
+            choice = spinner.values.index(spinner.text)
+        except (AttributeError, ValueError):
+            choice = 0
+        return [('replace', 'title'), ('merge', 'title'), ('merge', 'id')][choice]
+
     def _load_json(self, paths):
         if not paths:
             if hasattr(self, 'popup'):
                 self.popup.dismiss()
             return
         path = paths[0]
+        mode, key = self._import_options()
         progress_content = BoxLayout(orientation='vertical', spacing=10, padding=10)
         progress_content.add_widget(Label(text=tr('Importing...')))
-        prog = Popup(title=tr('Importing'), content=progress_content, size_hint=(0.4, 0.2), auto_dismiss=False)
+        progress_label = Label(text='')
+        progress_content.add_widget(progress_label)
+        prog = Popup(title=tr('Importing'), content=progress_content, size_hint=(0.4, 0.25), auto_dismiss=False)
         prog.open()
 
+        def on_progress(processed, percent, per_second):
+            text = tr('import_progress', processed, int(percent or 0), int(per_second))
+            def update(dt):
+                progress_label.text = text
+            Clock.schedule_once(update, 0)
+
         def do_import():
             try:
-                with open(path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                if not isinstance(data, list):
-                    raise ValueError(tr('Imported JSON must be a list of anime entries'))
-                report = self.db.import_from_json(data)
+                # entries are parsed and inserted in chunks, the file is never loaded as a whole
+                f, tell = open_json_source(path)
+                with f:
+                    report = self.db.import_from_json_stream(f, progress=on_progress, total_bytes=os.path.getsize(path), tell=tell, mode=mode, key=key,
+                                                            on_chunk=retain_records_media)
                 def finish(dt):
                     prog.dismiss()
                     self.main_screen.refresh_content()
                     msg = tr(f"Imported: {report.get('imported', 0)}. Skipped: {report.get('skipped', 0)}.")
+                    if 'inserted' in report:
+                        msg += '\n' + tr('import_merge_report', report['inserted'], report['updated'], report['unchanged'])
                     if report.get('errors'):
                         errs = report.get('errors')
                         msg += tr('\nErrors:\n') + '\n'.join(errs[:10])
@@ -0,0 +1,256 @@
+"""
+Texture atlas of the card posters.
+Card-size thumbnails are packed into a few large page images described by Kivy .atlas files,
+so the grid shows a card as a region of an already uploaded page (`atlas://.../id`) instead
+of opening, decoding and uploading one JPEG per card. Every page has its own .atlas file,
+so Kivy only loads the pages the visible cards use.
+
+The atlas is rebuilt incrementally: sync() places new or changed thumbnails next to their
+neighbours in the grid order and rebuilds only the pages it touched from the card
+thumbnails; removed entries just free their cell.
+"""
+import os
+import json
+import hashlib
+import threading
+
+from PIL import Image
+
+from utils import THUMBS_DIR, THUMB_VARIANTS, _to_rgb
+
+ATLAS_DIR = os.path.join(THUMBS_DIR, 'atlas')
+# cells are card thumbnail sized plus a border of repeated edge pixels against filtering bleed
+PADDING = 1
+CELL = max(THUMB_VARIANTS['card']) + 2 * PADDING
+# cells per page side; 8 x 322px = 2576px pages of 64 posters
+PAGE_CELLS = 8
+PAGE_PX = PAGE_CELLS * CELL
+SLOTS_PER_PAGE = PAGE_CELLS * PAGE_CELLS
+PAGE_QUALITY = 90
+# repack all pages in grid order once the grid order spans this many times the pages it needs
+REPACK_SPREAD = 2
+INDEX_NAME = 'index.json'
+
+def _page_name(page):
+    return f'posters-{page}'
+
+def _uid(src, mtime_ns):
+    # a regenerated thumbnail gets a new id, so no Kivy cache can hand out the old region
+    return f'{hashlib.sha1(src.encode("utf-8")).hexdigest()[:16]}_{mtime_ns:x}'
+
+class PosterAtlas:
+    """Atlas pages in root; the index (src -> cell) is kept in root/index.json.
+
+    sync() runs on a background thread and stages its result; publish() makes it visible
+    to source_for() and must be called on the UI thread after the Kivy caches of the
+    returned pages were dropped.
+    """
+    def __init__(self, root=ATLAS_DIR):
+        self.root = root
+        self._lock = threading.Lock()
+        # src -> {'thumb', 'mtime_ns', 'page', 'slot', 'uid', 'size'}
+        self._entries = {}
+        # page -> current image file name
+        self._pages = {}
+        self._staged = None
+        try:
+            with open(os.path.join(root, INDEX_NAME), 'r', encoding='utf-8') as f:
+                index = json.load(f)
+            if index.get('cell') == CELL and index.get('page_cells') == PAGE_CELLS:
+                self._pages = {int(p): name for p, name in index.get('pages', {}).items()
+                               if os.path.exists(os.path.join(root, name))}
+                self._entries = {src: e for src, e in index.get('entries', {}).items() if e['page'] in self._pages}
+        except Exception:
+            pass
+
+    def __len__(self):
+        return len(self._entries)
+
+    def url(self, page):
+        """Atlas url (the .atlas path without extension) of a page."""
+        return os.path.join(self.root, _page_name(page))
+
+    def source_for(self, src, thumb):
+        """Image source showing thumb (the card thumbnail of src) from the atlas, or None."""
+        entry = self._entries.get(os.path.abspath(src))
+        if entry is None or entry['thumb'] != thumb:
+            return None
+        return f'atlas://{self.url(entry["page"])}/{entry["uid"]}'
+
+    def _cell_box(self, slot):
+        row, col = divmod(slot, PAGE_CELLS)
+        return col * CELL + PADDING, row * CELL + PADDING
+
+    def _paste(self, page_im, im, slot):
+        x, y = self._cell_box(slot)
+        w, h = im.size
+        page_im.paste(im, (x, y))
+        # repeat the edge pixels into the padding, like kivy.atlas.Atlas.create
+        page_im.paste(im.crop((0, 0, w, 1)), (x, y - 1))
+        page_im.paste(im.crop((0, h - 1, w, h)), (x, y + h))
+        page_im.paste(im.crop((0, 0, 1, h)), (x - 1, y))
+        page_im.paste(im.crop((w - 1, 0, w, h)), (x + w, y))
+
+    def _write_json(self, path, data):
+        tmp = path + '.part'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def sync(self, items):
+        """Bring the atlas in line with items, an iterable of (src, card thumbnail path) in
+        the order the grid shows them.
+
+        Cards that are next to each other in the grid share pages, so scrolling touches few
+        of them: a new card goes to the page of its neighbours, and once the grid order is
+        spread over more than REPACK_SPREAD times the pages it needs (the sort order changed)
+        everything is packed again in that order. Returns a dict with the counts 'added' and
+        'removed' and 'pages', the urls of the pages whose .atlas changed (empty when nothing
+        did). The result is staged until publish().
+        """
+        with self._lock:
+            entries = {src: dict(e) for src, e in self._entries.items()}
+            pages = dict(self._pages)
+        wanted = {}
+        for src, thumb in items:
+            if not src or not thumb:
+                continue
+            src = os.path.abspath(src)
+            if src in wanted:
+                continue
+            try:
+                wanted[src] = (thumb, os.stat(thumb).st_mtime_ns)
+            except OSError:
+                continue
+        order = list(wanted)
+
+        touched = set()
+        removed = [src for src in entries if src not in wanted]
+        for src in removed:
+            touched.add(entries.pop(src)['page'])
+        # a regenerated thumbnail is placed again like a new card
+        for src, (thumb, mtime_ns) in wanted.items():
+            old = entries.get(src)
+            if old is not None and (old['thumb'], old['mtime_ns']) != (thumb, mtime_ns):
+                touched.add(entries.pop(src)['page'])
+
+        kept = [entries[src]['page'] for src in order if src in entries]
+        runs = sum(1 for i in range(len(kept)) if i == 0 or kept[i] != kept[i - 1])
+        needed = -(-len(order) // SLOTS_PER_PAGE)
+        if runs > REPACK_SPREAD * max(needed, 1):
+            touched.update(e['page'] for e in entries.values())
+            entries = {}
+
+        # page files get a new name per revision, so cells freed here can be reused at once:
+        # the regions on screen keep showing the old file until publish()
+        used = {}
+        for e in entries.values():
+            used.setdefault(e['page'], set()).add(e['slot'])
+        # page of the closest following card that keeps its cell, for every position
+        next_page = [None] * len(order)
+        following = None
+        for i in range(len(order) - 1, -1, -1):
+            next_page[i] = following
+            if order[i] in entries:
+                following = entries[order[i]]['page']
+
+        def place(*near):
+            for page in near:
+                if page is not None and len(used.get(page, ())) < SLOTS_PER_PAGE:
+                    break
+            else:
+                page = next((p for p in sorted(used) if len(used[p]) < SLOTS_PER_PAGE),
+                            max(used, default=-1) + 1)
+            slots = used.setdefault(page, set())
+            slot = next(s for s in range(SLOTS_PER_PAGE) if s not in slots)
+            slots.add(slot)
+            return page, slot
+
+        rebuild = set()
+        previous = None
+        for i, src in enumerate(order):
+            e = entries.get(src)
+            if e is None:
+                thumb, mtime_ns = wanted[src]
+                page, slot = place(previous, next_page[i])
+                e = entries[src] = {'thumb': thumb, 'mtime_ns': mtime_ns, 'page': page, 'slot': slot,
+                                    'uid': _uid(src, mtime_ns), 'size': None}
+                rebuild.add(page)
+            previous = e['page']
+
+        os.makedirs(self.root, exist_ok=True)
+        obsolete = []
+        added = 0
+        for page in sorted(rebuild):
+            # pages are composed from the card thumbnails every time instead of pasting into
+            # the previous page image, so a poster is only ever JPEG-compressed once more
+            page_im = Image.new('RGB', (PAGE_PX, PAGE_PX))
+            for src, e in list(entries.items()):
+                if e['page'] != page:
+                    continue
+                try:
+                    with Image.open(e['thumb']) as im:
+                        im = _to_rgb(im)
+                        if max(im.size) > CELL - 2 * PADDING:
+                            im.thumbnail((CELL - 2 * PADDING, CELL - 2 * PADDING))
+                except Exception:
+                    del entries[src]
+                    continue
+                if e['size'] is None:
+                    added += 1
+                e['size'] = list(im.size)
+                self._paste(page_im, im, e['slot'])
+            old_name = pages.get(page)
+            # a new file name per revision: Kivy caches page textures by file name
+            gen = int(old_name.rsplit('.', 2)[1]) + 1 if old_name else 0
+            name = f'{_page_name(page)}.{gen}.jpg'
+            tmp = os.path.join(self.root, name + '.part')
+            page_im.save(tmp, 'JPEG', quality=PAGE_QUALITY)
+            os.replace(tmp, os.path.join(self.root, name))
+            pages[page] = name
+            if old_name:
+                obsolete.append(old_name)
+        touched.update(rebuild)
+
+        changed = []
+        for page in sorted(touched):
+            regions = {}
+            for e in entries.values():
+                if e['page'] == page:
+                    x, y = self._cell_box(e['slot'])
+                    w, h = e['size']
+                    # .atlas regions count y from the bottom of the page
+                    regions[e['uid']] = [x, PAGE_PX - y - h, w, h]
+            atlas_path = self.url(page) + '.atlas'
+            if regions:
+                self._write_json(atlas_path, {pages[page]: regions})
+            else:
+                try:
+                    os.remove(atlas_path)
+                except OSError:
+                    pass
+                if page in pages:
+                    obsolete.append(pages.pop(page))
+            changed.append(self.url(page))
+
+        if changed:
+            self._write_json(os.path.join(self.root, INDEX_NAME), {
+                'cell': CELL, 'page_cells': PAGE_CELLS,
+                'pages': {str(p): name for p, name in pages.items()},
+                'entries': entries})
+        with self._lock:
+            self._staged = (entries, pages, obsolete)
+        return {'added': added, 'removed': len(removed), 'pages': changed}
+
+    def publish(self):
+        """Make the last sync() visible to source_for() and delete replaced page images."""
+        with self._lock:
+            staged, self._staged = self._staged, None
+            if staged is None:
+                return
+            self._entries, self._pages, obsolete = staged
+        for name in obsolete:
+            try:
+                os.remove(os.path.join(self.root, name))
+            except OSError:
+                pass
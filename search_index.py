@@ -0,0 +1,78 @@
+"""
+Trigram index used for substring search over anime entries.
+Keeps lowercased title/description/tags per record and posting lists of 3-character grams,
+so a query only has to verify the records that contain every trigram of the query.
+"""
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+class TrigramIndex:
+    def __init__(self):
+        # doc_id -> (title, description, tags) already lowercased
+        self._texts = {}
+        # trigram -> set of doc_ids
+        self._postings = {}
+
+    def __len__(self):
+        return len(self._texts)
+
+    def clear(self):
+        self._texts = {}
+        self._postings = {}
+
+    def add(self, doc_id, record):
+        """Index (or re-index) a record under doc_id."""
+        if doc_id in self._texts:
+            self.remove(doc_id)
+        title = (record.get('title') or '').lower()
+        description = (record.get('description') or '').lower()
+        tags = tuple(t.lower() for t in record.get('tags', []) or [])
+        self._texts[doc_id] = (title, description, tags)
+        grams = _trigrams(title) | _trigrams(description)
+        for t in tags:
+            grams |= _trigrams(t)
+        for g in grams:
+            self._postings.setdefault(g, set()).add(doc_id)
+
+    def remove(self, doc_id):
+        texts = self._texts.pop(doc_id, None)
+        if texts is None:
+            return
+        title, description, tags = texts
+        grams = _trigrams(title) | _trigrams(description)
+        for t in tags:
+            grams |= _trigrams(t)
+        for g in grams:
+            ids = self._postings.get(g)
+            if ids is not None:
+                ids.discard(doc_id)
+                if not ids:
+                    del self._postings[g]
+
+    def _matches(self, doc_id, q):
+        title, description, tags = self._texts[doc_id]
+        return q in title or q in description or any(q in t for t in tags)
+
+    def search(self, query):
+        """Return the set of doc_ids whose title, description or any tag contains query (case-insensitive)."""
+        q = (query or '').lower()
+        if not q:
+            return set(self._texts)
+        grams = _trigrams(q)
+        if not grams:
+            # too short for trigrams: verify every record against the cached lowercase text
+            return {i for i in self._texts if self._matches(i, q)}
+        postings = []
+        for g in grams:
+            ids = self._postings.get(g)
+            if not ids:
+                return set()
+            postings.append(ids)
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for ids in postings[1:]:
+            candidates &= ids
+            if not candidates:
+                return candidates
+        return {i for i in candidates if self._matches(i, q)}
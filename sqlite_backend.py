@@ -0,0 +1,492 @@
+"""
+SQLite backend for the anime collection.
+SQLiteAnimeDatabase exposes the same methods as database.AnimeDatabase but keeps the library
+in an SQLite file (WAL mode) with indexed title/tag/date columns and an FTS5 trigram table
+for substring search, so nothing has to be loaded into memory to open the collection.
+
+One-shot migration from an existing TinyDB file:
+    python sqlite_backend.py anime.db anime.sqlite
+"""
+import os
+import sys
+import json
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from tinydb.table import Document
+
+from database import validate_entry, stream_import, plan_merge, IMPORT_MODES, IMPORT_BACKUP_SUFFIX
+from storage import JournalTable
+
+# columns stored directly; anything else an entry carries goes to the extra JSON blob
+_COLUMNS = ('title', 'description', 'poster_path', 'screenshots_paths', 'tags', 'added_date')
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS anime (
+    id INTEGER PRIMARY KEY,
+    title TEXT NOT NULL,
+    title_key TEXT NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    poster_path TEXT NOT NULL DEFAULT '',
+    screenshots_paths TEXT NOT NULL DEFAULT '[]',
+    tags TEXT NOT NULL DEFAULT '[]',
+    added_date TEXT NOT NULL DEFAULT '',
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_anime_title ON anime(title);
+CREATE INDEX IF NOT EXISTS idx_anime_title_key ON anime(title_key);
+CREATE INDEX IF NOT EXISTS idx_anime_added_date ON anime(added_date);
+CREATE TABLE IF NOT EXISTS anime_tags (
+    anime_id INTEGER NOT NULL REFERENCES anime(id) ON DELETE CASCADE,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (anime_id, tag)
+);
+CREATE INDEX IF NOT EXISTS idx_anime_tags_tag ON anime_tags(tag);
+'''
+
+# external-content FTS table kept in sync by triggers; tags are indexed as newline-joined text
+_FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS anime_fts USING fts5(
+    title, description, tags_text, content='', tokenize='trigram'
+);
+CREATE TRIGGER IF NOT EXISTS anime_fts_ai AFTER INSERT ON anime BEGIN
+    INSERT INTO anime_fts(rowid, title, description, tags_text)
+    VALUES (new.id, new.title, new.description, py_tags_text(new.tags));
+END;
+CREATE TRIGGER IF NOT EXISTS anime_fts_ad AFTER DELETE ON anime BEGIN
+    INSERT INTO anime_fts(anime_fts, rowid, title, description, tags_text)
+    VALUES ('delete', old.id, old.title, old.description, py_tags_text(old.tags));
+END;
+CREATE TRIGGER IF NOT EXISTS anime_fts_au AFTER UPDATE ON anime BEGIN
+    INSERT INTO anime_fts(anime_fts, rowid, title, description, tags_text)
+    VALUES ('delete', old.id, old.title, old.description, py_tags_text(old.tags));
+    INSERT INTO anime_fts(rowid, title, description, tags_text)
+    VALUES (new.id, new.title, new.description, py_tags_text(new.tags));
+END;
+'''
+
+def _tags_text(tags_json):
+    try:
+        return '\n'.join(json.loads(tags_json or '[]'))
+    except Exception:
+        return ''
+
+def _row_to_doc(row):
+    doc = {
+        'title': row['title'],
+        'description': row['description'],
+        'poster_path': row['poster_path'],
+        'screenshots_paths': json.loads(row['screenshots_paths'] or '[]'),
+        'tags': json.loads(row['tags'] or '[]'),
+        'added_date': row['added_date'],
+    }
+    if row['extra']:
+        try:
+            doc.update(json.loads(row['extra']))
+        except ValueError:
+            pass
+    return Document(doc, row['id'])
+
+def _doc_to_params(doc):
+    extra = {k: v for k, v in doc.items() if k not in _COLUMNS}
+    return (
+        doc.get('title', ''),
+        (doc.get('title') or '').lower(),
+        doc.get('description', '') or '',
+        doc.get('poster_path', '') or '',
+        json.dumps(doc.get('screenshots_paths', []) or [], ensure_ascii=False),
+        json.dumps(doc.get('tags', []) or [], ensure_ascii=False),
+        doc.get('added_date', '') or '',
+        json.dumps(extra, ensure_ascii=False) if extra else None,
+    )
+
+class SQLiteAnimeDatabase:
+    def __init__(self, db_path='anime.sqlite'):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._depth = 0
+        # autocommit mode; batch() opens explicit transactions
+        self.conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.create_function('py_tags_text', 1, _tags_text, deterministic=True)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(_SCHEMA)
+        try:
+            self.conn.executescript(_FTS_SCHEMA)
+            self._fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5 or without the trigram tokenizer (< 3.34): plain scans
+            self._fts = False
+        # an import was interrupted (crash, killed process): go back to the library before it
+        if os.path.exists(self.db_path + IMPORT_BACKUP_SUFFIX):
+            self._restore_import_backup()
+
+    def close(self):
+        with self._lock:
+            try:
+                self.conn.close()
+            except Exception:
+                pass
+
+    @contextmanager
+    def batch(self):
+        """Run the writes made inside the block in one transaction. Batches may be nested."""
+        with self._lock:
+            self._depth += 1
+            if self._depth == 1:
+                self.conn.execute('BEGIN')
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute('ROLLBACK')
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.conn.execute('COMMIT')
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def _write_tags(self, doc_id, tags):
+        self.conn.execute('DELETE FROM anime_tags WHERE anime_id = ?', (doc_id,))
+        self.conn.executemany('INSERT OR IGNORE INTO anime_tags(anime_id, tag) VALUES (?, ?)', [(doc_id, t) for t in tags or []])
+
+    def _insert(self, doc, doc_id=None):
+        cur = self.conn.execute(
+            'INSERT INTO anime(id, title, title_key, description, poster_path, screenshots_paths, tags, added_date, extra) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', (doc_id,) + _doc_to_params(doc))
+        doc_id = cur.lastrowid
+        self._write_tags(doc_id, doc.get('tags'))
+        return doc_id
+
+    def add_anime(self, title, description, poster_path, screenshots_paths, tags=None):
+        """Insert a new entry and return its doc_id."""
+        anime_entry = {
+            'title': title,
+            'description': description,
+            'poster_path': poster_path,
+            'screenshots_paths': screenshots_paths,
+            'tags': tags or [],
+            'added_date': datetime.now().isoformat()
+        }
+        with self.batch():
+            return self._insert(anime_entry)
+
+    def get_anime(self, doc_id):
+        rows = self._query('SELECT * FROM anime WHERE id = ?', (doc_id,))
+        return _row_to_doc(rows[0]) if rows else None
+
+    def get_anime_id(self, title):
+        rows = self._query('SELECT id FROM anime WHERE title = ? ORDER BY id LIMIT 1', (title,))
+        return rows[0]['id'] if rows else None
+
+    def get_anime_by_title(self, title):
+        return [_row_to_doc(r) for r in self._query('SELECT * FROM anime WHERE title = ? ORDER BY id', (title,))]
+
+    def search_ids(self, query):
+        """Return the set of doc_ids whose title, description or tags contain query (case-insensitive)."""
+        q = (query or '').lower()
+        if not q:
+            return {r['id'] for r in self._query('SELECT id FROM anime')}
+        if self._fts and len(q) >= 3 and q.isascii():
+            # the trigram FTS only narrows the candidates; the str.lower() substring test below
+            # decides, so results match the TinyDB backend exactly. Non-ASCII queries scan:
+            # the tokenizer folds case differently from str.lower() ('İ' -> 'i' vs 'i̇') and
+            # would drop real matches before the test sees them
+            rows = self._query(
+                'SELECT id, title, description, tags FROM anime WHERE id IN '
+                '(SELECT rowid FROM anime_fts WHERE anime_fts MATCH ?)',
+                ('"' + q.replace('"', '""') + '"',))
+        else:
+            rows = self._query('SELECT id, title, description, tags FROM anime')
+        found = set()
+        for r in rows:
+            if q in (r['title'] or '').lower() or q in (r['description'] or '').lower() \
+                    or any(q in t.lower() for t in json.loads(r['tags'] or '[]')):
+                found.add(r['id'])
+        return found
+
+    def search_anime(self, query):
+        ids = self.search_ids(query)
+        return [a for a in self.get_all_anime(sort_by=None) if a.doc_id in ids]
+
+    def get_all_anime(self, sort_by='title', reverse=False):
+        order = 'DESC' if reverse else 'ASC'
+        if sort_by == 'title':
+            sql = f'SELECT * FROM anime ORDER BY title_key {order}, id {order}'
+        elif sort_by == 'date':
+            sql = f'SELECT * FROM anime ORDER BY added_date {order}, id {order}'
+        else:
+            sql = 'SELECT * FROM anime ORDER BY id'
+        return [_row_to_doc(r) for r in self._query(sql)]
+
+    def get_page(self, cursor=None, limit=50, sort_by='title', reverse=False, filter=None):
+        """Return (records, next_cursor) for one page; keyset pagination over the sort index."""
+        column = {'title': 'title_key', 'date': 'added_date'}.get(sort_by, 'id')
+        order = 'DESC' if reverse else 'ASC'
+        cmp = '<' if reverse else '>'
+        records = []
+        last = tuple(cursor) if cursor is not None else None
+        while len(records) < limit:
+            if last is None:
+                rows = self._query(f'SELECT * FROM anime ORDER BY {column} {order}, id {order} LIMIT ?', (limit,))
+            else:
+                rows = self._query(
+                    f'SELECT * FROM anime WHERE ({column}, id) {cmp} (?, ?) ORDER BY {column} {order}, id {order} LIMIT ?',
+                    (last[0], last[1], limit))
+            if not rows:
+                return records, None
+            for r in rows:
+                last = (r[column], r['id'])
+                doc = _row_to_doc(r)
+                if filter is None or filter(doc):
+                    records.append(doc)
+                    if len(records) >= limit:
+                        break
+            if len(rows) < limit and last == (rows[-1][column], rows[-1]['id']):
+                # short read fully consumed: nothing after it
+                return records, None
+        return records, last
+
+    def iter_anime(self, sort_by='title', reverse=False, filter=None, page_size=500):
+        """Yield records lazily in sorted order, fetching them page by page."""
+        cursor = None
+        while True:
+            records, cursor = self.get_page(cursor, page_size, sort_by, reverse, filter)
+            yield from records
+            if cursor is None:
+                return
+
+    def get_all_tags(self):
+        return [r['tag'] for r in self._query('SELECT DISTINCT tag FROM anime_tags ORDER BY tag')]
+
+    def get_anime_by_tag(self, tag):
+        return [_row_to_doc(r) for r in self._query(
+            'SELECT a.* FROM anime a JOIN anime_tags t ON t.anime_id = a.id WHERE t.tag = ? ORDER BY a.id', (tag,))]
+
+    def _apply_update(self, doc_ids, new_data):
+        if 'tags' not in new_data:
+            new_data['tags'] = []
+        updated = []
+        with self.batch():
+            for doc_id in doc_ids:
+                doc = self.get_anime(doc_id)
+                if doc is None:
+                    continue
+                merged = dict(doc)
+                merged.update(new_data)
+                self._replace(doc_id, merged)
+                updated.append(doc_id)
+        return updated
+
+    def _replace(self, doc_id, doc):
+        self.conn.execute(
+            'UPDATE anime SET title = ?, title_key = ?, description = ?, poster_path = ?, '
+            'screenshots_paths = ?, tags = ?, added_date = ?, extra = ? WHERE id = ?',
+            _doc_to_params(doc) + (doc_id,))
+        self._write_tags(doc_id, doc.get('tags'))
+
+    def update_anime_by_id(self, doc_id, new_data):
+        """Update a single entry by doc_id. Returns True if the entry existed."""
+        return bool(self._apply_update([doc_id], new_data))
+
+    def update_anime(self, title, new_data):
+        with self.batch():
+            ids = [r['id'] for r in self._query('SELECT id FROM anime WHERE title = ?', (title,))]
+            self._apply_update(ids, new_data)
+
+    def delete_anime_many(self, doc_ids):
+        """Delete several entries at once. Returns the list of doc_ids actually removed."""
+        removed = []
+        with self.batch():
+            for doc_id in doc_ids:
+                if self.conn.execute('DELETE FROM anime WHERE id = ?', (doc_id,)).rowcount:
+                    removed.append(doc_id)
+        return removed
+
+    def delete_anime_by_id(self, doc_id):
+        """Delete a single entry by doc_id. Returns True if the entry existed."""
+        return bool(self.delete_anime_many([doc_id]))
+
+    def delete_anime(self, title):
+        with self.batch():
+            self.conn.execute('DELETE FROM anime WHERE title = ?', (title,))
+
+    def export_to_json(self):
+        return self.get_all_anime(sort_by=None)
+
+    def _truncate(self):
+        self.conn.execute('DELETE FROM anime')
+        if self._fts:
+            self.conn.execute("INSERT INTO anime_fts(anime_fts) VALUES ('delete-all')")
+
+    def _merge_chunk(self, entries, key):
+        inserts, updates, unchanged = plan_merge(entries, self.get_anime, self.get_anime_id, key)
+        for doc_id, record in updates.items():
+            self._replace(doc_id, record)
+        for record in inserts:
+            self._insert(record)
+        return {'inserted': len(inserts), 'updated': len(updates), 'unchanged': unchanged}
+
+    def import_from_json(self, data, mode='replace', key='title', on_chunk=None):
+        """
+        Import a list of anime entries from JSON-like data.
+        Validates each entry and inserts only valid ones. mode/key/on_chunk as in
+        AnimeDatabase.import_from_json.
+        Returns a report dict: { 'imported': int, 'skipped': int, 'errors': [str, ...] },
+        plus 'inserted', 'updated' and 'unchanged' counts for a merge.
+        """
+        if not isinstance(data, list):
+            raise ValueError('Data must be a list of anime entries')
+        if mode not in IMPORT_MODES:
+            raise ValueError(f'Unknown import mode: {mode}')
+        merge = mode == 'merge'
+
+        valid_entries = []
+        errors = []
+        for idx, entry in enumerate(data):
+            err = validate_entry(entry, idx, merge)
+            if err:
+                errors.append(err)
+                continue
+            valid_entries.append(entry)
+
+        if merge:
+            with self.batch():
+                counts = self._merge_chunk(valid_entries, key)
+            if on_chunk is not None and valid_entries:
+                on_chunk(valid_entries)
+            report = {'imported': len(valid_entries), 'skipped': len(data) - len(valid_entries), 'errors': errors}
+            report.update(counts)
+            return report
+
+        # If there are valid entries, replace DB content with them (truncate then insert)
+        imported = 0
+        if valid_entries:
+            with self.batch():
+                self._truncate()
+                for entry in valid_entries:
+                    self._insert(entry)
+            imported = len(valid_entries)
+            if on_chunk is not None:
+                on_chunk(valid_entries)
+
+        return {
+            'imported': imported,
+            'skipped': len(data) - imported,
+            'errors': errors
+        }
+
+    def _write_import_backup(self):
+        path = self.db_path + IMPORT_BACKUP_SUFFIX
+        tmp = path + '.part'
+        for leftover in (tmp, tmp + '-wal', tmp + '-shm'):
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+        with self._lock:
+            dst = sqlite3.connect(tmp)
+            try:
+                self.conn.backup(dst)
+            finally:
+                dst.close()
+        # renamed into place complete, so a torn backup is never restored
+        os.replace(tmp, path)
+
+    def _restore_import_backup(self):
+        path = self.db_path + IMPORT_BACKUP_SUFFIX
+        with self._lock:
+            src = sqlite3.connect(path)
+            try:
+                src.backup(self.conn)
+            finally:
+                src.close()
+        self._drop_import_backup()
+
+    def _drop_import_backup(self):
+        path = self.db_path + IMPORT_BACKUP_SUFFIX
+        for leftover in (path, path + '-wal', path + '-shm'):
+            try:
+                os.remove(leftover)
+            except OSError:
+                pass
+
+    def import_from_json_stream(self, fp, progress=None, chunk_size=5000, total_bytes=None, tell=None, mode='replace', key='title', on_chunk=None):
+        """Streaming variant of import_from_json. Every chunk is its own transaction, so
+        readers are not blocked for the whole import; the previous library is backed up
+        and restored on failure as in AnimeDatabase.import_from_json_stream."""
+        if mode not in IMPORT_MODES:
+            raise ValueError(f'Unknown import mode: {mode}')
+
+        def merge_chunk(entries):
+            with self.batch():
+                return self._merge_chunk(entries, key)
+
+        def begin_replace():
+            with self.batch():
+                self._truncate()
+
+        def insert_chunk(entries):
+            with self.batch():
+                for entry in entries:
+                    self._insert(entry)
+
+        self._write_import_backup()
+        try:
+            if mode == 'merge':
+                report = stream_import(fp, None, merge_chunk, progress, chunk_size, total_bytes, tell,
+                                       merge=True, on_chunk=on_chunk)
+            else:
+                report = stream_import(fp, begin_replace, insert_chunk, progress, chunk_size, total_bytes, tell,
+                                       on_chunk=on_chunk)
+        except BaseException:
+            self._restore_import_backup()
+            raise
+        self._drop_import_backup()
+        return report
+
+def _read_tinydb_docs(json_path):
+    if os.path.exists(json_path + '.journal'):
+        # journaled library: replay the journal on top of the snapshot
+        table = JournalTable(json_path)
+        try:
+            return table.all()
+        finally:
+            table.close()
+    if not os.path.exists(json_path) or os.path.getsize(json_path) == 0:
+        return []
+    with open(json_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [Document(v, int(k)) for k, v in (data.get('_default') or {}).items()]
+
+def migrate_tinydb_to_sqlite(json_path='anime.db', sqlite_path='anime.sqlite'):
+    """Copy every entry of a TinyDB anime.db into a new SQLite database, keeping doc_ids.
+
+    Refuses to run against a SQLite database that already has entries. Returns the number of migrated entries.
+    """
+    docs = _read_tinydb_docs(json_path)
+    db = SQLiteAnimeDatabase(sqlite_path)
+    try:
+        if db._query('SELECT 1 FROM anime LIMIT 1'):
+            raise ValueError(f'{sqlite_path} already contains entries')
+        with db.batch():
+            for doc in docs:
+                db._insert(doc, doc_id=doc.doc_id)
+        return len(docs)
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    src = sys.argv[1] if len(sys.argv) > 1 else 'anime.db'
+    dst = sys.argv[2] if len(sys.argv) > 2 else 'anime.sqlite'
+    count = migrate_tinydb_to_sqlite(src, dst)
+    print(f'Migrated {count} entries from {src} to {dst}')
@@ -0,0 +1,321 @@
+"""
+Storage helpers for the anime database.
+BatchingMiddleware lets AnimeDatabase group several TinyDB writes into a single file write.
+JournalTable is an append-only backend that writes one journal line per mutation.
+"""
+import os
+import json
+import threading
+
+from tinydb.middlewares import Middleware
+from tinydb.table import Document
+
+class BatchingMiddleware(Middleware):
+    """Pass-through middleware that buffers reads/writes while a batch is open.
+
+    Outside a batch every write goes straight to the wrapped storage. Inside a batch
+    the document is kept in memory and written once when the outermost batch ends.
+    """
+    def __init__(self, storage_cls):
+        super(BatchingMiddleware, self).__init__(storage_cls)
+        self._depth = 0
+        self._cache = None
+        self._dirty = False
+
+    def read(self):
+        if self._depth:
+            if self._cache is None:
+                self._cache = self.storage.read()
+            return self._cache
+        return self.storage.read()
+
+    def write(self, data):
+        if self._depth:
+            self._cache = data
+            self._dirty = True
+        else:
+            self.storage.write(data)
+
+    def begin_batch(self):
+        self._depth += 1
+
+    def end_batch(self):
+        if self._depth == 0:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            self.flush()
+
+    def abort_batch(self):
+        # leaving a batch after an error: the outermost batch drops the buffered writes
+        if self._depth == 0:
+            return
+        self._depth -= 1
+        if self._depth == 0:
+            self._dirty = False
+            self._cache = None
+
+    def flush(self):
+        try:
+            if self._dirty:
+                self.storage.write(self._cache)
+        finally:
+            self._dirty = False
+            self._cache = None
+
+    def close(self):
+        self.flush()
+        self.storage.close()
+
+
+class JournalTable:
+    """Append-only journaled replacement for a TinyDB table.
+
+    The last compacted state lives in db_path (same JSON layout TinyDB uses, so the file
+    stays readable by the default backend) and every mutation since then is appended as
+    one JSON line to db_path + '.journal'. Writing an entry therefore costs the size of the
+    entry, not the size of the collection. On open the journal is replayed on top of the
+    snapshot; a torn last line left by a crash is discarded. Once the journal grows past
+    compact_threshold bytes a background thread folds it into a new snapshot.
+
+    Implements the subset of the TinyDB table API used by AnimeDatabase.
+    """
+    def __init__(self, db_path, table_name='_default', compact_threshold=4 * 1024 * 1024, fsync=True):
+        self.db_path = db_path
+        self.journal_path = db_path + '.journal'
+        self.table_name = table_name
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+        self._lock = threading.RLock()
+        self._docs = {}
+        self._next_id = 1
+        self._depth = 0
+        self._batch_offset = 0
+        self._pending = False
+        self._compactor = None
+        self._load()
+        self._fp = open(self.journal_path, 'ab')
+
+    @property
+    def storage(self):
+        # AnimeDatabase.batch() talks to the storage object; the journal is its own storage
+        return self
+
+    def _load(self):
+        try:
+            if os.path.exists(self.db_path) and os.path.getsize(self.db_path) > 0:
+                with open(self.db_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                for k, v in (data.get(self.table_name) or {}).items():
+                    self._docs[int(k)] = v
+        except ValueError:
+            raise ValueError(f'Corrupted database snapshot: {self.db_path}')
+        good = 0
+        if os.path.exists(self.journal_path):
+            with open(self.journal_path, 'rb') as f:
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break
+                    try:
+                        self._replay(json.loads(line))
+                    except ValueError:
+                        break
+                    good += len(line)
+            # drop a torn tail so new records are appended after the last complete one
+            if good != os.path.getsize(self.journal_path):
+                with open(self.journal_path, 'r+b') as f:
+                    f.truncate(good)
+        self._next_id = max(self._docs) + 1 if self._docs else 1
+
+    def _replay(self, rec):
+        op = rec.get('op')
+        if op == 'put':
+            self._docs[int(rec['id'])] = rec['doc']
+        elif op == 'del':
+            for i in rec['ids']:
+                self._docs.pop(int(i), None)
+        elif op == 'clear':
+            self._docs = {}
+
+    def _append(self, rec):
+        line = json.dumps(rec, ensure_ascii=False, separators=(',', ':')) + '\n'
+        self._fp.write(line.encode('utf-8'))
+        if self._depth:
+            self._pending = True
+        else:
+            self._sync()
+
+    def _sync(self):
+        self._fp.flush()
+        if self.fsync:
+            try:
+                os.fsync(self._fp.fileno())
+            except OSError:
+                pass
+        self._pending = False
+        self._maybe_compact()
+
+    # batching, mirrors BatchingMiddleware
+    def begin_batch(self):
+        with self._lock:
+            if self._depth == 0:
+                self._batch_offset = self._fp.tell()
+            self._depth += 1
+
+    def end_batch(self):
+        with self._lock:
+            if self._depth == 0:
+                return
+            self._depth -= 1
+            if self._depth == 0:
+                if self._pending:
+                    self._sync()
+                else:
+                    # a compaction may have been skipped while the batch was open
+                    self._maybe_compact()
+
+    def abort_batch(self):
+        """Leave a batch after an error; the outermost batch cuts its records off the journal."""
+        with self._lock:
+            if self._depth == 0:
+                return
+            self._depth -= 1
+            if self._depth:
+                return
+            self._fp.flush()
+            self._fp.truncate(self._batch_offset)
+            self._fp.close()
+            self._pending = False
+            self._docs = {}
+            self._load()
+            self._fp = open(self.journal_path, 'ab')
+            self._maybe_compact()
+
+    # TinyDB table API subset
+    def all(self):
+        with self._lock:
+            return [Document(v, k) for k, v in self._docs.items()]
+
+    def _put(self, document):
+        if isinstance(document, Document):
+            doc_id = document.doc_id
+            if doc_id in self._docs:
+                raise ValueError(f'Document with ID {doc_id} already exists')
+        else:
+            doc_id = self._next_id
+        self._next_id = max(self._next_id, doc_id + 1)
+        doc = dict(document)
+        self._docs[doc_id] = doc
+        self._append({'op': 'put', 'id': doc_id, 'doc': doc})
+        return doc_id
+
+    def insert(self, document):
+        with self._lock:
+            return self._put(document)
+
+    def insert_multiple(self, documents):
+        with self._lock:
+            self.begin_batch()
+            try:
+                return [self._put(d) for d in documents]
+            finally:
+                self.end_batch()
+
+    def update(self, fields, doc_ids):
+        with self._lock:
+            updated = []
+            self.begin_batch()
+            try:
+                for i in doc_ids:
+                    if i not in self._docs:
+                        continue
+                    # replace rather than mutate so a running compaction sees a consistent dict
+                    doc = dict(self._docs[i])
+                    doc.update(fields)
+                    self._docs[i] = doc
+                    self._append({'op': 'put', 'id': i, 'doc': doc})
+                    updated.append(i)
+            finally:
+                self.end_batch()
+            return updated
+
+    def remove(self, doc_ids):
+        with self._lock:
+            removed = [i for i in doc_ids if self._docs.pop(i, None) is not None]
+            if removed:
+                self._append({'op': 'del', 'ids': removed})
+            return removed
+
+    def truncate(self):
+        with self._lock:
+            self._docs = {}
+            self._next_id = 1
+            self._append({'op': 'clear'})
+
+    # compaction
+    def _maybe_compact(self):
+        try:
+            if self._fp.tell() < self.compact_threshold:
+                return
+        except (OSError, ValueError):
+            return
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, daemon=True)
+        self._compactor.start()
+
+    def compact(self):
+        """Write the current state as a new snapshot and drop the journal records it covers.
+
+        Skipped while a batch is open: the batch may still be aborted, and its writes must
+        not end up in a snapshot. The batch end checks the journal size again.
+        Returns True if a snapshot was written.
+        """
+        with self._lock:
+            if self._depth:
+                return False
+            self._fp.flush()
+            offset = self._fp.tell()
+            # docs are never mutated in place, a shallow copy is a consistent view
+            state = dict(self._docs)
+        tmp = self.db_path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({self.table_name: {str(k): v for k, v in state.items()}}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.db_path)
+        # replaying the whole journal over the new snapshot is harmless (puts/deletes are
+        # idempotent), so a crash before the journal is trimmed loses nothing
+        with self._lock:
+            self._fp.flush()
+            self._fp.close()
+            with open(self.journal_path, 'rb') as f:
+                f.seek(offset)
+                tail = f.read()
+            jtmp = self.journal_path + '.tmp'
+            with open(jtmp, 'wb') as f:
+                f.write(tail)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(jtmp, self.journal_path)
+            self._fp = open(self.journal_path, 'ab')
+            if self._depth:
+                # an open batch started before the trimmed records
+                self._batch_offset = max(0, self._batch_offset - offset)
+        return True
+
+    def close(self):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            self._fp.flush()
+            pending = self._fp.tell() > 0
+        # fold the journal on shutdown so anime.db alone is a complete copy
+        if pending:
+            try:
+                self.compact()
+            except Exception:
+                pass
+        with self._lock:
+            self._fp.close()
@@ -0,0 +1,24 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import utils
+
+
+@pytest.fixture
+def media_dirs(tmp_path, monkeypatch):
+    """Point the thumbnails, copies and their databases at tmp_path with fresh singletons."""
+    monkeypatch.setattr(utils, 'THUMBS_DIR', str(tmp_path / 'thumbnails'))
+    monkeypatch.setattr(utils, 'COPIES_DIR', str(tmp_path / 'copies'))
+    monkeypatch.setattr(utils, 'COPIES_REFS_PATH', str(tmp_path / 'copies_refs.sqlite'))
+    monkeypatch.setattr(utils, 'MEDIA_MANIFEST_PATH', str(tmp_path / 'media_manifest.sqlite'))
+    monkeypatch.setattr(utils, '_ready_dirs', set())
+    monkeypatch.setattr(utils, '_blob_store', None)
+    monkeypatch.setattr(utils, '_media_manifest', None)
+    monkeypatch.setattr(utils, '_path_resolver', None)
+    yield tmp_path
+    if utils._blob_store is not None:
+        utils._blob_store.close()
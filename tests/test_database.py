@@ -0,0 +1,79 @@
+import io
+import os
+import json
+
+import pytest
+
+from database import AnimeDatabase
+
+
+def _entry(title, **extra):
+    entry = {'title': title, 'description': '', 'poster_path': '', 'screenshots_paths': [], 'tags': []}
+    entry.update(extra)
+    return entry
+
+
+@pytest.fixture(params=['json', 'journal'])
+def db(request, tmp_path):
+    db = AnimeDatabase(str(tmp_path / 'anime.db'), storage=request.param)
+    yield db
+    db.close()
+
+
+def test_insert_after_aborted_batch(db):
+    db.add_anime('a', '', '', [])
+    db.add_anime('b', '', '', [])
+    with pytest.raises(RuntimeError):
+        with db.batch():
+            db.import_from_json([_entry('x')])
+            raise RuntimeError('abort')
+    assert sorted(a['title'] for a in db.iter_anime(sort_by=None)) == ['a', 'b']
+    doc_id = db.add_anime('c', '', '', [])
+    assert doc_id not in (1, 2)
+    assert sorted(a['title'] for a in db.iter_anime(sort_by=None)) == ['a', 'b', 'c']
+
+
+def _stream(entries, tail=']'):
+    return io.StringIO('[' + ','.join(json.dumps(e) for e in entries) + tail)
+
+
+def test_failed_stream_import_keeps_library(db):
+    db.add_anime('a', '', '', [])
+    with pytest.raises(ValueError):
+        db.import_from_json_stream(_stream([_entry(f't{i}') for i in range(50)], tail=',{"title": oops}]'), chunk_size=10)
+    assert [a['title'] for a in db.iter_anime(sort_by=None)] == ['a']
+    db.add_anime('b', '', '', [])
+    assert sorted(a['title'] for a in db.iter_anime(sort_by=None)) == ['a', 'b']
+
+
+def test_stream_import_writes_tinydb_file_once(tmp_path, monkeypatch):
+    from storage import BatchingMiddleware
+    db = AnimeDatabase(str(tmp_path / 'anime.db'))
+    writes = []
+    flush = BatchingMiddleware.flush
+
+    def counting_flush(self):
+        writes.append(self._dirty)
+        flush(self)
+    monkeypatch.setattr(BatchingMiddleware, 'flush', counting_flush)
+    db.import_from_json_stream(_stream([_entry(f't{i}') for i in range(100)]), chunk_size=10)
+    assert writes.count(True) == 1
+    db.close()
+    assert len(AnimeDatabase(str(tmp_path / 'anime.db')).export_to_json()) == 100
+
+
+def test_stream_import_of_gzip_export(db, tmp_path):
+    from jsonio import open_json_source, write_json_records
+    path = str(tmp_path / 'export.ndjson.gz')
+    entries = [_entry(f't{i}', tags=['x'], added_date='2024-01-01T00:00:00') for i in range(120)]
+    write_json_records(iter(entries[:60] + [{'title': 5}] + entries[60:]), path, fmt='ndjson', compress=True)
+    calls = []
+    fp, tell = open_json_source(path)
+    with fp:
+        report = db.import_from_json_stream(fp, progress=lambda *args: calls.append(args), chunk_size=25,
+                                            total_bytes=os.path.getsize(path), tell=tell)
+    assert report['imported'] == 120
+    assert report['skipped'] == 1 and len(report['errors']) == 1
+    assert [dict(a) for a in db.iter_anime(sort_by=None)] == entries
+    # the last report covers the whole (compressed) file
+    assert calls and calls[-1][0] == 121 and calls[-1][1] == 100
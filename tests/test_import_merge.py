@@ -0,0 +1,117 @@
+import io
+import json
+
+import pytest
+
+from database import AnimeDatabase, export_record
+from sqlite_backend import SQLiteAnimeDatabase
+
+
+def _entry(title, **extra):
+    entry = {'title': title, 'description': '', 'poster_path': '', 'screenshots_paths': [], 'tags': [],
+             'added_date': '2024-01-01T00:00:00'}
+    entry.update(extra)
+    return entry
+
+
+def _bare(title, **extra):
+    # an entry as an older export has it: no added_date
+    entry = _entry(title, **extra)
+    del entry['added_date']
+    return entry
+
+
+@pytest.fixture(params=['json', 'journal', 'sqlite'])
+def db(request, tmp_path):
+    if request.param == 'sqlite':
+        db = SQLiteAnimeDatabase(str(tmp_path / 'anime.sqlite'))
+    else:
+        db = AnimeDatabase(str(tmp_path / 'anime.db'), storage=request.param)
+    db.import_from_json([_entry(f't{i}') for i in range(10)])
+    yield db
+    db.close()
+
+
+def _import(db, entries, streamed, key='title'):
+    if streamed:
+        fp = io.StringIO(json.dumps(entries))
+        return db.import_from_json_stream(fp, chunk_size=3, mode='merge', key=key)
+    return db.import_from_json(entries, mode='merge', key=key)
+
+
+def _by_title(db, title):
+    return db.get_anime(db.get_anime_id(title))
+
+
+def _titles(db):
+    return {a.doc_id: a['title'] for a in db.iter_anime(sort_by=None)}
+
+
+@pytest.mark.parametrize('streamed', [False, True])
+def test_merge_by_title_counts(db, streamed):
+    before = _titles(db)
+    entries = [
+        _entry('t0'),                                   # unchanged
+        _bare('t1', description='new text'),            # updated, added_date kept
+        _entry('t2', tags=['a']),                       # updated
+        _entry('new one'),                              # inserted
+        _bare('new two'),                               # inserted, added_date filled in
+        {'title': 'no other fields'},                   # skipped
+    ]
+    report = _import(db, entries, streamed)
+    assert (report['inserted'], report['updated'], report['unchanged']) == (2, 2, 1)
+    assert report['imported'] == 5 and report['skipped'] == 1
+    assert len(report['errors']) == 1
+
+    titles = _titles(db)
+    # records missing from the file stay, matched records keep their doc_id
+    assert {k: v for k, v in titles.items() if k in before} == before
+    assert len(titles) == 12
+    t1 = _by_title(db, 't1')
+    assert t1['description'] == 'new text' and t1['added_date'] == '2024-01-01T00:00:00'
+    assert _by_title(db, 'new two')['added_date']
+
+
+@pytest.mark.parametrize('streamed', [False, True])
+def test_merge_again_is_unchanged(db, streamed):
+    exported = [export_record(a) for a in db.iter_anime(sort_by=None)]
+    report = _import(db, exported, streamed, key='id')
+    assert (report['inserted'], report['updated'], report['unchanged']) == (0, 0, 10)
+    report = _import(db, [_entry(f't{i}') for i in range(10)], streamed)
+    assert (report['inserted'], report['updated'], report['unchanged']) == (0, 0, 10)
+
+
+@pytest.mark.parametrize('streamed', [False, True])
+def test_merge_by_id(db, streamed):
+    first = db.get_anime_id('t0')
+    entries = [
+        dict(_entry('renamed'), id=first),              # updated: matched by id, not title
+        dict(_entry('t5'), id=9999),                    # unknown id: inserted
+        _entry('t6'),                                   # no id: inserted even though the title exists
+    ]
+    report = _import(db, entries, streamed, key='id')
+    assert (report['inserted'], report['updated'], report['unchanged']) == (2, 1, 0)
+    assert db.get_anime(first)['title'] == 'renamed'
+    assert sorted(_titles(db).values()).count('t6') == 2
+
+
+@pytest.mark.parametrize('streamed', [False, True])
+def test_duplicate_entries_in_file(db, streamed):
+    entries = [
+        _entry('t3', description='first'),
+        _entry('t3', description='second'),
+        _entry('dup'),
+        _entry('dup', description='later wins'),
+    ]
+    report = _import(db, entries, streamed)
+    assert _by_title(db, 't3')['description'] == 'second'
+    assert _by_title(db, 'dup')['description'] == 'later wins'
+    assert list(_titles(db).values()).count('dup') == 1
+    assert report['imported'] == 4
+
+
+def test_unknown_merge_key(db):
+    with pytest.raises(ValueError):
+        db.import_from_json([_entry('x')], mode='merge', key='added_date')
+    with pytest.raises(ValueError):
+        db.import_from_json([_entry('x')], mode='upsert')
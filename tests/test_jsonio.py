@@ -0,0 +1,144 @@
+import gzip
+import io
+import json
+
+import pytest
+
+from jsonio import iter_json_array, open_json_source, write_json_records
+
+RECORDS = [
+    {'title': 'Ünïcödé ✓', 'n': 1.5e3, 'neg': -12, 'flag': True, 'none': None, 'esc': 'a\\"bé'},
+    {'title': 'second', 'tags': ['x', 'y'], 'nested': {'k': [1, 2, {'z': False}]}},
+    {'title': '', 'n': 0, 'big': 'x' * 300},
+]
+
+
+class CountingReader(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.bytes_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.bytes_read += len(data)
+        return data
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 16, 64, 1 << 16])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_array_across_chunk_boundaries(chunk_size, indent):
+    data = json.dumps(RECORDS, ensure_ascii=False, indent=indent).encode('utf-8')
+    assert list(iter_json_array(io.BytesIO(data), chunk_size=chunk_size)) == RECORDS
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 1 << 16])
+def test_ndjson_and_bom(chunk_size):
+    data = '﻿' + ''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in RECORDS)
+    assert list(iter_json_array(io.BytesIO(data.encode('utf-8')), chunk_size=chunk_size)) == RECORDS
+
+
+def test_empty_inputs():
+    assert list(iter_json_array(io.BytesIO(b''))) == []
+    assert list(iter_json_array(io.BytesIO(b' [ ] '))) == []
+
+
+@pytest.mark.parametrize('fmt', ['pretty', 'compact', 'ndjson'])
+@pytest.mark.parametrize('compress', [False, True])
+def test_export_roundtrip(tmp_path, fmt, compress):
+    path = str(tmp_path / ('out.json.gz' if compress else 'out.json'))
+    assert write_json_records(iter(RECORDS), path, fmt=fmt, compress=compress) == len(RECORDS)
+    if compress:
+        with gzip.open(path, 'rb') as f:
+            assert f.read(1)
+    f, tell = open_json_source(path)
+    with f:
+        assert list(iter_json_array(f)) == RECORDS
+        assert tell() > 0
+
+
+def test_not_an_array():
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.BytesIO(b'"text"')))
+
+
+def test_truncated_array():
+    with pytest.raises(ValueError):
+        list(iter_json_array(io.BytesIO(b'[{"a": 1}, {"b": ')))
+
+
+def _big_file_with_error():
+    good = ',\n'.join(json.dumps({'title': f't{i}', 'pad': 'p' * 50}) for i in range(20000))
+    head = '[{"title": "ok"},\n{"title": oops},\n'
+    return head, (head + good + ']').encode('utf-8')
+
+
+def test_malformed_element_fails_fast_with_file_position():
+    head, data = _big_file_with_error()
+    fp = CountingReader(data)
+    items = iter_json_array(fp, chunk_size=4096)
+    assert next(items) == {'title': 'ok'}
+    with pytest.raises(ValueError) as exc:
+        next(items)
+    # the error is found without buffering the rest of the file
+    assert fp.bytes_read <= 3 * 4096
+    assert f'character {head.index("oops")}' in str(exc.value)
+
+
+def test_junk_after_element_fails_fast():
+    data = b'[{"a": 1}x' + b' ' * 100000 + b']'
+    fp = CountingReader(data)
+    with pytest.raises(ValueError) as exc:
+        list(iter_json_array(fp, chunk_size=4096))
+    assert fp.bytes_read <= 3 * 4096
+    assert 'character 9' in str(exc.value)
+
+
+def test_error_position_is_relative_to_file():
+    prefix = ',\n'.join(json.dumps({'title': f't{i}'}) for i in range(500))
+    text = '[' + prefix + ',\n{"title": "x",}]'
+    with pytest.raises(ValueError) as exc:
+        list(iter_json_array(io.BytesIO(text.encode('utf-8')), chunk_size=256))
+    assert f'character {text.rindex(",}") + 1}' in str(exc.value)
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 8])
+def test_scalars_cut_by_chunk_boundaries(chunk_size):
+    # numbers and literals that still decode when cut short ("1." of "1.5e3", "-" of "-Infinity")
+    text = '[1.5e3,-12,100000,true,false,null,-Infinity,"\\u00e9\\ud83d\\ude00",0.25]'
+    expected = json.loads(text)
+    assert list(iter_json_array(io.BytesIO(text.encode('utf-8')), chunk_size=chunk_size)) == expected
+    # text file objects are read the same way
+    assert list(iter_json_array(io.StringIO(text), chunk_size=chunk_size)) == expected
+
+
+def test_ndjson_without_trailing_newline_and_blank_lines():
+    data = b'{"a": 1}\r\n\r\n{"b": 2}'
+    assert list(iter_json_array(io.BytesIO(data), chunk_size=3)) == [{'a': 1}, {'b': 2}]
+
+
+def test_malformed_ndjson_line():
+    data = b'{"a": 1}\n{"b": }\n{"c": 3}\n'
+    items = iter_json_array(io.BytesIO(data), chunk_size=4)
+    assert next(items) == {'a': 1}
+    with pytest.raises(ValueError) as exc:
+        next(items)
+    assert 'character 15' in str(exc.value)
+
+
+def test_missing_separator():
+    with pytest.raises(ValueError) as exc:
+        list(iter_json_array(io.BytesIO(b'[{"a": 1} {"b": 2}]')))
+    assert 'character 10' in str(exc.value)
+
+
+def test_truncated_gzip_export(tmp_path):
+    path = str(tmp_path / 'out.json.gz')
+    write_json_records(iter(RECORDS * 50), path, compress=True)
+    with open(path, 'rb') as f:
+        data = f.read()
+    with open(path, 'wb') as f:
+        f.write(data[:len(data) // 2])
+    f, tell = open_json_source(path)
+    with f:
+        with pytest.raises((ValueError, EOFError)):
+            list(iter_json_array(f))
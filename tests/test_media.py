@@ -0,0 +1,104 @@
+import os
+
+from PIL import Image
+
+import utils
+
+
+def _image(path, size=(64, 48)):
+    Image.new('RGB', size, (200, 30, 30)).save(path)
+    return str(path)
+
+
+def test_delete_media_keeps_blobs_of_non_ascii_source(media_dirs):
+    src_dir = media_dirs / 'nas'
+    src_dir.mkdir()
+    # record A: a shared, content-addressed copy still referenced once
+    blob = utils.copy_source_to_local(_image(src_dir / 'poster.jpg'))
+    assert utils._is_blob_path(blob)
+    # record B: a source whose name has no alphanumeric core
+    other = _image(src_dir / 'アニメ.jpg', (32, 32))
+
+    result = utils.delete_media([other])
+
+    assert os.path.exists(blob)
+    assert blob not in result['copies']
+    assert utils.get_blob_store().refcount(blob) == 1
+
+
+def test_delete_copy_keeps_blobs_of_non_ascii_source(media_dirs):
+    src_dir = media_dirs / 'nas'
+    src_dir.mkdir()
+    blob = utils.copy_source_to_local(_image(src_dir / 'poster.jpg'))
+    legacy = _image(media_dirs / 'copies' / 'copy_poster_0123abcd.jpg')
+    utils.delete_copy(_image(src_dir / 'アニメ.jpg', (32, 32)))
+    assert os.path.exists(blob)
+    assert os.path.exists(legacy)
+
+
+def test_legacy_card_thumbnail_does_not_satisfy_larger_variants(media_dirs):
+    src = _image(media_dirs / 'poster.jpg', (1200, 800))
+    utils.ensure_thumbs_dir()
+    # a thumbnail from before the pyramid: only the card file exists
+    card = _image(utils.get_thumbnail_path(src), (320, 213))
+
+    assert utils.find_thumbnail(src, 'card') == card
+    assert utils.find_thumbnail(src, 'preview') is None
+    assert utils.find_thumbnail(src, 'carousel') is None
+
+    utils.regen_thumbnails_for_paths([src], workers=1)
+    preview = utils.find_thumbnail(src, 'preview')
+    assert preview and preview != card
+    with Image.open(preview) as im:
+        assert max(im.size) == 1200
+
+
+def test_card_thumbnail_recorded_as_preview_is_ignored(media_dirs):
+    src = _image(media_dirs / 'poster.jpg', (1200, 800))
+    utils.ensure_thumbs_dir()
+    card = _image(utils.get_thumbnail_path(src), (320, 213))
+    utils.get_media_manifest().record_thumbnails(src, {'card': card, 'preview': card})
+    assert utils.find_thumbnail(src, 'preview') is None
+
+
+def test_decref_leaves_uncounted_blob_alone(media_dirs):
+    src = _image(media_dirs / 'poster.jpg')
+    store = utils.get_blob_store()
+    blob = store.put(src, add_ref=False)
+    assert store.refcount(blob) == 0
+    assert not store.decref(blob)
+    assert os.path.exists(blob)
+
+
+def test_imported_record_takes_a_reference(media_dirs):
+    src = _image(media_dirs / 'poster.jpg')
+    # record A copied the poster
+    blob = utils.copy_source_to_local(src)
+    # record B arrives through an import pointing at the same copy
+    utils.retain_records_media([{'title': 'B', 'poster_path': blob, 'screenshots_paths': []}])
+    assert utils.get_blob_store().refcount(blob) == 2
+
+    utils.delete_media([blob])
+
+    assert os.path.exists(blob)
+    assert utils.get_blob_store().refcount(blob) == 1
+
+
+def test_gc_keeps_blob_referenced_after_the_mark(media_dirs, monkeypatch):
+    import media_gc
+    monkeypatch.setattr(media_gc, 'THUMBS_DIR', utils.THUMBS_DIR)
+    monkeypatch.setattr(media_gc, 'COPIES_DIR', utils.COPIES_DIR)
+    src_dir = media_dirs / 'nas'
+    src_dir.mkdir()
+    blob = utils.copy_source_to_local(_image(src_dir / 'poster.jpg'))
+    # a blob no entry ever took a reference to
+    orphan = utils.get_blob_store().put(_image(src_dir / 'other.jpg', (32, 32)), add_ref=False)
+    # the mark snapshot misses the first blob: its record was saved after the snapshot
+    gc = media_gc.MediaGC([], grace=-60, state_path=str(media_dirs / 'gc.json'), pause=0)
+
+    result = gc.run()
+
+    assert os.path.exists(blob)
+    assert utils.get_blob_store().refcount(blob) == 1
+    assert not os.path.exists(orphan)
+    assert result['stats']['removed'] == 1
@@ -0,0 +1,64 @@
+import random
+
+from PIL import Image
+
+from poster_atlas import PosterAtlas, SLOTS_PER_PAGE
+
+
+def _thumbs(tmp_path, count):
+    items = []
+    for i in range(count):
+        thumb = tmp_path / f'thumb_{i}.jpg'
+        Image.new('RGB', (32, 48), (i % 256, 0, 0)).save(thumb)
+        items.append((str(tmp_path / f'poster_{i}.jpg'), str(thumb)))
+    return items
+
+
+def _pages_in_order(atlas, items):
+    return [atlas._entries[src]['page'] for src, _ in items]
+
+
+def _runs(pages):
+    return sum(1 for i in range(len(pages)) if i == 0 or pages[i] != pages[i - 1])
+
+
+def test_pages_follow_grid_order(tmp_path):
+    items = _thumbs(tmp_path, SLOTS_PER_PAGE * 2 + 10)
+    atlas = PosterAtlas(str(tmp_path / 'atlas'))
+    atlas.sync(items)
+    atlas.publish()
+    assert _pages_in_order(atlas, items) == sorted(_pages_in_order(atlas, items))
+    assert _runs(_pages_in_order(atlas, items)) == 3
+
+    # the reversed order (Z-A) has the same neighbours: nothing is rewritten
+    assert atlas.sync(list(reversed(items)))['pages'] == []
+    atlas.publish()
+
+    shuffled = items[:]
+    random.Random(1).shuffle(shuffled)
+    result = atlas.sync(shuffled)
+    atlas.publish()
+    assert result['pages']
+    assert _runs(_pages_in_order(atlas, shuffled)) == 3
+
+
+def test_new_card_joins_the_page_of_its_neighbours(tmp_path):
+    items = _thumbs(tmp_path, SLOTS_PER_PAGE + 20)
+    atlas = PosterAtlas(str(tmp_path / 'atlas'))
+    atlas.sync(items)
+    atlas.publish()
+    # a card leaves the first page and comes back
+    atlas.sync(items[:5] + items[6:])
+    atlas.publish()
+    before = {src: (e['page'], e['slot']) for src, e in atlas._entries.items()}
+
+    result = atlas.sync(items)
+    atlas.publish()
+
+    assert result['added'] == 1
+    assert len(result['pages']) == 1
+    assert atlas._entries[items[5][0]]['page'] == atlas._entries[items[4][0]]['page']
+    assert all((e['page'], e['slot']) == before[src] for src, e in atlas._entries.items() if src in before)
+    # the index reloads with the same cells
+    reloaded = PosterAtlas(atlas.root)
+    assert reloaded.source_for(items[5][0], items[5][1]) == atlas.source_for(items[5][0], items[5][1])
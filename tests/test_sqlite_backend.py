@@ -0,0 +1,146 @@
+import os
+
+import pytest
+
+from database import AnimeDatabase, IMPORT_BACKUP_SUFFIX
+from sqlite_backend import SQLiteAnimeDatabase, migrate_tinydb_to_sqlite
+
+
+@pytest.fixture
+def both(tmp_path):
+    """A TinyDB and an SQLite library with the same entries."""
+    dbs = [AnimeDatabase(str(tmp_path / 'anime.db')), SQLiteAnimeDatabase(str(tmp_path / 'anime.sqlite'))]
+    yield dbs
+    for db in dbs:
+        db.close()
+
+
+def _fill(dbs, entries):
+    for db in dbs:
+        with db.batch():
+            for title, description, tags in entries:
+                db.add_anime(title, description, '', [], tags)
+
+
+@pytest.mark.parametrize('query', ['İst', 'i̇st', 'ist', 'IST', 'ÄÖÜ', 'äöü', 'straße', 'ΣΊΣ', 'σίσ', 'kelvin'])
+def test_search_matches_tinydb(both, query):
+    _fill(both, [
+        ('İstanbul Tales', '', []),
+        ('Istanbul', 'mist over the bay', []),
+        ('ÄÖÜ Club', '', ['straße']),
+        ('Σίσυφος', 'ΣΊΣΥΦΟΣ again', []),
+        ('Kelvin', '', ['Kelvin']),
+    ])
+    tiny, lite = both
+    assert lite.search_ids(query) == tiny.search_ids(query)
+
+
+def _library():
+    # duplicate and case-only-different titles and dates test the doc_id tiebreak
+    entries = []
+    for i in range(57):
+        entries.append({'title': ['Bleach', 'bleach', 'Akira', 'Ёжик', 'Zeta', f'Show {i % 9}'][i % 6],
+                        'description': f'episode {i}', 'poster_path': '', 'screenshots_paths': [],
+                        'tags': [f'tag{i % 4}'], 'added_date': f'2024-01-{1 + i % 28:02d}T00:00:00'})
+    return entries
+
+
+def _ids(records):
+    return [r.doc_id for r in records]
+
+
+@pytest.mark.parametrize('sort_by', ['title', 'date', None])
+@pytest.mark.parametrize('reverse', [False, True])
+def test_paging_matches_tinydb(both, sort_by, reverse):
+    for db in both:
+        db.import_from_json(_library())
+    tiny, lite = both
+    assert _ids(lite.get_all_anime(sort_by, reverse)) == _ids(tiny.get_all_anime(sort_by, reverse))
+
+    def pages(db, accept=None):
+        ids, cursor = [], None
+        while True:
+            records, cursor = db.get_page(cursor, 10, sort_by, reverse, accept)
+            ids.append(_ids(records))
+            if cursor is None:
+                return ids
+    assert pages(lite) == pages(tiny)
+    accept = lambda doc: 'tag1' in doc['tags']
+    assert pages(lite, accept) == pages(tiny, accept)
+    assert _ids(lite.iter_anime(sort_by, reverse, page_size=7)) == _ids(tiny.iter_anime(sort_by, reverse, page_size=7))
+
+
+def test_cursor_survives_writes(both):
+    for db in both:
+        db.import_from_json(_library())
+    results = []
+    for db in both:
+        first, cursor = db.get_page(None, 20)
+        # an entry sorting before the cursor and one after it
+        db.add_anime('Aaa', '', '', [])
+        db.add_anime('Zzz', '', '', [])
+        rest = list(first)
+        while cursor is not None:
+            records, cursor = db.get_page(cursor, 20)
+            rest.extend(records)
+        results.append([r['title'] for r in rest])
+    assert results[0] == results[1]
+    assert 'Aaa' not in results[0] and 'Zzz' in results[0]
+
+
+@pytest.mark.parametrize('query', ['', 'bleach', 'EPISODE 1', 'ёжик', 'tag2', 'zz', 'nothing here'])
+def test_library_search_matches_tinydb(both, query):
+    for db in both:
+        db.import_from_json(_library())
+    tiny, lite = both
+    assert lite.search_ids(query) == tiny.search_ids(query)
+    assert _ids(lite.search_anime(query)) == _ids(tiny.search_anime(query))
+    assert lite.get_all_tags() == sorted(tiny.get_all_tags())
+    assert _ids(lite.get_anime_by_tag('tag3')) == _ids(tiny.get_anime_by_tag('tag3'))
+
+
+def test_export_import_round_trip(both, tmp_path):
+    tiny, lite = both
+    tiny.import_from_json(_library())
+    exported = [dict(r) for r in tiny.export_to_json()]
+    lite.import_from_json([dict(r) for r in exported])
+    assert [dict(r) for r in lite.export_to_json()] == exported
+
+    # and back into a fresh TinyDB library
+    again = AnimeDatabase(str(tmp_path / 'again.db'))
+    again.import_from_json([dict(r) for r in lite.export_to_json()])
+    assert [dict(r) for r in again.export_to_json()] == exported
+    again.close()
+
+
+def test_interrupted_import_is_restored_on_open(both, tmp_path):
+    paths = [str(tmp_path / 'anime.db'), str(tmp_path / 'anime.sqlite')]
+    for db in both:
+        db.import_from_json(_library())
+        # the backup a streamed import writes first, then a crash halfway through the import
+        db._write_import_backup()
+        db.delete_anime_many([1, 2, 3])
+        db.add_anime('half imported', '', '', [])
+        db.close()
+    reopened = [AnimeDatabase(paths[0]), SQLiteAnimeDatabase(paths[1])]
+    try:
+        for db in reopened:
+            assert [dict(r) for r in db.export_to_json()] == _library()
+            assert not os.path.exists(db.db_path + IMPORT_BACKUP_SUFFIX)
+    finally:
+        for db in reopened:
+            db.close()
+
+
+def test_migration_keeps_ids(tmp_path):
+    tiny = AnimeDatabase(str(tmp_path / 'anime.db'))
+    tiny.import_from_json(_library())
+    tiny.delete_anime_many([2, 5])
+    expected = {r.doc_id: dict(r) for r in tiny.export_to_json()}
+    tiny.close()
+
+    assert migrate_tinydb_to_sqlite(str(tmp_path / 'anime.db'), str(tmp_path / 'anime.sqlite')) == len(expected)
+    lite = SQLiteAnimeDatabase(str(tmp_path / 'anime.sqlite'))
+    assert {r.doc_id: dict(r) for r in lite.export_to_json()} == expected
+    assert lite.add_anime('new', '', '', []) == max(expected) + 1
+    lite.close()
@@ -0,0 +1,135 @@
+import json
+import os
+
+import pytest
+
+from storage import JournalTable
+
+
+def _open(path, **kwargs):
+    kwargs.setdefault('fsync', False)
+    kwargs.setdefault('compact_threshold', 1 << 30)
+    return JournalTable(str(path), **kwargs)
+
+
+def _snapshot(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['_default']
+
+
+def test_journal_replays_on_top_of_snapshot(tmp_path):
+    path = tmp_path / 'anime.db'
+    table = _open(path)
+    a = table.insert({'title': 'a'})
+    table.insert({'title': 'b'})
+    assert table.compact()
+    # after the snapshot: an update, a removal and an insert only live in the journal
+    table.update({'title': 'a2'}, [a])
+    table.remove([2])
+    c = table.insert({'title': 'c'})
+    table._fp.close()
+
+    table = _open(path)
+    assert {d.doc_id: d['title'] for d in table.all()} == {a: 'a2', c: 'c'}
+    # ids are not reused after a replayed removal
+    assert table.insert({'title': 'd'}) == c + 1
+    table.close()
+
+
+def test_torn_journal_tail_is_dropped(tmp_path):
+    path = tmp_path / 'anime.db'
+    table = _open(path)
+    table.insert({'title': 'a'})
+    table.insert({'title': 'b'})
+    table._fp.close()
+    good = os.path.getsize(table.journal_path)
+    with open(table.journal_path, 'ab') as f:
+        # a crash in the middle of a record
+        f.write(b'{"op":"put","id":3,"doc":{"tit')
+
+    table = _open(path)
+    assert sorted(d['title'] for d in table.all()) == ['a', 'b']
+    assert os.path.getsize(table.journal_path) == good
+    # new records start on a line of their own and survive the next open
+    table.insert({'title': 'c'})
+    table._fp.close()
+    table = _open(path)
+    assert sorted(d['title'] for d in table.all()) == ['a', 'b', 'c']
+    table.close()
+
+
+def test_clear_in_journal_drops_snapshot_entries(tmp_path):
+    path = tmp_path / 'anime.db'
+    table = _open(path)
+    table.insert({'title': 'a'})
+    table.compact()
+    table.truncate()
+    table.insert({'title': 'b'})
+    table._fp.close()
+
+    table = _open(path)
+    assert [d['title'] for d in table.all()] == ['b']
+    table.close()
+
+
+def test_compaction_waits_for_open_batch(tmp_path):
+    path = tmp_path / 'anime.db'
+    table = _open(path)
+    table.insert({'title': 'a'})
+    table.compact()
+
+    table.begin_batch()
+    table.insert({'title': 'b'})
+    assert table.compact() is False
+    # the snapshot does not contain the batch while it may still be aborted
+    assert [v['title'] for v in _snapshot(path).values()] == ['a']
+    table.abort_batch()
+    assert [d['title'] for d in table.all()] == ['a']
+
+    table.begin_batch()
+    table.insert({'title': 'c'})
+    table.end_batch()
+    assert table.compact()
+    assert sorted(v['title'] for v in _snapshot(path).values()) == ['a', 'c']
+    assert os.path.getsize(table.journal_path) == 0
+    table.close()
+
+
+def test_batch_end_compacts_when_threshold_passed(tmp_path):
+    path = tmp_path / 'anime.db'
+    table = _open(path, compact_threshold=256)
+    table.begin_batch()
+    for i in range(20):
+        table.insert({'title': f'entry {i}'})
+    # over the threshold, but the batch is still open
+    assert not os.path.exists(path) or _snapshot(path) == {}
+    table.end_batch()
+    table._compactor.join()
+    assert len(_snapshot(path)) == 20
+    table.close()
+
+
+def test_aborted_batch_is_cut_from_journal(tmp_path):
+    path = tmp_path / 'anime.db'
+    table = _open(path)
+    table.insert({'title': 'a'})
+    table.begin_batch()
+    table.insert({'title': 'b'})
+    table.begin_batch()
+    table.insert({'title': 'c'})
+    table.end_batch()
+    table.abort_batch()
+    assert [d['title'] for d in table.all()] == ['a']
+    table._fp.close()
+
+    table = _open(path)
+    assert [d['title'] for d in table.all()] == ['a']
+    assert table.insert({'title': 'd'}) == 2
+    table.close()
+
+
+def test_corrupted_snapshot_is_reported(tmp_path):
+    path = tmp_path / 'anime.db'
+    path.write_text('{"_default": {', encoding='utf-8')
+    with pytest.raises(ValueError, match='Corrupted database snapshot'):
+        _open(path)
@@ -0,0 +1,199 @@
+"""
+Process-wide cache of poster and screenshot textures.
+The cards, the details panel and the details popup used to open, decode and upload the
+same images each on their own, with no limit on how much memory they held. They now ask
+this cache for a (path, size variant) pair: images are decoded with PIL on a worker
+thread, uploaded as a texture on the UI thread and kept in an LRU under a byte budget,
+so a poster opened from a card is shown from memory everywhere else.
+
+Evicting only drops the cache's reference: a texture that is still on screen stays alive
+until its widget lets go of it.
+"""
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image as PILImage
+from kivy.clock import Clock
+from kivy.graphics.texture import Texture
+
+import utils
+
+# default byte budget (settings.json: texture_cache_mb)
+TEXTURE_BUDGET = 256 * 1024 * 1024
+DECODE_WORKERS = 2
+
+def _decode(path):
+    # runs on a worker: the pixels of path ready for upload, rows bottom-up like GL wants them
+    with PILImage.open(path) as im:
+        colorfmt = 'rgba' if im.mode in ('RGBA', 'LA', 'PA') or 'transparency' in im.info else 'rgb'
+        im = im.convert(colorfmt.upper())
+        im = im.transpose(PILImage.FLIP_TOP_BOTTOM)
+        return im.size, colorfmt, im.tobytes()
+
+class TextureCache:
+    """LRU of textures keyed by (path, variant) holding at most budget bytes.
+
+    get() and load() are called on the UI thread. A cached texture is only handed out
+    while the file still has the size and mtime it was loaded with (see
+    PathResolver.stat), so a regenerated thumbnail is loaded again. hits and misses count
+    the lookups, evictions the textures dropped for the budget.
+    """
+    def __init__(self, budget=TEXTURE_BUDGET, workers=DECODE_WORKERS):
+        self.budget = budget
+        self._lock = threading.Lock()
+        # (path, variant) -> (texture, nbytes, stat)
+        self._items = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        # (path, variant) -> callbacks waiting for a decode in flight
+        self._pending = {}
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='texture')
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        """{'entries', 'bytes', 'budget', 'hits', 'misses', 'evictions'}"""
+        with self._lock:
+            return {'entries': len(self._items), 'bytes': self.bytes, 'budget': self.budget,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+    def _lookup(self, key):
+        with self._lock:
+            item = self._items.get(key)
+        if item is not None and item[2] != utils.get_path_resolver().stat(key[0]):
+            # the file changed since it was loaded
+            self.invalidate(key[0], key[1])
+            item = None
+        with self._lock:
+            if item is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return item[0]
+
+    def get(self, path, variant='original'):
+        """The cached texture of path or None (counts as a hit or a miss)."""
+        if not path:
+            return None
+        return self._lookup((path, variant))
+
+    def load(self, path, variant='original', callback=None):
+        """Call callback(texture) with the texture of path, or callback(None) if it cannot
+        be read. Synchronous on a hit; otherwise the image is decoded in the background
+        and the callback runs on the UI thread once it is uploaded."""
+        key = (path, variant)
+        texture = self._lookup(key) if path else None
+        if texture is not None or not path:
+            if callback:
+                callback(texture)
+            return
+        with self._lock:
+            waiting = self._pending.get(key)
+            if waiting is not None:
+                # already being decoded for another view
+                if callback:
+                    waiting.append(callback)
+                return
+            self._pending[key] = [callback] if callback else []
+        stat = utils.get_path_resolver().stat(path)
+
+        def done(future):
+            try:
+                decoded = future.result()
+            except Exception:
+                decoded = None
+            Clock.schedule_once(lambda dt: self._upload(key, stat, decoded), 0)
+        self._pool.submit(_decode, path).add_done_callback(done)
+
+    def _upload(self, key, stat, decoded):
+        texture = None
+        if decoded is not None:
+            try:
+                size, colorfmt, pixels = decoded
+                texture = Texture.create(size=size, colorfmt=colorfmt)
+                texture.blit_buffer(pixels, colorfmt=colorfmt, bufferfmt='ubyte')
+                self._store(key, texture, len(pixels), stat)
+            except Exception:
+                texture = None
+        with self._lock:
+            callbacks = self._pending.pop(key, [])
+        for callback in callbacks:
+            try:
+                callback(texture)
+            except Exception:
+                pass
+
+    def _store(self, key, texture, nbytes, stat):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old[1]
+            if nbytes > self.budget:
+                # larger than the whole budget: shown, but not cached
+                return
+            self._items[key] = (texture, nbytes, stat)
+            self.bytes += nbytes
+            self._evict()
+
+    def _evict(self):
+        # caller holds the lock
+        while self.bytes > self.budget and self._items:
+            _, (_, nbytes, _) = self._items.popitem(last=False)
+            self.bytes -= nbytes
+            self.evictions += 1
+
+    def set_budget(self, budget):
+        with self._lock:
+            self.budget = max(0, int(budget))
+            self._evict()
+
+    def invalidate(self, path=None, variant=None):
+        """Forget path (all variants unless variant is given), or everything."""
+        with self._lock:
+            if path is None:
+                keys = list(self._items)
+            else:
+                keys = [k for k in self._items if k[0] == path and (variant is None or k[1] == variant)]
+            for key in keys:
+                self.bytes -= self._items.pop(key)[1]
+
+    def show(self, widget, path, variant='original', on_shown=None):
+        """Display path on an Image widget through the cache. The widget remembers what it
+        should show, so a late texture for a widget that moved on is not applied."""
+        widget._texture_key = (path, variant) if path else None
+        if not path:
+            widget.source = ''
+            widget.texture = None
+            return
+
+        applied = []
+
+        def apply(texture):
+            if getattr(widget, '_texture_key', None) != (path, variant):
+                return
+            applied.append(True)
+            widget.source = ''
+            widget.texture = texture
+            if on_shown:
+                on_shown(texture)
+        self.load(path, variant, apply)
+        if not applied:
+            # not in memory: blank until decoded rather than showing the previous image
+            widget.source = ''
+            widget.texture = None
+
+_texture_cache = None
+_texture_cache_lock = threading.Lock()
+
+def get_texture_cache():
+    """Process-wide TextureCache."""
+    global _texture_cache
+    with _texture_cache_lock:
+        if _texture_cache is None:
+            _texture_cache = TextureCache()
+        return _texture_cache
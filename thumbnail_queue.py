@@ -0,0 +1,173 @@
+"""
+Shared queue for thumbnails requested by the UI.
+A fixed number of worker threads (Pillow releases the GIL while decoding/encoding) serves
+every card and carousel image. Requests for the same thumbnail are merged into one job,
+on-screen requests are served first and requests of widgets that went away are dropped.
+"""
+import os
+import heapq
+import itertools
+import threading
+
+from utils import create_thumbnails, ensure_thumbs_dir, get_media_manifest, get_thumbnail_path, THUMB_VARIANTS
+
+# lower runs first
+PRIORITY_VISIBLE = 0
+PRIORITY_OFFSCREEN = 1
+
+class _Job:
+    __slots__ = ('thumb', 'src', 'prepare', 'priority', 'waiters', 'started')
+
+    def __init__(self, thumb, src, prepare, priority):
+        self.thumb = thumb
+        self.src = src
+        self.prepare = prepare
+        self.priority = priority
+        # owner -> [callback, ...]
+        self.waiters = {}
+        self.started = False
+
+class ThumbnailQueue:
+    """Bounded priority queue of thumbnail jobs served by `workers` threads.
+
+    request() registers a callback(thumbs, error) for the thumbnails of src, called on a
+    worker thread once the whole pyramid ({variant: path}, see utils.THUMB_VARIANTS) exists
+    (error is None) or creation failed (thumbs is None). Jobs are keyed by the card
+    thumbnail path, so concurrent requests for one source share a single decode. At most max_pending jobs wait; further requests are refused
+    (request() returns False) and the caller may ask again later, e.g. when it scrolls
+    into view.
+    """
+    def __init__(self, workers=None, max_pending=2000):
+        if workers is None:
+            workers = min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        self._heap = []
+        self._seq = itertools.count()
+        # thumb path -> _Job (queued or running)
+        self._jobs = {}
+        # owner -> set of thumb paths it waits for
+        self._owners = {}
+        self._pending = 0
+        self._closed = False
+        self._threads = []
+        for i in range(max(1, workers)):
+            t = threading.Thread(target=self._worker, name=f'thumbnail-{i}', daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def request(self, src, thumb, callback, owner=None, priority=PRIORITY_OFFSCREEN, prepare=None):
+        """Queue (or join) the job creating thumb from src. prepare() may return a better
+        local source (e.g. a copied original) and runs on the worker. Asking again for a
+        job that is already queued only raises its priority. Returns False if refused."""
+        with self._cond:
+            if self._closed:
+                return False
+            job = self._jobs.get(thumb)
+            if job is None:
+                if self._pending >= self.max_pending:
+                    return False
+                job = _Job(thumb, src, prepare, priority)
+                self._jobs[thumb] = job
+                self._pending += 1
+                heapq.heappush(self._heap, (priority, next(self._seq), job))
+                self._cond.notify()
+            elif priority < job.priority and not job.started:
+                # the older heap entry goes stale and is skipped by the workers
+                job.priority = priority
+                heapq.heappush(self._heap, (priority, next(self._seq), job))
+            callbacks = job.waiters.setdefault(owner, [])
+            if callback not in callbacks:
+                callbacks.append(callback)
+            self._owners.setdefault(owner, set()).add(thumb)
+            return True
+
+    def prioritize(self, owner, priority=PRIORITY_VISIBLE):
+        """Move the queued jobs owner waits for to priority (e.g. once it is on screen)."""
+        with self._cond:
+            for thumb in self._owners.get(owner, ()):
+                job = self._jobs.get(thumb)
+                if job is not None and not job.started and priority < job.priority:
+                    job.priority = priority
+                    heapq.heappush(self._heap, (priority, next(self._seq), job))
+
+    def is_waiting(self, owner):
+        with self._cond:
+            return bool(self._owners.get(owner))
+
+    def cancel(self, owner):
+        """Forget the callbacks of owner; jobs nobody waits for any more are dropped unless running."""
+        with self._cond:
+            for thumb in self._owners.pop(owner, ()):
+                job = self._jobs.get(thumb)
+                if job is None:
+                    continue
+                job.waiters.pop(owner, None)
+                if not job.waiters and not job.started:
+                    del self._jobs[thumb]
+                    self._pending -= 1
+            # a refresh can cancel thousands of jobs; don't let their stale entries pile up
+            if len(self._heap) > 2 * self._pending + 64:
+                self._heap = [e for e in self._heap if self._jobs.get(e[2].thumb) is e[2] and e[2].priority == e[0]]
+                heapq.heapify(self._heap)
+
+    def cancel_many(self, owners):
+        for owner in owners:
+            self.cancel(owner)
+
+    def _next_job(self):
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                while self._heap:
+                    priority, _, job = heapq.heappop(self._heap)
+                    # skip entries of cancelled, started or re-prioritized jobs
+                    if job.started or job.priority != priority or self._jobs.get(job.thumb) is not job:
+                        continue
+                    job.started = True
+                    self._pending -= 1
+                    return job
+                self._cond.wait()
+
+    def _worker(self):
+        while True:
+            job = self._next_job()
+            if job is None:
+                return
+            error = None
+            try:
+                thumbs = {v: get_thumbnail_path(job.src, v) for v in THUMB_VARIANTS}
+                if not all(os.path.exists(t) for t in thumbs.values()):
+                    ensure_thumbs_dir()
+                    src = (job.prepare() if job.prepare else None) or job.src
+                    # the pyramid is named after the requested source, not the local copy
+                    create_thumbnails(src, name_for=job.src)
+                get_media_manifest().record_thumbnails(job.src, thumbs)
+            except Exception as e:
+                thumbs, error = None, str(e)
+            with self._cond:
+                self._jobs.pop(job.thumb, None)
+                waiters = job.waiters
+                for owner in waiters:
+                    waiting = self._owners.get(owner)
+                    if waiting is not None:
+                        waiting.discard(job.thumb)
+                        if not waiting:
+                            del self._owners[owner]
+            for callbacks in waiters.values():
+                for callback in callbacks:
+                    try:
+                        callback(thumbs, error)
+                    except Exception:
+                        pass
+
+    def close(self):
+        """Stop the workers after their current job; queued jobs are dropped."""
+        with self._cond:
+            self._closed = True
+            self._heap = []
+            self._jobs = {}
+            self._owners = {}
+            self._pending = 0
+            self._cond.notify_all()
@@ -1,49 +1,238 @@
 """
 Utility helpers for thumbnails.
-Creates a thumbnails/ directory in the project root and generates small versions of images.
+Creates a thumbnails/ directory in the project root and generates small versions of images
+(a pyramid of sizes per source, see THUMB_VARIANTS).
+Large batches are spread over a process pool so Pillow decoding uses every core.
 """
 import os
+import re
 import hashlib
 import time
+import threading
+import multiprocessing
+from collections import OrderedDict
 
 THUMBS_DIR = os.path.join(os.getcwd(), 'thumbnails')
 # directory to keep local copies of original source images (so sources are available locally)
 COPIES_DIR = os.path.join(os.getcwd(), 'copies')
+# reference counts of the content-addressed copies (see blobstore.py)
+COPIES_REFS_PATH = os.path.join(os.getcwd(), 'copies_refs.sqlite')
+# source -> copy -> thumbnails manifest (see media_manifest.py)
+MEDIA_MANIFEST_PATH = os.path.join(os.getcwd(), 'media_manifest.sqlite')
 
-def ensure_thumbs_dir():
+# thumbnail engine defaults (settings.json: thumbnail_workers / thumbnail_timeout);
+# None workers means one per CPU
+THUMBNAIL_WORKERS = None
+THUMBNAIL_TIMEOUT = 60
+# below this many missing thumbnails starting worker processes costs more than it saves
+PARALLEL_MIN_JOBS = 8
+# threads removing files in delete_media (file deletion waits on the disk, not the CPU)
+CLEANUP_WORKERS = 8
+
+# path resolver memo (see PathResolver): entries kept and seconds a stat() result is trusted
+RESOLVER_CACHE_SIZE = 4096
+RESOLVER_STAT_TTL = 2.0
+
+# thumbnail pyramid, variant -> bounding box; every view loads the smallest variant that
+# fits it: grid cards, the screenshots carousel of the side panel, the large DetailPopup
+THUMB_VARIANTS = {
+    'card': (320, 320),
+    'carousel': (960, 960),
+    'preview': (1920, 1920),
+}
+
+# directories known to exist; each is created at most once per process
+_ready_dirs = set()
+
+def _ensure_dir(path):
+    if path in _ready_dirs:
+        return
     try:
-        os.makedirs(THUMBS_DIR, exist_ok=True)
+        os.makedirs(path, exist_ok=True)
+        _ready_dirs.add(path)
     except Exception:
         pass
 
+def ensure_thumbs_dir():
+    _ensure_dir(THUMBS_DIR)
+
 def ensure_copies_dir():
-    try:
-        os.makedirs(COPIES_DIR, exist_ok=True)
-    except Exception:
-        pass
+    _ensure_dir(COPIES_DIR)
 
-def _safe_name(path):
+def _safe_name(path, variant='card', abs_path=None, digest=None):
     # create a stable filename based on absolute path
-    h = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    h = digest or hashlib.sha1((abs_path or os.path.abspath(path)).encode('utf-8')).hexdigest()
     base = os.path.splitext(os.path.basename(path))[0]
-    return f"thumb_{base}_{h}.jpg"
+    # the card variant keeps the original (pre-pyramid) name
+    suffix = '' if variant == 'card' else f'_{variant}'
+    return f"thumb_{base}_{h}{suffix}.jpg"
 
-def _safe_copy_name(path):
+def _safe_copy_name(path, abs_path=None, digest=None):
     # generates a stable filename for a copied original, preserve extension
-    h = hashlib.sha1(os.path.abspath(path).encode('utf-8')).hexdigest()
+    h = digest or hashlib.sha1((abs_path or os.path.abspath(path)).encode('utf-8')).hexdigest()
     base = os.path.basename(path)
     name, ext = os.path.splitext(base)
     return f"copy_{name}_{h}{ext}"
 
-def get_thumbnail_path(src_path):
-    ensure_thumbs_dir()
-    name = _safe_name(src_path)
-    return os.path.join(THUMBS_DIR, name)
+def _stat_info(path):
+    try:
+        st = os.stat(path)
+        return st.st_size, st.st_mtime_ns
+    except OSError:
+        return None
+
+class PathResolver:
+    """Bounded LRU memo of what a media path resolves to.
+
+    For every path it keeps the absolute path, the local copy path, the thumbnail path of
+    each THUMB_VARIANTS variant and the stat info (size, mtime_ns) of the file. The stat
+    info is re-read at most every stat_ttl seconds; when it changed the entry is resolved
+    afresh. At most max_entries paths are kept, the least recently used go first.
+    """
+    def __init__(self, max_entries=RESOLVER_CACHE_SIZE, stat_ttl=RESOLVER_STAT_TTL):
+        self.max_entries = max_entries
+        self.stat_ttl = stat_ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _resolve(self, path):
+        abs_path = os.path.abspath(path)
+        digest = hashlib.sha1(abs_path.encode('utf-8')).hexdigest()
+        if _in_copies_dir(abs_path):
+            # a path that already is a local copy is its own copy
+            copy = path
+        else:
+            copy = os.path.join(COPIES_DIR, _safe_copy_name(path, abs_path, digest))
+        return {
+            'abs': abs_path,
+            'copy': copy,
+            'thumbs': {v: os.path.join(THUMBS_DIR, _safe_name(path, v, abs_path, digest)) for v in THUMB_VARIANTS},
+            'stat': None,
+            'checked': None,
+        }
+
+    def _entry(self, path):
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = self._resolve(path)
+        with self._lock:
+            self._entries[path] = entry
+            self._entries.move_to_end(path)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def thumbnail_path(self, path, variant='card'):
+        entry = self._entry(path)
+        thumb = entry['thumbs'].get(variant)
+        if thumb is None:
+            thumb = os.path.join(THUMBS_DIR, _safe_name(path, variant, entry['abs']))
+        return thumb
+
+    def copy_path(self, path):
+        return self._entry(path)['copy']
+
+    def stat(self, path):
+        """(size, mtime_ns) of path or None if it does not exist, at most stat_ttl seconds old."""
+        entry = self._entry(path)
+        now = time.monotonic()
+        if entry['checked'] is not None and now - entry['checked'] < self.stat_ttl:
+            return entry['stat']
+        stat = _stat_info(entry['abs'])
+        if entry['checked'] is not None and stat != entry['stat']:
+            # the file changed: resolve it again instead of trusting anything derived from it
+            self.invalidate(path)
+            entry = self._entry(path)
+        entry['stat'], entry['checked'] = stat, now
+        return stat
+
+    def exists(self, path):
+        return bool(path) and self.stat(path) is not None
+
+    def invalidate(self, path=None):
+        """Forget path (or everything)."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(path, None)
+
+_path_resolver = None
+
+def get_path_resolver():
+    """Process-wide PathResolver; creates the thumbnails and copies directories once."""
+    global _path_resolver
+    with _blob_store_lock:
+        if _path_resolver is None:
+            ensure_thumbs_dir()
+            ensure_copies_dir()
+            _path_resolver = PathResolver()
+        return _path_resolver
+
+def get_thumbnail_path(src_path, variant='card'):
+    return get_path_resolver().thumbnail_path(src_path, variant)
 
 def get_copy_path(src_path):
-    ensure_copies_dir()
-    name = _safe_copy_name(src_path)
-    return os.path.join(COPIES_DIR, name)
+    return get_path_resolver().copy_path(src_path)
+
+def _in_copies_dir(path):
+    try:
+        return os.path.commonpath([os.path.abspath(path), os.path.abspath(COPIES_DIR)]) == os.path.abspath(COPIES_DIR)
+    except ValueError:
+        return False
+
+_blob_store = None
+_blob_store_lock = threading.Lock()
+
+def get_blob_store():
+    """Process-wide BlobStore for COPIES_DIR, opened on first use."""
+    global _blob_store
+    with _blob_store_lock:
+        if _blob_store is None:
+            from blobstore import BlobStore
+            _blob_store = BlobStore(os.path.abspath(COPIES_DIR), COPIES_REFS_PATH)
+        return _blob_store
+
+_media_manifest = None
+
+def get_media_manifest():
+    """Process-wide MediaManifest, loaded on first use."""
+    global _media_manifest
+    with _blob_store_lock:
+        if _media_manifest is None:
+            from media_manifest import MediaManifest
+            _media_manifest = MediaManifest(MEDIA_MANIFEST_PATH)
+        return _media_manifest
+
+def find_thumbnail(src_path, variant='card'):
+    """Return the current thumbnail of src_path or None if it has to be (re)generated."""
+    if not src_path:
+        return None
+    try:
+        # only a file at this variant's own path may be adopted: a legacy card thumbnail is
+        # no stand-in for the larger variants
+        thumb = get_media_manifest().thumbnail(src_path, variant, default_path=get_thumbnail_path(src_path, variant))
+        if thumb and variant != 'card' and thumb == get_thumbnail_path(src_path):
+            # recorded by an older version that adopted the card file for every variant
+            return None
+        return thumb
+    except Exception:
+        thumb = get_thumbnail_path(src_path, variant)
+        return thumb if os.path.exists(thumb) else None
+
+def _is_blob_path(path):
+    from blobstore import is_blob_name
+    return bool(path) and is_blob_name(path) and _in_copies_dir(path)
 
 def create_copy(src_path, copy_path=None):
     """Create a local copy of src_path in the copies directory and return the copy path."""
@@ -66,20 +255,49 @@ def create_copy(src_path, copy_path=None):
     except Exception:
         return ''
 
-def copy_source_to_local(src_path):
-    """Convenience function: returns local copy path for src_path, creates it if missing."""
+def copy_source_to_local(src_path, add_ref=True, progress=None):
+    """Convenience function: returns local copy path for src_path, creates it if missing.
+
+    Copies are content-addressed: identical files share one copy and every call with
+    add_ref=True counts one more reference to it (released by delete_copy). Pass
+    add_ref=False when the copy is only read and no entry will point at it.
+    progress(done, total) reports the copied bytes (see blobstore.fast_copy).
+    """
     try:
         if not src_path:
             return ''
         # if already inside copies dir, return as-is
+        if _in_copies_dir(src_path):
+            return src_path
+        if not os.path.exists(src_path):
+            return ''
+        copy = get_blob_store().put(src_path, add_ref=add_ref, progress=progress)
+        get_media_manifest().record_copy(src_path, copy)
+        return copy
+    except Exception:
+        return ''
+
+def retain_media(paths):
+    """Count one more reference for every content-addressed copy among paths.
+
+    For records that start pointing at existing copies without copying anything (imports,
+    an entry edited to use a file in copies/), so deleting another record that shares the
+    copy does not delete it. Other paths are ignored.
+    """
+    for p in paths:
         try:
-            if os.path.commonpath([os.path.abspath(src_path), os.path.abspath(COPIES_DIR)]) == os.path.abspath(COPIES_DIR):
-                return src_path
+            if p and _is_blob_path(p):
+                get_blob_store().incref(p)
+        except Exception:
+            pass
+
+def retain_records_media(records):
+    """retain_media() for the poster and screenshots of every record."""
+    for record in records:
+        try:
+            retain_media([record.get('poster_path', '')] + list(record.get('screenshots_paths', []) or []))
         except Exception:
             pass
-        return create_copy(src_path, None)
-    except Exception:
-        return ''
 
 def create_thumbnail(src_path, thumb_path, size=(320, 320)):
     """Create thumbnail using Pillow if available; returns thumb_path on success else raises."""
@@ -92,78 +310,100 @@ def create_thumbnail(src_path, thumb_path, size=(320, 320)):
     if not os.path.exists(src_path):
         raise FileNotFoundError(f"Source not found: {src_path}")
 
+    with Image.open(src_path) as im:
+        im.thumbnail(size)
+        _save_jpeg(_to_rgb(im), thumb_path)
+    return thumb_path
+
+def _to_rgb(im):
+    # convert to RGB for consistent JPEG thumbnails, transparency over black
+    from PIL import Image
+    if im.mode in ('RGBA', 'LA'):
+        bg = Image.new('RGB', im.size, (0, 0, 0))
+        bg.paste(im, mask=im.split()[-1])
+        return bg
+    return im.convert('RGB')
+
+def _save_jpeg(im, thumb_path):
+    # written next to thumb_path and renamed, so a killed worker never leaves a truncated
+    # thumbnail that would later be taken for a finished one
+    tmp_path = thumb_path + '.part'
     try:
-        with Image.open(src_path) as im:
-            im.thumbnail(size)
-            # convert to RGB and save as JPEG for consistent thumbnails
-            if im.mode in ('RGBA', 'LA'):
-                bg = Image.new('RGB', im.size, (0, 0, 0))
-                bg.paste(im, mask=im.split()[-1])
-                bg.save(thumb_path, 'JPEG', quality=85)
-            else:
-                im.convert('RGB').save(thumb_path, 'JPEG', quality=85)
-        return thumb_path
-    except Exception as e:
+        try:
+            im.save(tmp_path, 'JPEG', quality=85)
+        except FileNotFoundError:
+            # the directory was removed while the app ran: create it again
+            _ready_dirs.discard(os.path.dirname(thumb_path))
+            _ensure_dir(os.path.dirname(thumb_path))
+            im.save(tmp_path, 'JPEG', quality=85)
+        os.replace(tmp_path, thumb_path)
+    except Exception:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
         raise
 
+def create_thumbnails(src_path, variants=None, name_for=None):
+    """Create every variant of the thumbnail pyramid of src_path from a single decode.
+
+    The files are named after name_for (default src_path), e.g. the source path a card
+    shows when src_path is a local copy of it.
+
+    JPEG sources are decoded in draft mode, i.e. already scaled down by the decoder to the
+    smallest power-of-two reduction still covering the largest variant; each smaller
+    variant is then resized from the previous one. Returns {variant: thumb path}.
+    """
+    ensure_thumbs_dir()
+    try:
+        from PIL import Image
+    except Exception as e:
+        raise RuntimeError('Pillow is required for creating thumbnails') from e
+
+    if not os.path.exists(src_path):
+        raise FileNotFoundError(f"Source not found: {src_path}")
+
+    variants = variants or THUMB_VARIANTS
+    # largest first, so every step shrinks the image it got from the step before
+    order = sorted(variants.items(), key=lambda kv: kv[1][0] * kv[1][1], reverse=True)
+    created = {}
+    with Image.open(src_path) as im:
+        if im.format == 'JPEG':
+            im.draft('RGB', order[0][1])
+        im = _to_rgb(im)
+        for variant, size in order:
+            # reducing_gap lets Pillow use the fast integer reduce() before resampling
+            im.thumbnail(size, reducing_gap=2.0)
+            thumb = get_thumbnail_path(name_for or src_path, variant)
+            _save_jpeg(im, thumb)
+            created[variant] = thumb
+    return created
+
 def delete_thumbnail(src_path):
     """Delete thumbnail file(s) corresponding to src_path if they exist.
 
-    Attempts to remove thumbnails for the provided path and for the copy path derived
-    from it. Also scans thumbnails/ for files containing the basename token and removes them.
-    Returns True if any file was removed.
+    Removes every thumbnail the media manifest records for the provided path and for its
+    local copy, plus the deterministic thumbnail names of both (thumbnails made before the
+    manifest existed). The thumbnail of a content-addressed copy other entries still use
+    is kept. Returns True if any file was removed.
     """
     try:
         if not src_path:
             return False
         abs_src = os.path.abspath(src_path)
+        if _is_blob_path(abs_src) and get_blob_store().refcount(abs_src) != 1:
+            # shared (or uncounted) copy: keep its thumbnail while another entry may reference it
+            return False
+        manifest = get_media_manifest()
         removed = False
-        # candidate exact thumb for source
-        try:
-            thumb = get_thumbnail_path(abs_src)
-            if os.path.exists(thumb):
-                try:
-                    os.remove(thumb)
-                    removed = True
-                except Exception:
-                    pass
-        except Exception:
-            pass
-
-        # candidate thumb for the copy path derived from source
-        try:
-            copy_path = get_copy_path(abs_src)
-            thumb_copy = get_thumbnail_path(copy_path)
-            if os.path.exists(thumb_copy):
-                try:
-                    os.remove(thumb_copy)
+        copy_path = manifest.copy_of(abs_src) or get_copy_path(abs_src)
+        for path in {abs_src, os.path.abspath(copy_path)}:
+            if manifest.forget_thumbnails(path):
+                removed = True
+            for variant in THUMB_VARIANTS:
+                thumb = get_thumbnail_path(path, variant)
+                if os.path.exists(thumb) and _try_remove(thumb):
                     removed = True
-                except Exception:
-                    pass
-        except Exception:
-            copy_path = None
-
-        # Defensive: remove any thumbnail files containing basename tokens
-        try:
-            base_tokens = set()
-            base_tokens.add(os.path.splitext(os.path.basename(abs_src))[0])
-            if copy_path:
-                base_tokens.add(os.path.splitext(os.path.basename(copy_path))[0])
-            if os.path.isdir(THUMBS_DIR):
-                for fn in os.listdir(THUMBS_DIR):
-                    fn_lower = fn.lower()
-                    for token in base_tokens:
-                        if token and token.lower() in fn_lower:
-                            fp = os.path.join(THUMBS_DIR, fn)
-                            try:
-                                os.remove(fp)
-                                removed = True
-                            except Exception:
-                                pass
-                            break
-        except Exception:
-            pass
-
         return removed
     except Exception:
         return False
@@ -200,10 +440,43 @@ def _try_remove(path, retries=3, delay=0.05):
     except Exception:
         return False
 
+def _normalize_name(s):
+    # keep only alphanumerics
+    return re.sub(r'[^0-9a-z]', '', s.lower())
+
+def _looks_like_hash(x):
+    if len(x) < 6:
+        return False
+    try:
+        int(x, 16)
+        return True
+    except Exception:
+        return False
+
+def _orig_core(abs_src):
+    """Normalized core name of an original, as matched against legacy copy names."""
+    ob = os.path.splitext(os.path.basename(abs_src))[0]
+    # strip leading copy_ prefixes if any
+    while ob.startswith('copy_'):
+        ob = ob[len('copy_'):]
+    return _normalize_name(ob)
+
+def _copy_core(fn):
+    """Normalized core name of a legacy copy file name: copy_ prefixes and trailing hash segments removed."""
+    fb = os.path.splitext(fn)[0]
+    while fb.startswith('copy_'):
+        fb = fb[len('copy_'):]
+    # drop trailing underscore-separated parts that look like hex hashes (length >=6 and hex)
+    parts = fb.split('_')
+    while parts and _looks_like_hash(parts[-1]):
+        parts = parts[:-1]
+    return _normalize_name('_'.join(parts))
+
 def delete_copy(src_path):
     """Delete the local copied original corresponding to src_path (or delete src_path if it is already a copy path).
 
-    Deterministic matching: compute core basename from src_path, then for each file in COPIES_DIR
+    For a content-addressed copy this only releases one reference (see copy_source_to_local).
+    Legacy copies use deterministic matching: compute core basename from src_path, then for each file in COPIES_DIR
     strip leading 'copy_' prefixes and trailing hash segments to get its core name; if core names match
     (fuzzy, alnum compare), remove the file. Also attempt direct removal of exact computed copy path.
     Returns True if any file removed.
@@ -215,6 +488,10 @@ def delete_copy(src_path):
         abs_copies = os.path.abspath(COPIES_DIR)
         removed_any = False
 
+        # content-addressed copy: drop one reference, the file goes with the last one
+        if _is_blob_path(abs_src):
+            return get_blob_store().decref(abs_src)
+
         # If src is already inside copies dir, try to remove it directly
         try:
             norm_src = os.path.normcase(abs_src)
@@ -243,43 +520,17 @@ def delete_copy(src_path):
 
         # Build normalized token for original
         try:
-            import re
-            def _normalize_name(s):
-                # keep only alphanumerics
-                return re.sub(r'[^0-9a-z]', '', s.lower())
-
-            orig_base = os.path.splitext(os.path.basename(abs_src))[0]
-            # strip leading copy_ prefixes if any
-            ob = orig_base
-            while ob.startswith('copy_'):
-                ob = ob[len('copy_'):]
-            orig_core = _normalize_name(ob)
-
-            # scan copies dir and match
-            if os.path.isdir(COPIES_DIR):
+            orig_core = _orig_core(abs_src)
+
+            # scan copies dir and match; an empty core would match every file
+            if orig_core and os.path.isdir(COPIES_DIR):
                 for fn in os.listdir(COPIES_DIR):
                     fp = os.path.join(COPIES_DIR, fn)
+                    # content-addressed copies are shared and only go through decref
+                    if _is_blob_path(fp):
+                        continue
                     try:
-                        fn_base = os.path.splitext(fn)[0]
-                        # strip leading copy_ prefixes
-                        fb = fn_base
-                        while fb.startswith('copy_'):
-                            fb = fb[len('copy_'):]
-                        # remove trailing underscore-separated hash-like segments
-                        parts = fb.split('_')
-                        # drop trailing parts that look like hex hashes (length >=6 and hex)
-                        def looks_like_hash(x):
-                            if len(x) < 6:
-                                return False
-                            try:
-                                int(x, 16)
-                                return True
-                            except Exception:
-                                return False
-                        while parts and looks_like_hash(parts[-1]):
-                            parts = parts[:-1]
-                        fb_core = '_'.join(parts)
-                        fn_normal = _normalize_name(fb_core)
+                        fn_normal = _copy_core(fn)
                         if not fn_normal:
                             continue
                         # fuzzy match: either contains the other
@@ -298,27 +549,239 @@ def delete_copy(src_path):
     except Exception:
         return False
 
-def regen_thumbnails_for_paths(paths, size=(320, 320)):
-    """Generate thumbnails for a list of source image paths. Returns dict with results."""
+def delete_media(paths, workers=None):
+    """Delete the thumbnails and local copies of many source paths at once (bulk delete).
+
+    Does what delete_thumbnail() and delete_copy() do for every path, but COPIES_DIR is
+    listed and its legacy names normalized once for the whole batch, and the files are
+    removed by `workers` threads (default CLEANUP_WORKERS). A path listed several times
+    (e.g. a copy shared by several deleted entries) releases one reference per listing.
+    Returns {'thumbnails': [removed], 'copies': [removed], 'failed': [(path, error), ...],
+    'stats': {...}} where stats holds paths, files, workers and elapsed seconds.
+    """
+    from collections import Counter
+    from concurrent.futures import ThreadPoolExecutor
+    results = {'thumbnails': [], 'copies': [], 'failed': []}
+    started = time.monotonic()
+    counts = Counter(os.path.abspath(p) for p in paths if p)
+    abs_copies = os.path.normcase(os.path.abspath(COPIES_DIR))
+    manifest = get_media_manifest()
+    store = get_blob_store()
+
+    thumb_targets = set()
+    forget = set()
+    copy_targets = set()
+    legacy = []
+    for abs_src, count in counts.items():
+        try:
+            is_blob = _is_blob_path(abs_src)
+            # a shared copy keeps its thumbnails while entries outside this batch use it; an
+            # uncounted one is left to the media GC
+            refs = store.refcount(abs_src) if is_blob else 0
+            if not (is_blob and (refs == 0 or refs > count)):
+                copy_path = manifest.copy_of(abs_src) or get_copy_path(abs_src)
+                for path in {abs_src, os.path.abspath(copy_path)}:
+                    forget.add(path)
+                    thumb_targets.update(manifest.thumbnails(path).values())
+                    thumb_targets.update(get_thumbnail_path(path, v) for v in THUMB_VARIANTS)
+            if is_blob:
+                for _ in range(count):
+                    if store.decref(abs_src):
+                        results['copies'].append(abs_src)
+                continue
+            norm_src = os.path.normcase(abs_src)
+            if norm_src.startswith(abs_copies + os.sep):
+                copy_targets.add(abs_src)
+                continue
+            copy_targets.add(get_copy_path(abs_src))
+            legacy.append(_orig_core(abs_src))
+        except Exception as e:
+            results['failed'].append((abs_src, str(e)))
+
+    # one pass over the copies directory for every legacy name in the batch
+    if legacy and os.path.isdir(COPIES_DIR):
+        try:
+            by_core = {}
+            for fn in os.listdir(COPIES_DIR):
+                # content-addressed copies are shared and only go through decref
+                if _is_blob_path(os.path.join(COPIES_DIR, fn)):
+                    continue
+                core = _copy_core(fn)
+                if core:
+                    by_core.setdefault(core, []).append(os.path.join(COPIES_DIR, fn))
+            # a name without alphanumerics (e.g. non-Latin) has no core and matches nothing
+            for orig_core in set(legacy) - {''}:
+                for core, files in by_core.items():
+                    # fuzzy match: either contains the other
+                    if orig_core in core or core in orig_core:
+                        copy_targets.update(files)
+        except Exception as e:
+            results['failed'].append((COPIES_DIR, str(e)))
+
+    def remove(path):
+        if not os.path.exists(path):
+            return False
+        return _try_remove(path)
+
+    targets = [(t, 'thumbnails') for t in thumb_targets] + [(c, 'copies') for c in copy_targets]
+    workers = max(1, min(int(workers or CLEANUP_WORKERS), len(targets) or 1))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for (path, kind), future in zip(targets, [pool.submit(remove, t[0]) for t in targets]):
+            try:
+                if future.result():
+                    results[kind].append(path)
+                elif os.path.exists(path):
+                    results['failed'].append((path, 'locked'))
+            except Exception as e:
+                results['failed'].append((path, str(e)))
+
+    # the files are gone; this only drops the manifest records
+    for path in forget:
+        try:
+            manifest.forget_thumbnails(path)
+        except Exception:
+            pass
+
+    results['stats'] = {
+        'paths': len(counts),
+        'files': len(targets),
+        'workers': workers,
+        'elapsed': time.monotonic() - started,
+    }
+    return results
+
+def _thumbnail_job(job):
+    # runs in a worker process; must stay a picklable module-level function
+    src, thumb, variants = job
+    try:
+        create_thumbnails(src, variants)
+        return src, thumb, None
+    except Exception as e:
+        return src, None, str(e)
+
+def _run_thumbnail_pool(jobs, workers, timeout, results):
+    """Run thumbnail jobs on a process pool, at most one job in flight per worker.
+
+    Keeping the pool exactly full means a job starts (almost) when it is submitted, so its
+    timeout can be measured from submission. A job that overruns is reported as failed and
+    the pool is torn down, since a stuck worker cannot be freed any other way; the jobs that
+    were still running are resubmitted to a fresh pool.
+    """
+    ctx = multiprocessing.get_context('spawn')
+    finished = threading.Event()
+    wake = lambda _: finished.set()
+    pending = list(reversed(jobs))
+    while pending:
+        pool = ctx.Pool(processes=workers)
+        running = []
+        timed_out = False
+        try:
+            while pending or running:
+                while pending and len(running) < workers:
+                    job = pending.pop()
+                    res = pool.apply_async(_thumbnail_job, (job,), callback=wake, error_callback=wake)
+                    running.append((job, res, time.monotonic() + timeout))
+                # wait for whichever job finishes first, but never past the oldest deadline
+                job, _, deadline = running[0]
+                while True:
+                    finished.clear()
+                    done = [item for item in running if item[1].ready()]
+                    remaining = deadline - time.monotonic()
+                    if done or remaining <= 0:
+                        break
+                    finished.wait(remaining)
+                if not done:
+                    results['failed'].append((job[0], 'timeout'))
+                    running.pop(0)
+                    pending.extend(j for j, _, _ in reversed(running))
+                    running = []
+                    timed_out = True
+                    break
+                for item in done:
+                    running.remove(item)
+                    try:
+                        src, thumb, err = item[1].get()
+                    except Exception as e:
+                        src, thumb, err = item[0][0], None, str(e)
+                    if err:
+                        results['failed'].append((src, err))
+                    else:
+                        results['created'].append(thumb)
+        finally:
+            if timed_out:
+                pool.terminate()
+            else:
+                pool.close()
+            pool.join()
+
+def regen_thumbnails_for_paths(paths, size=(320, 320), workers=None, timeout=None):
+    """Generate thumbnails for a list of source image paths. Returns dict with results.
+
+    Each source gets the whole THUMB_VARIANTS pyramid (size overrides the card variant);
+    'created' lists the card thumbnails. Missing thumbnails are created on a pool of `workers` processes (default
+    THUMBNAIL_WORKERS, i.e. one per CPU); a job running longer than `timeout` seconds is
+    reported as failed with 'timeout'. Small batches are done in-process.
+    The report is {'created': [thumb, ...], 'failed': [(path, error), ...], 'stats': {...}}
+    where stats holds jobs, workers, elapsed seconds and per_second throughput.
+    """
     results = {'created': [], 'failed': []}
+    started = time.monotonic()
     ensure_thumbs_dir()
+    variants = dict(THUMB_VARIANTS, card=tuple(size))
+    jobs = []
     for p in paths:
         try:
             if not p or not os.path.exists(p):
                 results['failed'].append((p, 'missing'))
                 continue
-            thumb = get_thumbnail_path(p)
-            # if already exists skip
-            if os.path.exists(thumb):
-                results['created'].append(thumb)
+            # up to date (the manifest drops thumbnails of sources that changed): skip
+            existing = [find_thumbnail(p, v) for v in variants]
+            if all(existing):
+                results['created'].append(existing[0])
                 continue
-            try:
-                create_thumbnail(p, thumb, size=size)
-                results['created'].append(thumb)
-            except Exception as e:
-                results['failed'].append((p, str(e)))
+            jobs.append((p, get_thumbnail_path(p), variants))
         except Exception as e:
             results['failed'].append((p, str(e)))
+
+    workers = max(1, int(workers or THUMBNAIL_WORKERS or os.cpu_count() or 1))
+    workers = min(workers, len(jobs)) or 1
+    timeout = timeout or THUMBNAIL_TIMEOUT
+    serial = jobs
+    if workers > 1 and len(jobs) >= PARALLEL_MIN_JOBS:
+        try:
+            _run_thumbnail_pool(jobs, workers, timeout, results)
+            serial = []
+        except Exception:
+            # pool could not be started (e.g. a frozen build without freeze_support):
+            # finish whatever has not been reported in this process
+            reported = set(results['created']) | {f[0] for f in results['failed']}
+            serial = [j for j in jobs if j[0] not in reported and j[1] not in reported]
+    if serial is jobs:
+        workers = 1
+    for job in serial:
+        src, thumb, err = _thumbnail_job(job)
+        if err:
+            results['failed'].append((src, err))
+        else:
+            results['created'].append(thumb)
+
+    if jobs:
+        try:
+            created = set(results['created'])
+            manifest = get_media_manifest()
+            for p, thumb, _ in jobs:
+                if thumb in created:
+                    manifest.record_thumbnails(p, {v: get_thumbnail_path(p, v) for v in variants})
+        except Exception:
+            pass
+
+    elapsed = time.monotonic() - started
+    results['stats'] = {
+        'jobs': len(jobs),
+        'workers': workers,
+        'elapsed': elapsed,
+        'per_second': len(jobs) / elapsed if elapsed > 0 else 0.0,
+    }
     return results
 
 def regen_copies_for_paths(paths):
@@ -388,7 +851,10 @@ def cleanup_unreferenced_copies(referenced_paths):
                         res['kept'].append(fp)
                         continue
                     # not referenced: attempt remove
-                    ok = _try_remove(fp)
+                    if _is_blob_path(fp):
+                        ok = get_blob_store().drop(fp) or not os.path.exists(fp)
+                    else:
+                        ok = _try_remove(fp)
                     if ok:
                         res['removed'].append(fp)
                     else: